@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Analytics Store - event rollups behind the analytics.html charts
+Events (a patient visit or an AI prediction, with a condition and a yes/no
+outcome: new patient for visits, correct for predictions) are appended to a
+raw event log and added to minute, hour, day and month rollups as they
+arrive. Chart queries read rollup rows only: a series picks the finest
+resolution that fits the requested number of points, and a range total is
+assembled from whole months, then days, hours and minutes at its edges.
+
+Rollups are dense NumPy arrays indexed by bucket, kind and condition, holding
+[events, positives]. They are checkpointed to rollups.npz; events logged after
+the last checkpoint are replayed on load, so the log is the source of truth.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from paths import HEALTHCARE_DIR
+from patient_registry import CONDITIONS
+
+DEFAULT_ANALYTICS_DIR = os.path.join(HEALTHCARE_DIR, 'analytics')
+EVENT_KINDS = ['visit', 'prediction']
+RESOLUTIONS = ['minute', 'hour', 'day', 'month']
+# Buckets kept per resolution (None keeps everything)
+DEFAULT_RETENTION = {'minute': 14 * 24 * 60, 'hour': None, 'day': None, 'month': None}
+DEFAULT_POINTS = 300
+MAX_POINTS = 5000
+# Accepted event times: the rollups are dense arrays, so a stray timestamp decades
+# away would allocate every bucket in between
+MAX_EVENT_AGE_DAYS = int(os.environ.get('HEALTHCARE_ANALYTICS_MAX_AGE_DAYS', 10 * 365))
+MAX_EVENT_AHEAD = 86400  # seconds an event may be ahead of the server clock
+SAVE_INTERVAL = 5.0  # seconds between checkpoints while events keep arriving
+CHUNK_EVENTS = 2_000_000
+
+EVENT_DTYPE = np.dtype([('ts', '<i8'), ('kind', 'u1'), ('condition', 'u1'), ('positive', 'u1')])
+_SHAPE = (len(EVENT_KINDS), len(CONDITIONS), 2)
+
+
+def minute_to_bucket(minutes, resolution):
+    """Bucket indexes (since the epoch) of the given epoch minutes"""
+    minutes = np.asarray(minutes, dtype=np.int64)
+    if resolution == 'minute':
+        return minutes
+    if resolution == 'hour':
+        return minutes // 60
+    if resolution == 'day':
+        return minutes // 1440
+    return minutes.astype('datetime64[m]').astype('datetime64[M]').astype(np.int64)
+
+
+def bucket_start(bucket, resolution):
+    """Epoch minute at which a bucket starts"""
+    if resolution == 'minute':
+        return int(bucket)
+    if resolution == 'hour':
+        return int(bucket) * 60
+    if resolution == 'day':
+        return int(bucket) * 1440
+    return int(np.datetime64(int(bucket), 'M').astype('datetime64[m]').astype(np.int64))
+
+
+def bucket_label(bucket, resolution):
+    """ISO timestamp of a bucket's start"""
+    return datetime.fromtimestamp(bucket_start(bucket, resolution) * 60, timezone.utc).strftime('%Y-%m-%dT%H:%MZ')
+
+
+def parse_time(value):
+    """Epoch seconds from an int/float or an ISO 8601 string (UTC unless it has an offset)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+class Rollup:
+    """Counts per bucket of one resolution, as rows of shape (kinds, conditions, [events, positives])"""
+
+    def __init__(self, resolution, retention=None, start=None, rows=None):
+        self.resolution = resolution
+        self.retention = retention
+        self.start = start
+        self.length = 0 if rows is None else len(rows)
+        self._rows = np.zeros((0,) + _SHAPE, dtype=np.int64) if rows is None else rows
+
+    @property
+    def rows(self):
+        return self._rows[:self.length]
+
+    @property
+    def end(self):
+        return (self.start or 0) + self.length
+
+    def _reserve(self, lo, hi):
+        """Make buckets lo..hi addressable, dropping buckets that fall out of retention"""
+        if self.start is None:
+            self.start = lo
+        new_start = min(self.start, lo)
+        new_end = max(self.end, hi + 1)
+        if self.retention:
+            new_start = max(new_start, new_end - self.retention)
+        if new_start == self.start and new_end - new_start <= len(self._rows):
+            self.length = new_end - new_start
+            return
+
+        # Grow geometrically so appending one bucket at a time stays amortized O(1)
+        capacity = max(new_end - new_start, 2 * len(self._rows))
+        if self.retention:
+            capacity = min(capacity, self.retention)
+        rows = np.zeros((capacity,) + _SHAPE, dtype=np.int64)
+        keep_lo, keep_hi = max(self.start, new_start), min(self.end, new_end)
+        if keep_lo < keep_hi:
+            rows[keep_lo - new_start:keep_hi - new_start] = self._rows[keep_lo - self.start:keep_hi - self.start]
+        self._rows, self.start, self.length = rows, new_start, new_end - new_start
+
+    def add(self, buckets, kinds, conditions, positives):
+        """Add events, given as parallel arrays with their bucket indexes"""
+        self._reserve(int(buckets.min()), int(buckets.max()))
+        offsets = buckets - self.start
+        keep = offsets >= 0  # older than retention
+        if not keep.all():
+            offsets, kinds, conditions, positives = offsets[keep], kinds[keep], conditions[keep], positives[keep]
+        flat = ((offsets * _SHAPE[0] + kinds) * _SHAPE[1] + conditions) * 2
+        cells = self._rows.reshape(-1)
+        np.add.at(cells, flat, 1)
+        np.add.at(cells, flat + 1, positives)
+
+    def retains(self, bucket):
+        """Whether counts for bucket are still kept"""
+        return not self.retention or self.start is None or bucket >= self.start
+
+    def window(self, lo, hi):
+        """Rows for buckets lo..hi-1, zero where nothing was recorded"""
+        out = np.zeros((max(0, hi - lo),) + _SHAPE, dtype=np.int64)
+        if self.start is not None:
+            a, b = max(lo, self.start), min(hi, self.end)
+            if a < b:
+                out[a - lo:b - lo] = self._rows[a - self.start:b - self.start]
+        return out
+
+
+class AnalyticsStore:
+    """Raw event log plus incrementally maintained rollups"""
+
+    def __init__(self, directory=DEFAULT_ANALYTICS_DIR, retention=None, keep_events=True,
+                 max_age_days=MAX_EVENT_AGE_DAYS):
+        self.directory = directory
+        self.keep_events = keep_events
+        self.max_age_days = max_age_days
+        self.events_path = os.path.join(directory, 'events.bin')
+        self.snapshot_path = os.path.join(directory, 'rollups.npz')
+        retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.rollups = {resolution: Rollup(resolution, retention[resolution]) for resolution in RESOLUTIONS}
+        self.events = 0  # events applied to the rollups
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            with np.load(self.snapshot_path) as snapshot:
+                meta = json.loads(str(snapshot['meta']))
+                if meta['kinds'] == EVENT_KINDS and meta['conditions'] == CONDITIONS:
+                    for resolution, rollup in self.rollups.items():
+                        rows = snapshot[resolution]
+                        rollup.start = meta['starts'][resolution]
+                        rollup._rows, rollup.length = rows, len(rows)
+                    self.events = meta['events']
+
+        # Replay events logged after the checkpoint
+        if self.keep_events and os.path.exists(self.events_path):
+            logged = os.path.getsize(self.events_path) // EVENT_DTYPE.itemsize
+            if logged > self.events:
+                log = np.memmap(self.events_path, dtype=EVENT_DTYPE, mode='r', shape=(logged,))
+                for i in range(self.events, logged, CHUNK_EVENTS):
+                    chunk = np.array(log[i:i + CHUNK_EVENTS])
+                    self._apply(chunk['ts'], chunk['kind'], chunk['condition'], chunk['positive'])
+                del log
+                self.save()
+
+    def _apply(self, ts, kinds, conditions, positives):
+        minutes = ts // 60
+        kinds = kinds.astype(np.int64)
+        conditions = conditions.astype(np.int64)
+        positives = positives.astype(np.int64)
+        for resolution in ('minute', 'hour', 'day'):
+            self.rollups[resolution].add(minute_to_bucket(minutes, resolution), kinds, conditions, positives)
+        # Months from days through a small lookup table instead of converting every event
+        days = minutes // 1440
+        first = int(days.min())
+        months = minute_to_bucket(np.arange(first, int(days.max()) + 1) * 1440, 'month')
+        self.rollups['month'].add(months[days - first], kinds, conditions, positives)
+        self.events += len(ts)
+        self._dirty = True
+
+    def ingest(self, ts, kinds, conditions, positives):
+        """Append events (parallel arrays: epoch seconds, kind index, condition index, 0/1) and update rollups"""
+        try:
+            ts = np.asarray(ts, dtype=np.int64)
+        except OverflowError as e:
+            raise ValueError("Event time out of range") from e
+        if not len(ts):
+            return 0
+        kinds = np.asarray(kinds, dtype=np.uint8)
+        conditions = np.asarray(conditions, dtype=np.uint8)
+        positives = np.asarray(positives, dtype=np.uint8)
+        if kinds.max() >= len(EVENT_KINDS) or conditions.max() >= len(CONDITIONS) or positives.max() > 1:
+            raise ValueError("Event kind, condition or outcome out of range")
+        now = int(time.time())
+        if ts.min() < now - self.max_age_days * 86400 or ts.max() > now + MAX_EVENT_AHEAD:
+            raise ValueError(f"Event times must be within the last {self.max_age_days} days "
+                             f"and at most {MAX_EVENT_AHEAD // 3600} hours ahead")
+
+        with self._lock:
+            if self.keep_events:
+                log = np.empty(len(ts), dtype=EVENT_DTYPE)
+                log['ts'], log['kind'], log['condition'], log['positive'] = ts, kinds, conditions, positives
+                with open(self.events_path, 'ab') as f:
+                    f.write(log.tobytes())
+            self._apply(ts, kinds, conditions, positives)
+        return len(ts)
+
+    def ingest_records(self, records):
+        """Ingest JSON events: {"time": ISO or epoch seconds, "kind", "condition", "positive"}"""
+        try:
+            ts = [parse_time(record['time']) for record in records]
+            kinds = [EVENT_KINDS.index(record['kind']) for record in records]
+            conditions = [CONDITIONS.index(record['condition']) for record in records]
+            positives = [1 if record.get('positive') else 0 for record in records]
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid event: {e}") from e
+        return self.ingest(ts, kinds, conditions, positives)
+
+    def save(self):
+        """Checkpoint the rollups atomically"""
+        with self._lock:
+            meta = {'events': self.events, 'kinds': EVENT_KINDS, 'conditions': CONDITIONS,
+                    'starts': {resolution: rollup.start for resolution, rollup in self.rollups.items()}}
+            tmp = self.snapshot_path + '.tmp.npz'
+            np.savez(tmp, meta=json.dumps(meta),
+                     **{resolution: rollup.rows for resolution, rollup in self.rollups.items()})
+            os.replace(tmp, self.snapshot_path)
+            self._saved_at = time.monotonic()
+            self._dirty = False
+
+    def maybe_save(self):
+        """Checkpoint if there are unsaved events and the last checkpoint is SAVE_INTERVAL old"""
+        if self._dirty and time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+            self.save()
+
+    def _kind(self, kind):
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind: {kind}")
+        return EVENT_KINDS.index(kind)
+
+    def series(self, kind, start, end, resolution=None, max_points=DEFAULT_POINTS, by_condition=False):
+        """Counts per bucket over [start, end) epoch seconds.
+
+        Without a resolution, the finest one that still has data for start
+        and needs at most max_points buckets is used.
+        """
+        kind_index = self._kind(kind)
+        lo_minute, hi_minute = start // 60, max(start // 60, (end - 1) // 60)
+        if resolution is None:
+            for resolution in RESOLUTIONS:
+                lo, hi = (int(b) for b in minute_to_bucket([lo_minute, hi_minute], resolution))
+                if hi - lo + 1 <= max_points and self.rollups[resolution].retains(lo):
+                    break
+        elif resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        lo, hi = (int(b) for b in minute_to_bucket([lo_minute, hi_minute], resolution))
+        if hi - lo + 1 > MAX_POINTS:
+            raise ValueError(f"Too many {resolution} buckets requested: {hi - lo + 1}")
+
+        with self._lock:
+            rows = self.rollups[resolution].window(lo, hi + 1)[:, kind_index]
+        result = {
+            'kind': kind,
+            'resolution': resolution,
+            'buckets': [bucket_label(bucket, resolution) for bucket in range(lo, hi + 1)],
+            'events': rows[:, :, 0].sum(axis=1).tolist(),
+            'positives': rows[:, :, 1].sum(axis=1).tolist(),
+            'rows_read': len(rows),
+        }
+        if by_condition:
+            result['conditions'] = {name: rows[:, i, 0].tolist() for i, name in enumerate(CONDITIONS)}
+        return result
+
+    def _cover(self, lo, hi, level, parts):
+        """Split epoch minutes [lo, hi) into whole buckets, coarsest first; appends (resolution, b0, b1).
+
+        An edge older than the finer rollup's retention is rounded outward to
+        a whole bucket of this resolution.
+        """
+        if lo >= hi:
+            return
+        resolution = RESOLUTIONS[level]
+        if not level:
+            parts.append((resolution, lo, hi))
+            return
+        finer = self.rollups[RESOLUTIONS[level - 1]]
+        first, last = (int(b) for b in minute_to_bucket([lo, hi], resolution))
+        if not finer.retains(minute_to_bucket(lo, finer.resolution)):
+            lo = bucket_start(first, resolution)
+        edge = bucket_start(last, resolution)
+        if edge < hi and not finer.retains(minute_to_bucket(edge, finer.resolution)):
+            last += 1
+            hi = bucket_start(last, resolution)
+
+        b0 = first if bucket_start(first, resolution) == lo else first + 1
+        if b0 < last:
+            parts.append((resolution, b0, last))
+            self._cover(lo, bucket_start(b0, resolution), level - 1, parts)
+            self._cover(bucket_start(last, resolution), hi, level - 1, parts)
+        else:
+            self._cover(lo, hi, level - 1, parts)
+
+    def totals(self, kind, start, end):
+        """Totals per condition over [start, end) epoch seconds, rounded to whole minutes.
+
+        Edges older than the minute retention are rounded outward to whole hours.
+        """
+        kind_index = self._kind(kind)
+        parts = []
+        self._cover(start // 60, end // 60, len(RESOLUTIONS) - 1, parts)
+        totals = np.zeros(_SHAPE[1:], dtype=np.int64)
+        rows_read = 0
+        with self._lock:
+            for resolution, b0, b1 in parts:
+                rows = self.rollups[resolution].window(b0, b1)
+                totals += rows[:, kind_index].sum(axis=0)
+                rows_read += len(rows)
+        return {
+            'kind': kind,
+            'events': dict(zip(CONDITIONS, totals[:, 0].tolist())),
+            'positives': dict(zip(CONDITIONS, totals[:, 1].tolist())),
+            'total_events': int(totals[:, 0].sum()),
+            'total_positives': int(totals[:, 1].sum()),
+            'rows_read': rows_read,
+        }
+
+    def stats(self):
+        """Event count and rollup sizes"""
+        with self._lock:
+            return {
+                'events': self.events,
+                'rollups': {resolution: {'buckets': rollup.length, 'bytes': rollup.rows.nbytes,
+                                         'first': bucket_label(rollup.start, resolution) if rollup.length else None}
+                            for resolution, rollup in self.rollups.items()},
+            }
+
+
+def generate_events(count, start, end, seed=42, chunk=CHUNK_EVENTS):
+    """Yield chronological chunks of synthetic events as (ts, kinds, conditions, positives)"""
+    rng = np.random.default_rng(seed)
+    condition_weights = np.linspace(2.0, 0.5, len(CONDITIONS))
+    condition_weights /= condition_weights.sum()
+    span = (end - start) / count
+    for first in range(0, count, chunk):
+        n = min(chunk, count - first)
+        lo = start + int(first * span)
+        hi = max(lo + 1, start + int((first + n) * span))
+        ts = np.sort(rng.integers(lo, hi, n))
+        kinds = (rng.random(n) < 0.2).astype(np.uint8)  # one prediction per four visits
+        conditions = rng.choice(len(CONDITIONS), n, p=condition_weights).astype(np.uint8)
+        # Visits: ~30% new patients; predictions: accuracy creeping from 90% to 95%
+        accuracy = 0.90 + 0.05 * (ts - start) / max(1, end - start)
+        positives = (rng.random(n) < np.where(kinds == 1, accuracy, 0.3)).astype(np.uint8)
+        yield ts, kinds, conditions, positives
+
+
+def seed(store, count, days, seed=42):
+    """Ingest synthetic events covering the last `days` days"""
+    end = int(time.time())
+    for chunk in generate_events(count, end - days * 86400, end, seed=seed):
+        store.ingest(*chunk)
+    store.save()
+
+
+def benchmark(directory, count=100_000_000, days=3 * 365, keep_events=False):
+    """Ingest synthetic events and time chart queries against the rollups"""
+    store = AnalyticsStore(directory, keep_events=keep_events)
+    end = int(time.time())
+    start = end - days * 86400
+    print(f"📊 Ingesting {count:,} events over {days} days in chunks of {CHUNK_EVENTS:,}")
+
+    generating = ingesting = 0.0
+    chunks = generate_events(count, start, end)
+    while True:
+        t0 = time.perf_counter()
+        chunk = next(chunks, None)
+        t1 = time.perf_counter()
+        generating += t1 - t0
+        if chunk is None:
+            break
+        store.ingest(*chunk)
+        ingesting += time.perf_counter() - t1
+    t0 = time.perf_counter()
+    store.save()
+    saving = time.perf_counter() - t0
+    print(f"✅ Ingested in {ingesting:.1f}s ({count / ingesting / 1e6:.1f}M events/s; "
+          f"generating took {generating:.1f}s), checkpoint {saving * 1000:.0f} ms")
+    for resolution, info in store.stats()['rollups'].items():
+        print(f"   {resolution:<7} {info['buckets']:>8,} buckets  {info['bytes'] / 1e6:7.1f} MB")
+
+    queries = {
+        'disease totals, 3 years': lambda: store.totals('visit', start + 3600 * 7 + 59, end),
+        'patient flow, 3 years': lambda: store.series('visit', start, end),
+        'accuracy, 90 days': lambda: store.series('prediction', end - 90 * 86400, end),
+        'visits, 7 days': lambda: store.series('visit', end - 7 * 86400, end),
+        'visits, 2 hours': lambda: store.series('visit', end - 7200, end, by_condition=True),
+    }
+    for label, query in queries.items():
+        samples = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            result = query()
+            samples.append((time.perf_counter() - t0) * 1000)
+        samples.sort()
+        status = '✅' if samples[len(samples) // 2] < 20 else '❌'
+        detail = result.get('resolution', 'mixed')
+        print(f"{status} {label:<24} p50 {samples[len(samples) // 2]:6.2f} ms  "
+              f"{result['rows_read']:>4} rows ({detail})")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analytics event rollups')
+    parser.add_argument('--dir', default=DEFAULT_ANALYTICS_DIR, help='Event log and rollup directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='Ingest synthetic events')
+    seed_parser.add_argument('--count', type=int, default=1_000_000)
+    seed_parser.add_argument('--days', type=int, default=365)
+    seed_parser.add_argument('--seed', type=int, default=42)
+
+    bench_parser = subparsers.add_parser('benchmark', help='Ingest synthetic events and time queries')
+    bench_parser.add_argument('--count', type=int, default=100_000_000)
+    bench_parser.add_argument('--days', type=int, default=3 * 365)
+    bench_parser.add_argument('--keep-events', action='store_true', help='Also write the raw event log')
+
+    subparsers.add_parser('stats', help='Show rollup sizes')
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        start = time.perf_counter()
+        seed(AnalyticsStore(args.dir), args.count, args.days, seed=args.seed)
+        print(f"✅ Seeded {args.count:,} events in {time.perf_counter() - start:.1f}s")
+    elif args.command == 'benchmark':
+        benchmark(args.dir, args.count, args.days, keep_events=args.keep_events)
+    elif args.command == 'stats':
+        print(json.dumps(AnalyticsStore(args.dir).stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+"""
+Appointment Scheduler - per-clinician booking index for the Healthcare AI Platform
+Each clinician's appointments are kept as parallel arrays sorted by start
+time. Bookings never overlap, so the end times are sorted too, and both
+conflict detection and listing a time range are binary searches.
+
+Times are indexed on a working-minute axis: clinic hours of consecutive
+days are laid end to end, so closing time does not count as free time and
+a fully booked day contributes no gaps. Finding the next free slot of a
+given length looks for the first gap between bookings that is long enough.
+Calendars with more than TREE_MIN_BOOKINGS appointments keep a max-gap
+segment tree for that search, so it takes O(log n) however many bookings it
+has to skip. The tree is built with NumPy on the first search and then kept
+up to date: after a booking or cancellation the later leaves are moved
+(one memmove, like the arrays themselves) and only the changed gaps and the
+ancestors of the moved leaves are recomputed. Booking at the end is O(log n).
+
+Bookings and cancellations are written to SQLite before the in-memory
+calendars change, so a failed write leaves both as they were.
+
+Appointments are stored in SQLite and loaded into memory at startup.
+"""
+
+import argparse
+import bisect
+import os
+import random
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+
+from analytics_store import parse_time
+from paths import HEALTHCARE_DIR
+from sqlite_connections import ThreadConnections
+
+DEFAULT_DB_PATH = os.path.join(HEALTHCARE_DIR, 'appointments.db')
+OPEN_MINUTE = 8 * 60     # clinic hours, minutes after midnight UTC
+CLOSE_MINUTE = 18 * 60
+DAY_MINUTES = 24 * 60
+TREE_MIN_BOOKINGS = 64   # below this, gaps are scanned directly
+MAX_FREE_SLOTS = 50
+MAX_RANGE_APPOINTMENTS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS appointments (
+    clinician TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    patient TEXT,
+    PRIMARY KEY (clinician, start)
+) WITHOUT ROWID;
+"""
+
+
+class BookingConflict(Exception):
+    """The requested time overlaps an existing appointment"""
+
+    def __init__(self, appointment):
+        super().__init__(f"Conflicts with appointment {appointment['id']}")
+        self.appointment = appointment
+
+
+def minute_iso(minute):
+    return datetime.fromtimestamp(minute * 60, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def appointment_id(clinician, start):
+    """Appointment ids are the clinician id and start minute, e.g. CLN000042@29034720"""
+    return f"{clinician}@{start}"
+
+
+def parse_appointment_id(value):
+    clinician, _, start = str(value).rpartition('@')
+    try:
+        return clinician, int(start)
+    except ValueError as e:
+        raise ValueError(f"Invalid appointment id: {value}") from e
+
+
+class Calendar:
+    """One clinician's appointments as arrays sorted by start, on the working-minute axis"""
+
+    __slots__ = ('starts', 'ends', 'patients', '_tree', '_size')
+
+    def __init__(self):
+        self.starts = array('q')
+        self.ends = array('q')
+        self.patients = []
+        self._tree = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlapping(self, start, end):
+        """Index of an appointment overlapping [start, end), or None"""
+        i = bisect.bisect_right(self.starts, start)
+        if i and self.ends[i - 1] > start:
+            return i - 1
+        if i < len(self.starts) and self.starts[i] < end:
+            return i
+        return None
+
+    def insert(self, start, end, patient):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.patients.insert(i, patient)
+        self._update_tree(i, len(self.starts), shift=1)
+
+    def merge(self, bookings):
+        """Add (start, end, patient) bookings, sorted and free of conflicts, in one pass"""
+        if self.starts and bookings[0][0] < self.starts[-1]:
+            if len(bookings) < len(self.starts) // 4:
+                for start, end, patient in bookings:
+                    self.insert(start, end, patient)
+                return
+            bookings = sorted(list(zip(self.starts, self.ends, self.patients)) + bookings)
+            self.starts, self.ends, self.patients = array('q'), array('q'), []
+            self._tree = None
+        first = len(self.starts)
+        self.starts.extend(b[0] for b in bookings)
+        self.ends.extend(b[1] for b in bookings)
+        self.patients.extend(b[2] for b in bookings)
+        self._update_tree(first, len(self.starts))
+
+    def remove(self, start):
+        i = bisect.bisect_left(self.starts, start)
+        if i == len(self.starts) or self.starts[i] != start:
+            raise KeyError(start)
+        del self.starts[i], self.ends[i], self.patients[i]
+        self._update_tree(i, len(self.starts) + 1, shift=-1)
+
+    def between(self, start, end):
+        """Index range of the appointments overlapping [start, end)"""
+        return bisect.bisect_right(self.ends, start), bisect.bisect_left(self.starts, end)
+
+    def next_free(self, after, duration, day_length):
+        """Start of the first free [s, s + duration) with s >= after that fits in one day's hours"""
+        starts, ends = self.starts, self.ends
+        i = bisect.bisect_right(starts, after)
+        if i and ends[i - 1] > after:
+            after = ends[i - 1]
+        while True:
+            # The gap from `after` to appointment i (open-ended after the last one)
+            slot = after
+            if slot // day_length != (slot + duration - 1) // day_length:
+                slot = (slot // day_length + 1) * day_length
+            if i == len(starts) or slot + duration <= starts[i]:
+                return slot
+            i = self._next_gap(i + 1, duration)
+            after = ends[i - 1]
+
+    def _next_gap(self, lo, duration):
+        """Smallest i >= lo whose gap to the previous appointment is >= duration (len if none)"""
+        n = len(self.starts)
+        if lo >= n:
+            return n
+        if n < TREE_MIN_BOOKINGS:
+            return self._scan_gap(lo, duration)
+        if self._tree is None:
+            self._build_tree()
+        tree, size = self._tree, self._size
+        node = lo + size
+        while tree[node] < duration:
+            while node & 1:
+                node >>= 1
+            if node == 0:
+                return n
+            node += 1
+        while node < size:
+            node = 2 * node if tree[2 * node] >= duration else 2 * node + 1
+        return node - size
+
+    def _scan_gap(self, lo, duration):
+        starts, ends = self.starts, self.ends
+        for i in range(lo, len(starts)):
+            if starts[i] - ends[i - 1] >= duration:
+                return i
+        return len(starts)
+
+    def _build_tree(self):
+        """Max-gap segment tree; leaf i is the gap between appointments i - 1 and i"""
+        n = len(self.starts)
+        size = 1 << (n - 1).bit_length()
+        tree = np.full(2 * size, -1, dtype=np.int64)
+        # Copies, so no buffer export keeps the arrays from being resized later
+        starts = np.array(self.starts, dtype=np.int64)
+        ends = np.array(self.ends, dtype=np.int64)
+        tree[size + 1:size + n] = starts[1:] - ends[:-1]
+        level = size // 2
+        while level:
+            tree[level:2 * level] = np.maximum(tree[2 * level:4 * level:2], tree[2 * level + 1:4 * level:2])
+            level //= 2
+        self._tree, self._size = tree, size
+
+    def _update_tree(self, lo, hi, shift=0):
+        """Refresh leaves lo..hi-1 and their ancestors after the arrays changed from index lo.
+
+        shift is 1 after an insert at lo and -1 after a removal: the later
+        leaves keep their gaps, so they are moved and only the gaps next to
+        lo are recomputed.
+        """
+        if self._tree is None or lo >= hi:
+            return
+        tree, size = self._tree, self._size
+        if hi > size:
+            self._tree = None  # out of leaves: rebuilt at twice the size on the next search
+            return
+        n = len(self.starts)
+        if shift > 0:
+            tree[size + lo + 1:size + n] = tree[size + lo:size + n - 1]
+            first, last = lo, min(lo + 2, n)
+        elif shift < 0:
+            tree[size + lo:size + n] = tree[size + lo + 1:size + n + 1]
+            tree[size + n] = -1
+            first, last = lo, min(lo + 1, n)
+        else:
+            first, last = lo, n
+        first = max(first, 1)
+        if first < last:
+            # Slices of the arrays are copies, so no buffer export outlives this call
+            starts = np.frombuffer(self.starts[first:last], dtype=np.int64)
+            ends = np.frombuffer(self.ends[first - 1:last - 1], dtype=np.int64)
+            tree[size + first:size + last] = starts - ends
+        tree[size] = -1  # appointment 0 has no gap before it
+        lo, hi = (size + lo) // 2, (size + hi - 1) // 2
+        while lo:
+            tree[lo:hi + 1] = np.maximum(tree[2 * lo:2 * hi + 2:2], tree[2 * lo + 1:2 * hi + 2:2])
+            lo, hi = lo // 2, hi // 2
+
+
+class AppointmentScheduler:
+    """Books, cancels and finds free slots for clinicians' appointments"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, open_minute=OPEN_MINUTE, close_minute=CLOSE_MINUTE):
+        if not 0 <= open_minute < close_minute <= DAY_MINUTES:
+            raise ValueError("Clinic hours must be within one day")
+        self.db_path = db_path
+        self.open_minute = open_minute
+        self.day_length = close_minute - open_minute
+        self.calendars = {}
+        self.appointments = 0
+        self._per_day = Counter()
+        self._lock = threading.Lock()
+        self._connections = ThreadConnections(db_path)
+        if db_path is not None:
+            self.connection().executescript(SCHEMA)
+            self._load()
+
+    def connection(self):
+        """Return this thread's SQLite connection, opening it on first use"""
+        return self._connections.get()
+
+    def _load(self):
+        rows = self.connection().execute(
+            'SELECT clinician, start, end, patient FROM appointments ORDER BY clinician, start')
+        calendar, current = None, None
+        for clinician, start, end, patient in rows:
+            if clinician != current:
+                calendar = self.calendars[clinician] = Calendar()
+                current = clinician
+            calendar.starts.append(self.to_axis(start))
+            calendar.ends.append(self.to_axis(end))
+            calendar.patients.append(patient)
+            self._per_day[start // DAY_MINUTES] += 1
+            self.appointments += 1
+
+    # Clock minutes <-> working minutes
+
+    def to_axis(self, minute):
+        """Working minute of a clock minute; closed hours map to the next opening"""
+        day, offset = divmod(minute, DAY_MINUTES)
+        return day * self.day_length + min(max(offset - self.open_minute, 0), self.day_length)
+
+    def from_axis(self, position, end=False):
+        day, offset = divmod(position, self.day_length)
+        if end and offset == 0:
+            day, offset = day - 1, self.day_length
+        return day * DAY_MINUTES + self.open_minute + offset
+
+    def _appointment(self, clinician, calendar, i):
+        start = self.from_axis(calendar.starts[i])
+        return {
+            'id': appointment_id(clinician, start),
+            'clinician': clinician,
+            'start': minute_iso(start),
+            'end': minute_iso(self.from_axis(calendar.ends[i], end=True)),
+            'patient': calendar.patients[i],
+        }
+
+    def _parse_booking(self, clinician, start, duration):
+        """(clinician, clock start minute, duration) validated against clinic hours"""
+        clinician = str(clinician or '').strip()
+        if not clinician or '@' in clinician:
+            raise ValueError("A clinician id without '@' is required")
+        if start is None:
+            raise ValueError("start is required")
+        start = parse_time(start) // 60
+        try:
+            duration = int(duration)
+        except (TypeError, ValueError) as e:
+            raise ValueError("duration must be a number of minutes") from e
+        offset = start % DAY_MINUTES - self.open_minute
+        if not 0 < duration <= self.day_length:
+            raise ValueError(f"Duration must be between 1 and {self.day_length} minutes")
+        if offset < 0 or offset + duration > self.day_length:
+            raise ValueError("Appointments must fall within clinic hours")
+        return clinician, start, duration
+
+    def book(self, clinician, start, duration, patient=None):
+        """Book one appointment; raises BookingConflict if the clinician is busy then"""
+        clinician, start, duration = self._parse_booking(clinician, start, duration)
+        patient = None if patient is None else str(patient)
+        lo = self.to_axis(start)
+        with self._lock:
+            # Not `or Calendar()`: a calendar whose appointments were all cancelled is empty, hence falsy
+            calendar = self.calendars.get(clinician)
+            if calendar is None:
+                calendar = self.calendars[clinician] = Calendar()
+            conflict = calendar.overlapping(lo, lo + duration)
+            if conflict is not None:
+                raise BookingConflict(self._appointment(clinician, calendar, conflict))
+            self._stored([(clinician, start, start + duration, patient)])
+            calendar.insert(lo, lo + duration, patient)
+            return self._appointment(clinician, calendar, bisect.bisect_left(calendar.starts, lo))
+
+    def book_many(self, requests):
+        """Book a list of {"clinician", "start", "duration", "patient"}; one result per request.
+
+        Requests are grouped by clinician and sorted, so each calendar is
+        checked and merged once and everything is stored in one transaction.
+        Requests that conflict, with existing appointments or with an earlier
+        request in the batch, are skipped and reported.
+        """
+        results = [None] * len(requests)
+        groups = {}
+        for index, request in enumerate(requests):
+            try:
+                if not isinstance(request, dict):
+                    raise ValueError("Each appointment must be an object")
+                clinician, start, duration = self._parse_booking(
+                    request.get('clinician'), request.get('start'), request.get('duration'))
+            except ValueError as e:
+                results[index] = {'error': str(e)}
+                continue
+            lo = self.to_axis(start)
+            patient = request.get('patient')
+            groups.setdefault(clinician, []).append(
+                (lo, lo + duration, index, None if patient is None else str(patient), start))
+
+        rows, merges = [], []
+        with self._lock:
+            for clinician, bookings in groups.items():
+                bookings.sort()
+                calendar = self.calendars.get(clinician)
+                if calendar is None:
+                    calendar = self.calendars[clinician] = Calendar()
+                accepted, previous_end = [], None
+                for lo, hi, index, patient, start in bookings:
+                    conflict = calendar.overlapping(lo, hi)
+                    if conflict is not None:
+                        results[index] = {'error': 'conflict',
+                                          'conflict': self._appointment(clinician, calendar, conflict)['id']}
+                        continue
+                    if previous_end is not None and lo < previous_end:
+                        results[index] = {'error': 'conflict', 'conflict': 'earlier request in this batch'}
+                        continue
+                    previous_end = hi
+                    accepted.append((lo, hi, patient))
+                    rows.append((clinician, start, start + hi - lo, patient))
+                    results[index] = {'id': appointment_id(clinician, start)}
+                if accepted:
+                    merges.append((calendar, accepted))
+            self._stored(rows)
+            for calendar, accepted in merges:
+                calendar.merge(accepted)
+        return results
+
+    def _stored(self, rows):
+        """Persist new (clinician, start, end, patient) rows and count them (lock held)"""
+        if self.db_path is not None and rows:
+            with self.connection() as conn:
+                conn.executemany('INSERT INTO appointments (clinician, start, end, patient) VALUES (?, ?, ?, ?)',
+                                 rows)
+        for row in rows:
+            self._per_day[row[1] // DAY_MINUTES] += 1
+        self.appointments += len(rows)
+
+    def cancel(self, value):
+        """Cancel an appointment by id; returns it, or None if there is no such appointment"""
+        clinician, start = parse_appointment_id(value)
+        with self._lock:
+            calendar = self.calendars.get(clinician)
+            position = self.to_axis(start)
+            if calendar is None or self.from_axis(position) != start:
+                return None
+            i = bisect.bisect_left(calendar.starts, position)
+            if i == len(calendar) or calendar.starts[i] != position:
+                return None
+            appointment = self._appointment(clinician, calendar, i)
+            if self.db_path is not None:
+                with self.connection() as conn:
+                    conn.execute('DELETE FROM appointments WHERE clinician = ? AND start = ?', (clinician, start))
+            calendar.remove(position)
+            self._per_day[start // DAY_MINUTES] -= 1
+            self.appointments -= 1
+            return appointment
+
+    def list_appointments(self, clinician, start, end):
+        """Appointments of one clinician overlapping [start, end), at most MAX_RANGE_APPOINTMENTS"""
+        lo, hi = self.to_axis(parse_time(start) // 60), self.to_axis(parse_time(end) // 60)
+        with self._lock:
+            calendar = self.calendars.get(str(clinician))
+            if calendar is None:
+                return []
+            first, last = calendar.between(lo, hi)
+            last = min(last, first + MAX_RANGE_APPOINTMENTS)
+            return [self._appointment(clinician, calendar, i) for i in range(first, last)]
+
+    def next_free(self, clinician, after, duration, count=1):
+        """The next `count` free slots of `duration` minutes at or after `after`"""
+        duration, count = int(duration), min(max(int(count), 1), MAX_FREE_SLOTS)
+        if not 0 < duration <= self.day_length:
+            raise ValueError(f"Duration must be between 1 and {self.day_length} minutes")
+        position = self.to_axis(-(-parse_time(after) // 60))  # rounded up to the minute
+        slots = []
+        with self._lock:
+            calendar = self.calendars.get(str(clinician))
+            if calendar is None:
+                calendar = Calendar()
+            for _ in range(count):
+                position = calendar.next_free(position, duration, self.day_length)
+                slots.append({'start': minute_iso(self.from_axis(position)),
+                              'end': minute_iso(self.from_axis(position + duration, end=True))})
+                position += duration
+        return slots
+
+    def stats(self, day=None):
+        """Clinician and appointment counts, plus appointments on `day` (default today, UTC)"""
+        day = int(time.time() // 86400) if day is None else day
+        return {
+            'clinicians': len(self.calendars),
+            'appointments': self.appointments,
+            'today': self._per_day.get(day, 0),
+            'clinic_hours': f"{minute_iso(self.open_minute)[11:16]}-"
+                            f"{minute_iso(self.open_minute + self.day_length)[11:16]}",
+        }
+
+
+def synthetic_requests(clinicians, count, days, seed=42, start_day=None, slot=15):
+    """`count` booking requests spread over `clinicians` and `days` on a `slot`-minute grid"""
+    rng = random.Random(seed)
+    start_day = int(time.time() // 86400) if start_day is None else start_day
+    slots_per_day = (CLOSE_MINUTE - OPEN_MINUTE) // slot
+    for _ in range(count):
+        day = start_day + rng.randrange(days)
+        minute = day * DAY_MINUTES + OPEN_MINUTE + rng.randrange(slots_per_day) * slot
+        yield {
+            'clinician': f"CLN{rng.randrange(clinicians):06d}",
+            'start': minute * 60,
+            'duration': slot * rng.choice((1, 1, 2)),
+            'patient': f"MRN{rng.randrange(1, 10 ** 6):08d}",
+        }
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _time_free_slot(scheduler, clinician, after, duration, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scheduler.next_free(clinician, after, duration)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def benchmark(clinicians=100_000, appointments=2_000_000, days=30, queries=20_000, batch=100_000):
+    """Bulk booking and free-slot search rates, in memory"""
+    scheduler = AppointmentScheduler(db_path=None)
+    today = int(time.time() // 86400)
+    requests = synthetic_requests(clinicians, appointments, days, start_day=today)
+
+    booked, seconds = 0, 0.0
+    while True:
+        chunk = [r for _, r in zip(range(batch), requests)]
+        if not chunk:
+            break
+        start = time.perf_counter()
+        results = scheduler.book_many(chunk)
+        seconds += time.perf_counter() - start
+        booked += sum('id' in result for result in results)
+    print(f"📅 Bulk booked {booked:,} of {appointments:,} requests for {len(scheduler.calendars):,} clinicians "
+          f"in {seconds:.1f}s ({appointments / seconds:,.0f} requests/s)")
+
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(queries):
+        clinician = f"CLN{rng.randrange(clinicians):06d}"
+        after = (today + rng.randrange(days)) * 86400 + rng.randrange(86400)
+        t = time.perf_counter()
+        scheduler.next_free(clinician, after, rng.choice((15, 30, 60)))
+        latencies.append((time.perf_counter() - t) * 1e6)
+    print(f"🔎 Next free slot: p50 {_percentile(latencies, 50):.1f} µs, p99 {_percentile(latencies, 99):.1f} µs "
+          f"over {queries:,} random queries")
+
+    # One clinician booked solid: 40-minute appointments with 10-minute breaks, so a
+    # 30-minute slot is only free after the last one. The search skips every booking.
+    print("📈 Next 30-minute slot for a clinician booked solid with n appointments:")
+    for n in (100, 1_000, 10_000, 100_000, 1_000_000):
+        solid = AppointmentScheduler(db_path=None)
+        per_day = solid.day_length // 50
+        solid.book_many([{'clinician': 'SOLID', 'duration': 40,
+                          'start': ((today + i // per_day) * DAY_MINUTES + OPEN_MINUTE + i % per_day * 50) * 60}
+                         for i in range(n)])
+        calendar = solid.calendars['SOLID']
+        after = today * 86400 + OPEN_MINUTE * 60
+        solid.next_free('SOLID', after, 30)  # builds the gap tree
+        tree = _time_free_slot(solid, 'SOLID', after, 30, 1000)
+        scan_start = time.perf_counter()
+        calendar._scan_gap(1, 30)
+        scan = (time.perf_counter() - scan_start) * 1e6
+        print(f"   n={n:>9,}: gap tree {tree:6.1f} µs   linear scan {scan:12,.1f} µs")
+
+    # Book a 5-minute appointment in a random break of a solid calendar, then search
+    # again. Compares updating the tree in place with rebuilding it after each booking.
+    print("🔁 Book in a random break, then find the next 30-minute slot (per booking + search):")
+    for n in (1_000, 10_000, 100_000, 1_000_000):
+        timings = []
+        for rebuild in (False, True):
+            solid = AppointmentScheduler(db_path=None)
+            per_day = solid.day_length // 50
+            solid.book_many([{'clinician': 'SOLID', 'duration': 40,
+                              'start': ((today + i // per_day) * DAY_MINUTES + OPEN_MINUTE + i % per_day * 50) * 60}
+                             for i in range(n)])
+            calendar = solid.calendars['SOLID']
+            after = today * 86400 + OPEN_MINUTE * 60
+            solid.next_free('SOLID', after, 30)
+            breaks = random.Random(2).sample(range(n), 200)
+            start = time.perf_counter()
+            for i in breaks:
+                minute = (today + i // per_day) * DAY_MINUTES + OPEN_MINUTE + i % per_day * 50 + 40
+                solid.book('SOLID', minute * 60, 5)
+                if rebuild:
+                    calendar._tree = None
+                solid.next_free('SOLID', after, 30)
+            timings.append((time.perf_counter() - start) / len(breaks) * 1e6)
+        print(f"   n={n:>9,}: in-place update {timings[0]:9,.1f} µs   rebuild {timings[1]:9,.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Appointment scheduler tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='Book synthetic appointments')
+    seed_parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    seed_parser.add_argument('--clinicians', type=int, default=200)
+    seed_parser.add_argument('--appointments', type=int, default=20_000)
+    seed_parser.add_argument('--days', type=int, default=30)
+
+    free_parser = subparsers.add_parser('free', help='Find the next free slots of a clinician')
+    free_parser.add_argument('clinician')
+    free_parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    free_parser.add_argument('--after', default=None, help='ISO time or epoch seconds (default: now)')
+    free_parser.add_argument('--duration', type=int, default=30)
+    free_parser.add_argument('--count', type=int, default=5)
+
+    bench_parser = subparsers.add_parser('benchmark', help='Measure booking and free-slot search in memory')
+    bench_parser.add_argument('--clinicians', type=int, default=100_000)
+    bench_parser.add_argument('--appointments', type=int, default=2_000_000)
+    bench_parser.add_argument('--days', type=int, default=30)
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        scheduler = AppointmentScheduler(args.db)
+        start = time.perf_counter()
+        results = scheduler.book_many(list(synthetic_requests(args.clinicians, args.appointments, args.days)))
+        booked = sum('id' in result for result in results)
+        print(f"✅ Booked {booked:,} appointments ({len(results) - booked:,} conflicts skipped) "
+              f"in {time.perf_counter() - start:.1f}s")
+        print(f"📊 {scheduler.stats()}")
+    elif args.command == 'free':
+        scheduler = AppointmentScheduler(args.db)
+        after = args.after if args.after is not None else int(time.time())
+        for slot in scheduler.next_free(args.clinician, after, args.duration, args.count):
+            print(f"🕒 {slot['start']} - {slot['end']}")
+    else:
+        benchmark(args.clinicians, args.appointments, args.days)
+
+
+if __name__ == '__main__':
+    main()
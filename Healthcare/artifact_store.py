@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Content-addressed artifact store for generated figures and PDFs
+Blobs are stored once under their SHA-256; build keys (source hash, parameters
+and library versions) map to the set of files a build produced, so a repeat
+build restores its outputs instead of rendering. The published index maps
+plain file names to the blob currently served for them.
+
+Layout under the store root:
+
+    objects/ab/abcdef...        file contents, named by SHA-256
+    keys/<key>.json             {"files": {"name.png": "<sha256>"}, "created": ...}
+    published.json              {"name.png": "<sha256>"}
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from paths import ARTIFACT_DIR
+
+CHUNK_SIZE = 1024 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REFERENCE_RE = re.compile(r'\b(src|href|srcset)="([^"]+)"')
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def package_versions(packages):
+    """'name==version' for each installed package, 'name==missing' otherwise"""
+    from importlib import metadata
+
+    versions = []
+    for package in packages:
+        try:
+            versions.append(f"{package}=={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}==missing")
+    return versions
+
+
+def cache_key(kind, source_hash, params=None, packages=()):
+    """Build key for one artifact set: what it is, what it was made from and with what"""
+    digest = hashlib.sha256()
+    for part in [kind, source_hash, json.dumps(params or {}, sort_keys=True)] + package_versions(packages):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Content-addressed blobs plus build-key and published-name indexes"""
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+        self._published = None
+        self._published_mtime = None
+        self._disk_digests = {}  # path -> (mtime_ns, size, digest)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def _key_path(self, key):
+        return os.path.join(self.root, 'keys', f"{key}.json")
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def add_file(self, path):
+        """Copy a file into the store (once per content) and return its digest"""
+        digest = file_digest(path)
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            shutil.copyfile(path, blob + '.tmp')
+            os.replace(blob + '.tmp', blob)
+        return digest
+
+    def get(self, key):
+        """The file manifest for a build key, or None if missing or incomplete"""
+        try:
+            with open(self._key_path(key), 'r') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not all(os.path.exists(self.blob_path(d)) for d in manifest['files'].values()):
+            return None
+        return manifest
+
+    def put(self, key, paths, meta=None):
+        """Record the files one build produced under its key and publish them"""
+        files = {os.path.basename(path): self.add_file(path) for path in paths}
+        self._write_json(self._key_path(key), {
+            'files': files, 'created': time.time(), 'meta': meta or {},
+        })
+        self.publish(files)
+        return files
+
+    def restore(self, key, paths):
+        """Copy a cached build's files to paths; returns False on a miss.
+
+        Files are matched by base name, and all of them must be in the
+        cached build for it to count as a hit.
+        """
+        manifest = self.get(key)
+        if manifest is None:
+            return False
+        files = manifest['files']
+        if not all(os.path.basename(path) in files for path in paths):
+            return False
+        for path in paths:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            shutil.copyfile(self.blob_path(files[os.path.basename(path)]), path + '.tmp')
+            os.replace(path + '.tmp', path)
+        self.publish({os.path.basename(path): files[os.path.basename(path)] for path in paths})
+        return True
+
+    def published(self):
+        """Name -> digest of the artifacts currently served, re-read when it changes"""
+        path = os.path.join(self.root, 'published.json')
+        try:
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            return {}
+        if mtime != self._published_mtime:
+            with open(path, 'r') as f:
+                self._published = json.load(f)
+            self._published_mtime = mtime
+        return self._published
+
+    def publish(self, files):
+        published = dict(self.published())
+        published.update(files)
+        self._write_json(os.path.join(self.root, 'published.json'), published)
+
+    def current_digest(self, name, base_dir=None):
+        """Digest to serve for a published name, or None to serve the file in base_dir.
+
+        A file of that name in base_dir that differs from the published blob
+        (edited or rebuilt without the store) wins: it is served as its own
+        blob when the store has one, otherwise as the plain file.
+        """
+        digest = self.published().get(name)
+        if digest is None or base_dir is None:
+            return digest
+        path = os.path.join(base_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return digest
+        cached = self._disk_digests.get(path)
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            cached = self._disk_digests[path] = (stat.st_mtime_ns, stat.st_size, file_digest(path))
+        on_disk = cached[2]
+        if on_disk == digest or os.path.exists(self.blob_path(on_disk)):
+            return on_disk
+        return None
+
+    def url_for(self, name, base_dir=None):
+        """Immutable URL for a published name, or None"""
+        digest = self.current_digest(name, base_dir)
+        if digest is None:
+            return None
+        return f"/artifacts/{digest}{os.path.splitext(name)[1]}"
+
+    def rewrite_references(self, html, base_dir=None):
+        """Point src/href/srcset references at immutable artifact URLs where published"""
+        def rewrite_url(url):
+            return self.url_for(url, base_dir) or url
+
+        def replace(match):
+            attribute, value = match.groups()
+            if attribute == 'srcset':
+                parts = []
+                for part in value.split(','):
+                    tokens = part.split()
+                    if tokens:
+                        tokens[0] = rewrite_url(tokens[0])
+                    parts.append(' '.join(tokens))
+                value = ', '.join(parts)
+            else:
+                value = rewrite_url(value)
+            return f'{attribute}="{value}"'
+
+        return REFERENCE_RE.sub(replace, html)
+
+    def gc(self, max_age_days=None):
+        """Drop build keys older than max_age_days, then blobs nothing refers to.
+
+        Published blobs are always kept. Returns (keys removed, blobs removed).
+        """
+        keys_dir = os.path.join(self.root, 'keys')
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        referenced = set(self.published().values())
+        removed_keys = 0
+        for name in os.listdir(keys_dir) if os.path.isdir(keys_dir) else []:
+            path = os.path.join(keys_dir, name)
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            if cutoff is not None and manifest['created'] < cutoff:
+                os.remove(path)
+                removed_keys += 1
+            else:
+                referenced.update(manifest['files'].values())
+
+        removed_blobs = 0
+        objects_dir = os.path.join(self.root, 'objects')
+        for dirpath, _, filenames in os.walk(objects_dir):
+            for name in filenames:
+                if name not in referenced:
+                    os.remove(os.path.join(dirpath, name))
+                    removed_blobs += 1
+        return removed_keys, removed_blobs
+
+    def stats(self):
+        objects_dir = os.path.join(self.root, 'objects')
+        count = size = 0
+        for dirpath, _, filenames in os.walk(objects_dir):
+            for name in filenames:
+                count += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+        keys_dir = os.path.join(self.root, 'keys')
+        keys = len(os.listdir(keys_dir)) if os.path.isdir(keys_dir) else 0
+        return {'keys': keys, 'blobs': count, 'bytes': size, 'published': len(self.published())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and clean the artifact store')
+    parser.add_argument('--root', default=ARTIFACT_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='Show store size')
+    gc_parser = subparsers.add_parser('gc', help='Remove old build keys and unreferenced blobs')
+    gc_parser.add_argument('--max-age-days', type=float, default=None)
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.root)
+    if args.command == 'stats':
+        stats = store.stats()
+        print(f"📦 {args.root}: {stats['keys']} builds, {stats['blobs']} blobs "
+              f"({stats['bytes'] / (1024 * 1024):.1f} MB), {stats['published']} published names")
+    else:
+        keys, blobs = store.gc(args.max_age_days)
+        print(f"🧹 Removed {keys} builds and {blobs} blobs")
+
+
+if __name__ == '__main__':
+    main()
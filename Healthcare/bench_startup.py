@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the figure and thesis scripts
+Runs `python -X importtime` on each script module and reports the import cost
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ['generate_diagrams', 'generate_thesis_pdf', 'diagram_build']
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module_name):
+    """Import a module in a fresh interpreter.
+
+    Returns the module's cumulative import time in microseconds and the
+    cumulative time of each of its direct imports.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+        cwd=SCRIPT_DIR, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package (indented by depth)
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+
+    # importtime prints children before their parent, so walk back from the module's line
+    for index in range(len(entries) - 1, -1, -1):
+        depth, name, cumulative = entries[index]
+        if name == module_name:
+            break
+    else:
+        raise LookupError(f"{module_name} not found in importtime output")
+
+    children = {}
+    for child_depth, child_name, child_cumulative in reversed(entries[:index]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 1:
+            children[child_name] = child_cumulative
+    return cumulative, children
+
+
+def benchmark(modules, runs=5, top=5):
+    """Return the median import time in ms of each module over several runs"""
+    medians = {}
+    for module_name in modules:
+        samples = []
+        children = {}
+        for _ in range(runs):
+            cumulative, children = import_profile(module_name)
+            samples.append(cumulative / 1000)
+        medians[module_name] = statistics.median(samples)
+
+        print(f"📦 {module_name}: {medians[module_name]:.1f} ms (median of {runs})")
+        heaviest = sorted(children.items(), key=lambda item: item[1], reverse=True)[:top]
+        for name, us in heaviest:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+    return medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure script import time')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Fail if any module takes longer than this to import')
+    args = parser.parse_args()
+
+    medians = benchmark(args.modules, runs=args.runs)
+    if args.max_ms is not None:
+        slow = {name: ms for name, ms in medians.items() if ms > args.max_ms}
+        if slow:
+            for name, ms in slow.items():
+                print(f"❌ {name} import took {ms:.1f} ms (budget {args.max_ms:.1f} ms)")
+            sys.exit(1)
+        print(f"✅ All modules import within {args.max_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Make-style build runner for the healthcare documents: figures -> HTML -> PDF
+Knows which figures each page embeds, rebuilds only targets whose inputs
+changed, runs independent targets in parallel and logs per-target timings.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import time
+
+from paths import HEALTHCARE_DIR, OUTPUT_DIR
+
+STATE_NAME = '.build_state.json'
+LOG_NAME = '.build_log.jsonl'
+
+# Sources every figure depends on besides its own function
+FIGURE_SOURCES = ['figure_export.py', 'layered_diagram.py', 'cohort_simulation.py']
+
+# Libraries whose versions are part of an artifact's store key
+FIGURE_PACKAGES = ['matplotlib', 'seaborn', 'numpy', 'pillow']
+DOCUMENT_PACKAGES = ['weasyprint', 'pypdf', 'pillow', 'fonttools']
+
+# (name, html, pdf, (module, function), stylesheets, extra figure dependencies)
+DOCUMENTS = [
+    ('thesis', 'phd_thesis.html', 'Future_Healthcare_AI_PhD_Thesis.pdf',
+     ('generate_thesis_pdf', 'convert_html_to_pdf'), ['print.css'],
+     ['aws_architecture', 'real_time_use_case']),
+    ('thesis_fixed', 'phd_thesis.html', 'Future_Healthcare_AI_PhD_Thesis_Fixed.pdf',
+     ('fix_pdf', 'generate_pdf'), [], []),
+    ('enhanced_whitepaper', 'enhanced_whitepaper.html', 'Future_Healthcare_AI_Enhanced_Whitepaper.pdf',
+     ('build', 'render_document'), ['print.css'], []),
+    ('whitepaper', 'healthcare_ai_whitepaper.html', 'Future_Healthcare_AI_Whitepaper.pdf',
+     ('build', 'render_document'), ['print.css'], []),
+]
+
+REFERENCE_RE = re.compile(r'\b(src|href|srcset)="([^"]+)"')
+
+
+class Target:
+    """One node of the build graph"""
+
+    def __init__(self, name, action, outputs, inputs=(), deps=(), fingerprint='', packages=()):
+        self.name = name
+        self.action = action  # (module, function, kwargs), run in a worker process
+        self.outputs = list(outputs)
+        self.inputs = list(inputs)
+        self.deps = list(deps)
+        self.fingerprint = fingerprint
+        self.packages = list(packages)
+
+    def signature(self):
+        """Hash of the fingerprint and the current content of every input file"""
+        digest = hashlib.sha256(f"{self.name}\0{self.fingerprint}\0".encode('utf-8'))
+        for path in sorted(self.inputs):
+            digest.update(path.encode('utf-8'))
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+            except FileNotFoundError:
+                digest.update(b'missing')
+        return digest.hexdigest()
+
+
+def html_references(html_path):
+    """Local files an HTML page embeds or links to, as absolute paths"""
+    with open(html_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    base_dir = os.path.dirname(os.path.abspath(html_path))
+    references = set()
+    for attribute, value in REFERENCE_RE.findall(source):
+        candidates = [part.split()[0] for part in value.split(',') if part.strip()] \
+            if attribute == 'srcset' else [value]
+        for candidate in candidates:
+            if re.match(r'^([a-z]+:|#|/)', candidate):
+                continue
+            references.add(os.path.normpath(os.path.join(base_dir, candidate.split('#')[0])))
+    return references
+
+
+def render_document(html_file, pdf_file, stylesheets=()):
+    """Action for plain documents: incremental render, then size optimization"""
+    from pdf_incremental import build_pdf
+    from pdf_optimize import optimize_pdf, print_report
+
+    build_pdf(html_file, pdf_file, stylesheets=stylesheets)
+    print_report(optimize_pdf(pdf_file))
+
+
+def default_targets(source_dir=HEALTHCARE_DIR, output_dir=OUTPUT_DIR):
+    """The figure and document targets, with HTML -> figure edges read from the pages"""
+    from diagram_build import figure_fingerprint
+    from figure_export import exported_files
+
+    targets = {}
+    producers = {}
+    figure_modules = [
+        ('generate_diagrams', importlib.import_module('generate_diagrams').FIGURES),
+        ('generate_thesis_pdf', importlib.import_module('generate_thesis_pdf').FIGURES),
+    ]
+    for module_name, figures in figure_modules:
+        for name, func_name, output_file in figures:
+            stem = os.path.splitext(output_file)[0]
+            outputs = [os.path.join(output_dir, f) for f in exported_files(stem)]
+            targets[name] = Target(
+                name, (module_name, func_name, {}), outputs,
+                inputs=[os.path.join(source_dir, f) for f in FIGURE_SOURCES],
+                fingerprint=figure_fingerprint(module_name, func_name, output_file),
+                packages=FIGURE_PACKAGES,
+            )
+            producers.update({path: name for path in outputs})
+
+    for name, html, pdf, (module_name, func_name), stylesheets, extra in DOCUMENTS:
+        html_path = os.path.join(source_dir, html)
+        if not os.path.exists(html_path):
+            continue
+        stylesheet_paths = [os.path.join(source_dir, s) for s in stylesheets]
+        # Figures are matched by their path relative to the page, so a separate
+        # output directory still links pages to the figure targets
+        references = {
+            os.path.join(output_dir, os.path.relpath(path, source_dir))
+            if os.path.join(output_dir, os.path.relpath(path, source_dir)) in producers else path
+            for path in html_references(html_path)
+        }
+        deps = sorted({producers[path] for path in references if path in producers} | set(extra))
+        inputs = [html_path] + stylesheet_paths + sorted(
+            path for path in references if path in producers or os.path.isfile(path)
+        )
+        inputs += [path for dep in extra for path in targets[dep].outputs if path not in inputs]
+
+        kwargs = {'html_file': html_path, 'pdf_file': os.path.join(output_dir, pdf)}
+        if func_name == 'render_document':
+            kwargs['stylesheets'] = stylesheet_paths
+        targets[name] = Target(name, (module_name, func_name, kwargs),
+                               [os.path.join(output_dir, pdf)], inputs=inputs, deps=deps,
+                               packages=DOCUMENT_PACKAGES)
+    return targets
+
+
+def _run(module_name, func_name, kwargs):
+    """Run one target action in a worker, capturing what it prints for the build log"""
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        getattr(importlib.import_module(module_name), func_name)(**kwargs)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def _selection(targets, requested):
+    """Requested targets plus everything they depend on, in dependency order"""
+    order = []
+    visiting = set()
+
+    def visit(name, path):
+        if name not in targets:
+            raise KeyError(f"Unknown target: {name}")
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in targets[name].deps:
+            visit(dep, path + [name])
+        visiting.discard(name)
+        order.append(name)
+
+    for name in requested or targets:
+        visit(name, [])
+    return order
+
+
+def _store_key(target, signature):
+    from artifact_store import cache_key
+
+    return cache_key('build', signature, packages=target.packages)
+
+
+def _load_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_NAME), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def run_build(targets, requested=None, jobs=None, force=False, dry_run=False, output_dir=OUTPUT_DIR,
+              store=None):
+    """Bring the requested targets up to date.
+
+    A target runs once all of its dependencies have finished, and only if its
+    outputs are missing or its signature changed since the last successful
+    build. With an ArtifactStore, a stale target whose signature was built
+    before (here or in another checkout) is restored instead of run. Returns
+    one result dict per target in dependency order.
+    """
+    order = _selection(targets, requested)
+    state = _load_state(output_dir)
+    waiting = {name: {dep for dep in targets[name].deps} for name in order}
+    results = {}
+    ready = [name for name in order if not waiting[name]]
+    running = {}
+    run_id = time.strftime('%Y%m%dT%H%M%S')
+    start = time.perf_counter()
+
+    def finish(name, result):
+        results[name] = {'target': name, **result}
+        for other in order:
+            if name in waiting[other]:
+                waiting[other].discard(name)
+                if not waiting[other]:
+                    ready.append(other)
+
+    pool = None
+    try:
+        while ready or running:
+            while ready:
+                name = ready.pop(0)
+                target = targets[name]
+                dep_statuses = {results[dep]['status'] for dep in target.deps}
+                if dep_statuses & {'failed', 'blocked'}:
+                    finish(name, {'status': 'blocked', 'seconds': 0.0})
+                    continue
+                signature = target.signature()
+                up_to_date = (not force and 'stale' not in dep_statuses
+                              and state.get(name, {}).get('signature') == signature
+                              and all(os.path.exists(path) for path in target.outputs))
+                if up_to_date:
+                    finish(name, {'status': 'up-to-date', 'seconds': 0.0})
+                elif dry_run:
+                    finish(name, {'status': 'stale', 'seconds': 0.0})
+                elif store is not None and not force and store.restore(_store_key(target, signature),
+                                                                      target.outputs):
+                    finish(name, {'status': 'restored', 'seconds': 0.0})
+                    state[name] = {'signature': signature, 'seconds': state.get(name, {}).get('seconds', 0.0)}
+                else:
+                    if pool is None:
+                        from concurrent.futures import ProcessPoolExecutor
+                        from diagram_build import _init_worker
+
+                        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
+                    running[pool.submit(_run, *target.action)] = (name, time.time(), signature)
+
+            if not running:
+                break
+            from concurrent.futures import FIRST_COMPLETED, wait
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, started, signature = running.pop(future)
+                try:
+                    seconds, output = future.result()
+                except Exception as e:
+                    finish(name, {'status': 'failed', 'seconds': time.time() - started,
+                                  'error': f"{type(e).__name__}: {e}", 'started': started})
+                    state.pop(name, None)
+                    continue
+                finish(name, {'status': 'built', 'seconds': seconds, 'output': output,
+                              'started': started})
+                state[name] = {'signature': signature, 'seconds': round(seconds, 3)}
+                if store is not None:
+                    target = targets[name]
+                    store.put(_store_key(target, signature),
+                              [path for path in target.outputs if os.path.exists(path)],
+                              meta={'target': name, 'seconds': round(seconds, 3)})
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    if not dry_run:
+        os.makedirs(output_dir, exist_ok=True)
+        _save_state(output_dir, state)
+        with open(os.path.join(output_dir, LOG_NAME), 'a') as f:
+            for name in order:
+                f.write(json.dumps({'run': run_id, **results[name]}) + '\n')
+
+    wall_seconds = time.perf_counter() - start
+    return [results[name] for name in order], wall_seconds
+
+
+def print_report(results, wall_seconds, verbose=False):
+    """Print per-target status and timings"""
+    icons = {'built': '✓', 'up-to-date': '•', 'restored': '↺', 'stale': '~', 'failed': '✗',
+             'blocked': '-'}
+    for result in results:
+        line = f"{icons[result['status']]} {result['target']:<22} {result['status']:<10}"
+        if result['status'] == 'built':
+            line += f" {result['seconds']:6.2f}s"
+        elif result['status'] == 'failed':
+            line += f" {result['error']}"
+        print(line)
+        if verbose and result.get('output'):
+            print('    ' + result['output'].rstrip().replace('\n', '\n    '))
+    built = sum(1 for r in results if r['status'] == 'built')
+    print(f"Built {built}/{len(results)} targets in {wall_seconds:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build figures and PDFs, rebuilding only stale targets')
+    parser.add_argument('targets', nargs='*', metavar='TARGET', help='Targets to build (default: all)')
+    parser.add_argument('--list', action='store_true', help='Show targets and their dependencies')
+    parser.add_argument('--dry-run', '-n', action='store_true', help='Report stale targets without building')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if up to date')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show the output of each built target')
+    parser.add_argument('--no-store', action='store_true',
+                        help='Do not restore from or add to the artifact store')
+    args = parser.parse_args()
+
+    targets = default_targets()
+    if args.list:
+        for name in _selection(targets, None):
+            deps = ', '.join(targets[name].deps) or '-'
+            print(f"{name:<22} <- {deps}")
+        return
+
+    unknown = set(args.targets) - set(targets)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    from artifact_store import ArtifactStore
+
+    results, wall_seconds = run_build(targets, args.targets, jobs=args.jobs,
+                                      force=args.force, dry_run=args.dry_run,
+                                      store=None if args.no_store else ArtifactStore())
+    print_report(results, wall_seconds, verbose=args.verbose)
+    if any(result['status'] in ('failed', 'blocked') for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Cohort Simulation - synthetic patient cohorts for the simulation report figure
+Generates patients (age, BMI, blood pressure, cholesterol, glucose, family
+history) with outcomes drawn from a known risk model, trains a logistic
+model on a training cohort, and evaluates it on an evaluation cohort of any
+size, generated and scored in chunks.
+
+The model reports risk to SCORE_DECIMALS places, so each chunk only adds to
+per-score-level counts of positive and negative patients and memory stays
+the same for 10 thousand or 10 million patients. ROC and PR curves are a
+cumulative sum over the score levels in descending order, exact for the
+reported scores. Bootstrap confidence intervals resample those counts with
+Poisson draws, which is the same as giving every patient a Poisson(1) weight.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+FEATURES = ['Age', 'BMI', 'Blood Pressure', 'Cholesterol', 'Glucose', 'Family History']
+SCORE_DECIMALS = 4
+SCORE_LEVELS = 10 ** SCORE_DECIMALS + 1
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_THRESHOLD = 0.5
+TRAINING_PATIENTS = 100_000
+TRAINING_EPOCHS = 50
+CURVE_POINTS = 500  # points kept per curve in the returned result
+
+
+def generate_cohort(rng, count):
+    """(features as float32 rows in FEATURES order, outcome as uint8) for count synthetic patients"""
+    age = np.clip(rng.normal(55, 15, count), 18, 95)
+    bmi = np.clip(rng.normal(27, 5, count) + 0.03 * (age - 55), 15, 60)
+    blood_pressure = rng.normal(120 + 0.5 * (age - 55) + 0.8 * (bmi - 27), 15)
+    cholesterol = rng.normal(195 + 0.4 * (age - 55), 35)
+    glucose = rng.normal(100 + 1.5 * (bmi - 27), 20)
+    family_history = (rng.random(count) < 0.25).astype(np.float64)
+
+    log_odds = (-2.0 + 0.045 * (age - 55) + 0.06 * (bmi - 27) + 0.025 * (blood_pressure - 125)
+                + 0.008 * (cholesterol - 200) + 0.02 * (glucose - 100) + 0.7 * family_history
+                + rng.normal(0, 0.8, count))  # risk the measured features do not explain
+    outcome = (rng.random(count) < 1 / (1 + np.exp(-log_odds))).astype(np.uint8)
+    features = np.column_stack([age, bmi, blood_pressure, cholesterol, glucose, family_history])
+    return features.astype(np.float32), outcome
+
+
+def _log_loss(probabilities, outcome):
+    probabilities = np.clip(probabilities, 1e-7, 1 - 1e-7)
+    return float(-np.mean(outcome * np.log(probabilities) + (1 - outcome) * np.log(1 - probabilities)))
+
+
+class RiskModel:
+    """Logistic regression on standardized features"""
+
+    def __init__(self, mean, scale, weights, bias):
+        self.mean, self.scale, self.weights, self.bias = mean, scale, weights, bias
+
+    @classmethod
+    def train(cls, patients=TRAINING_PATIENTS, epochs=TRAINING_EPOCHS, learning_rate=0.5, seed=0):
+        """Fit by full-batch gradient descent; returns (model, per-epoch training and validation loss)"""
+        rng = np.random.default_rng(seed)
+        X, y = generate_cohort(rng, patients)
+        X_val, y_val = generate_cohort(rng, patients // 4)
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        model = cls(mean, scale, np.zeros(X.shape[1], dtype=np.float32), np.float32(0))
+        Z = (X - mean) / scale
+        history = {'train_loss': [], 'val_loss': []}
+        for _ in range(epochs):
+            probabilities = 1 / (1 + np.exp(-(Z @ model.weights + model.bias)))
+            error = (probabilities - y) / len(y)
+            model.weights -= learning_rate * (Z.T @ error)
+            model.bias -= learning_rate * error.sum()
+            history['train_loss'].append(_log_loss(model.predict(X), y))
+            history['val_loss'].append(_log_loss(model.predict(X_val), y_val))
+        return model, history
+
+    def predict(self, X):
+        return 1 / (1 + np.exp(-(((X - self.mean) / self.scale) @ self.weights + self.bias)))
+
+    def score_levels(self, X):
+        """Predicted risk as integer levels 0..SCORE_LEVELS-1 (risk rounded to SCORE_DECIMALS places)"""
+        return np.rint(self.predict(X) * (SCORE_LEVELS - 1)).astype(np.int32)
+
+
+def level_counts(levels, outcome):
+    """(negatives, positives) per score level"""
+    positives = np.bincount(levels[outcome == 1], minlength=SCORE_LEVELS)
+    negatives = np.bincount(levels[outcome == 0], minlength=SCORE_LEVELS)
+    return negatives, positives
+
+
+def curves(negatives, positives):
+    """Exact ROC and PR curves from per-level counts; works on stacked bootstrap replicates too.
+
+    Thresholds run from the highest score level down; at each one, every
+    patient at or above it is predicted positive.
+    """
+    tp = np.cumsum(positives[..., ::-1], axis=-1, dtype=np.float64)
+    fp = np.cumsum(negatives[..., ::-1], axis=-1, dtype=np.float64)
+    total_positive, total_negative = tp[..., -1:], fp[..., -1:]
+    zeros = np.zeros(tp.shape[:-1] + (1,))
+    tpr = np.concatenate([zeros, tp / total_positive], axis=-1)
+    fpr = np.concatenate([zeros, fp / total_negative], axis=-1)
+    auc = np.sum(np.diff(fpr, axis=-1) * (tpr[..., 1:] + tpr[..., :-1]) / 2, axis=-1)
+
+    # Average precision: precision at each level weighted by the recall it adds
+    predicted = tp + fp
+    precision = np.divide(tp, predicted, out=np.ones_like(tp), where=predicted > 0)
+    average_precision = np.sum(np.diff(tpr, axis=-1) * precision, axis=-1)
+    return {'fpr': fpr, 'tpr': tpr, 'precision': precision, 'recall': tpr[..., 1:],
+            'auc': auc, 'average_precision': average_precision}
+
+
+def bootstrap_intervals(negatives, positives, replicates=DEFAULT_BOOTSTRAP, seed=1, batch=100):
+    """95% percentile intervals for AUC and average precision from Poisson-bootstrapped level counts"""
+    rng = np.random.default_rng(seed)
+    aucs, precisions = [], []
+    for start in range(0, replicates, batch):
+        size = (min(batch, replicates - start), len(positives))
+        result = curves(rng.poisson(negatives, size), rng.poisson(positives, size))
+        aucs.append(result['auc'])
+        precisions.append(result['average_precision'])
+    aucs, precisions = np.concatenate(aucs), np.concatenate(precisions)
+    return ([float(v) for v in np.percentile(aucs, [2.5, 97.5])],
+            [float(v) for v in np.percentile(precisions, [2.5, 97.5])])
+
+
+def _downsample(*arrays, points=CURVE_POINTS):
+    """Evenly spaced points of curves that may have one point per score level"""
+    index = np.unique(np.linspace(0, len(arrays[0]) - 1, min(points, len(arrays[0]))).astype(int))
+    return [array[index].round(6).tolist() for array in arrays]
+
+
+def permutation_importance(model, X, y, seed=2):
+    """Drop in AUC when each feature is shuffled, normalized to sum to 1"""
+    rng = np.random.default_rng(seed)
+    baseline = curves(*level_counts(model.score_levels(X), y))['auc']
+    drops = []
+    for column in range(X.shape[1]):
+        shuffled = X.copy()
+        shuffled[:, column] = rng.permutation(shuffled[:, column])
+        drops.append(max(0.0, float(baseline - curves(*level_counts(model.score_levels(shuffled), y))['auc'])))
+    total = sum(drops) or 1.0
+    return {feature: drop / total for feature, drop in zip(FEATURES, drops)}
+
+
+def simulate(patients=1_000_000, chunk_size=DEFAULT_CHUNK_SIZE, bootstrap=DEFAULT_BOOTSTRAP,
+             threshold=DEFAULT_THRESHOLD, seed=42):
+    """Train the model, evaluate it on a cohort of `patients` generated in chunks; returns the metrics"""
+    start = time.perf_counter()
+    model, history = RiskModel.train()
+    negatives = np.zeros(SCORE_LEVELS, dtype=np.int64)
+    positives = np.zeros(SCORE_LEVELS, dtype=np.int64)
+    importance = None
+
+    for index, first in enumerate(range(0, patients, chunk_size)):
+        rng = np.random.default_rng([seed, index])
+        X, y = generate_cohort(rng, min(chunk_size, patients - first))
+        chunk_negatives, chunk_positives = level_counts(model.score_levels(X), y)
+        negatives += chunk_negatives
+        positives += chunk_positives
+        if importance is None:
+            sample = slice(0, min(len(y), 200_000))
+            importance = permutation_importance(model, X[sample], y[sample])
+
+    result = curves(negatives, positives)
+    auc_ci, ap_ci = bootstrap_intervals(negatives, positives, bootstrap) if bootstrap else (None, None)
+
+    # Confusion matrix at the threshold, from the same counts
+    cut = int(round(threshold * (SCORE_LEVELS - 1)))
+    tp, fn = int(positives[cut:].sum()), int(positives[:cut].sum())
+    fp, tn = int(negatives[cut:].sum()), int(negatives[:cut].sum())
+    fpr, tpr = _downsample(result['fpr'], result['tpr'])
+    recall, precision = _downsample(result['recall'], result['precision'])
+    return {
+        'patients': patients,
+        'prevalence': (tp + fn) / patients,
+        'auc': float(result['auc']),
+        'auc_ci': auc_ci,
+        'average_precision': float(result['average_precision']),
+        'average_precision_ci': ap_ci,
+        'threshold': threshold,
+        'confusion_matrix': [[tn, fp], [fn, tp]],
+        'sensitivity': tp / max(1, tp + fn),
+        'specificity': tn / max(1, tn + fp),
+        'roc': {'fpr': fpr, 'tpr': tpr},
+        'pr': {'recall': recall, 'precision': precision},
+        'feature_importance': importance,
+        'training': history,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a patient cohort and evaluate the risk model')
+    parser.add_argument('--patients', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--bootstrap', type=int, default=DEFAULT_BOOTSTRAP, help='Bootstrap replicates (0 to skip)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the full result as JSON')
+    args = parser.parse_args()
+
+    import resource
+
+    result = simulate(args.patients, args.chunk_size, args.bootstrap, args.threshold, args.seed)
+    (tn, fp), (fn, tp) = result['confusion_matrix']
+    auc_ci = result['auc_ci'] or [float('nan')] * 2
+    ap_ci = result['average_precision_ci'] or [float('nan')] * 2
+    print(f"🧪 {result['patients']:,} patients, prevalence {result['prevalence']:.1%}")
+    print(f"📈 AUC {result['auc']:.4f} (95% CI {auc_ci[0]:.4f}-{auc_ci[1]:.4f}), "
+          f"AP {result['average_precision']:.4f} (95% CI {ap_ci[0]:.4f}-{ap_ci[1]:.4f})")
+    print(f"🎯 At {result['threshold']}: TP {tp:,}  FP {fp:,}  FN {fn:,}  TN {tn:,}  "
+          f"sensitivity {result['sensitivity']:.1%}  specificity {result['specificity']:.1%}")
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"✅ {result['seconds']:.1f}s, peak RSS {peak_mb:,.0f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
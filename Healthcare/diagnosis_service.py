@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Diagnosis Service - micro-batched symptom analysis for /api/diagnose
+A softmax model over the registry's conditions and a logistic risk model,
+both trained with NumPy on synthetic patients, score symptom vectors
+extracted from free text plus age and gender.
+
+Requests are scored directly on the caller's thread by default. With
+batch_size above 1 they are queued and scored together: a worker thread
+takes up to batch_size queued vectors and runs them through the model as
+one matrix product. A request that finds nothing else queued is scored at
+once; only when others are waiting does the worker hold the batch open for
+up to max_delay (default 0) to fill it. The model is small, so the hand-off
+to the worker costs about as much as batching saves: on one CPU with 32
+clients req/s moves by -10% to +15% while p50 latency goes from under
+0.1 ms to about 2 ms, and with one client batching is slower outright.
+Results for repeated symptom vectors come from an LRU cache without
+touching the queue.
+"""
+
+import argparse
+import math
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from patient_registry import CONDITIONS
+
+DEFAULT_BATCH_SIZE = int(os.environ.get('HEALTHCARE_DIAGNOSE_BATCH', 1))
+DEFAULT_MAX_DELAY = float(os.environ.get('HEALTHCARE_DIAGNOSE_DELAY_MS', 0)) / 1000
+DEFAULT_CACHE_SIZE = 10000
+REQUEST_TIMEOUT = 5.0
+BENCHMARK_BATCH_SIZE = 64
+
+CONDITION_SYMPTOMS = {
+    'Hypertension': ['headache', 'dizziness', 'blurred vision', 'nosebleed'],
+    'Diabetes': ['thirst', 'frequent urination', 'fatigue', 'blurred vision', 'weight loss'],
+    'Heart Disease': ['chest pain', 'shortness of breath', 'palpitations', 'swelling'],
+    'Routine Checkup': [],
+    'Asthma': ['wheezing', 'shortness of breath', 'cough', 'chest tightness'],
+    'COPD': ['cough', 'shortness of breath', 'mucus', 'wheezing', 'fatigue'],
+    'Chronic Kidney Disease': ['swelling', 'fatigue', 'nausea', 'itching', 'frequent urination'],
+    'Arthritis': ['joint pain', 'stiffness', 'swelling'],
+    'Obesity': ['weight gain', 'fatigue', 'snoring', 'joint pain'],
+    'Depression': ['low mood', 'insomnia', 'fatigue', 'loss of interest', 'anxiety'],
+}
+SYMPTOMS = sorted({symptom for symptoms in CONDITION_SYMPTOMS.values() for symptom in symptoms})
+GENDERS = ['male', 'female']
+FEATURES = SYMPTOMS + ['age', 'male', 'female']
+
+# Log-odds each condition adds to the chance of a high-risk outcome
+SEVERITY = {
+    'Heart Disease': 2.0, 'Chronic Kidney Disease': 1.5, 'COPD': 1.2, 'Diabetes': 0.8,
+    'Hypertension': 0.8, 'Asthma': 0.3, 'Obesity': 0.3, 'Depression': 0.2, 'Arthritis': 0.0,
+    'Routine Checkup': -1.5,
+}
+
+
+def featurize(symptoms, age=None, gender=None):
+    """Feature vector for free-text symptoms, age in years and gender"""
+    text = (symptoms or '').lower()
+    vector = np.zeros(len(FEATURES), dtype=np.float32)
+    for i, symptom in enumerate(SYMPTOMS):
+        if symptom in text:
+            vector[i] = 1.0
+    if age in (None, ''):
+        vector[len(SYMPTOMS)] = 0.5
+    else:
+        try:
+            years = float(age)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid age: {age}") from e
+        if not math.isfinite(years):
+            raise ValueError(f"Invalid age: {age}")
+        vector[len(SYMPTOMS)] = min(max(years, 0.0), 120.0) / 100
+    gender = (gender or '').lower()
+    if gender in GENDERS:
+        vector[len(SYMPTOMS) + 1 + GENDERS.index(gender)] = 1.0
+    return vector
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def synthetic_patients(count, seed=42):
+    """(features, condition index, high-risk label) for synthetic patients"""
+    rng = np.random.default_rng(seed)
+    conditions = rng.integers(0, len(CONDITIONS), count)
+    probabilities = np.full((len(CONDITIONS), len(SYMPTOMS)), 0.04)
+    for c, name in enumerate(CONDITIONS):
+        for symptom in CONDITION_SYMPTOMS[name]:
+            probabilities[c, SYMPTOMS.index(symptom)] = 0.7
+    X = np.zeros((count, len(FEATURES)), dtype=np.float32)
+    X[:, :len(SYMPTOMS)] = rng.random((count, len(SYMPTOMS))) < probabilities[conditions]
+    ages = np.clip(rng.normal(50, 18, count) - 20 * (conditions == CONDITIONS.index('Routine Checkup')), 1, 98)
+    X[:, len(SYMPTOMS)] = ages / 100
+    X[np.arange(count), len(SYMPTOMS) + 1 + rng.integers(0, 2, count)] = 1.0
+
+    severity = np.array([SEVERITY[name] for name in CONDITIONS])
+    log_odds = severity[conditions] + 0.05 * (ages - 55) + 0.3 * X[:, :len(SYMPTOMS)].sum(axis=1) - 1.5
+    high_risk = rng.random(count) < _sigmoid(log_odds)
+    return X, conditions, high_risk.astype(np.float32)
+
+
+class DiagnosisModel:
+    """Softmax condition classifier plus a logistic high-risk classifier sharing one feature matrix"""
+
+    def __init__(self, weights, bias):
+        # Columns: one per condition, then the risk logit
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+
+    @classmethod
+    def train(cls, samples=20000, epochs=300, learning_rate=1.0, seed=42):
+        """Fit both heads by full-batch gradient descent on synthetic patients"""
+        X, conditions, high_risk = synthetic_patients(samples, seed=seed)
+        classes = len(CONDITIONS)
+        targets = np.zeros((samples, classes + 1), dtype=np.float32)
+        targets[np.arange(samples), conditions] = 1.0
+        targets[:, classes] = high_risk
+        weights = np.zeros((X.shape[1], classes + 1), dtype=np.float32)
+        bias = np.zeros(classes + 1, dtype=np.float32)
+        for _ in range(epochs):
+            logits = X @ weights + bias
+            predictions = np.empty_like(logits)
+            predictions[:, :classes] = _softmax(logits[:, :classes])
+            predictions[:, classes] = _sigmoid(logits[:, classes])
+            error = (predictions - targets) / samples
+            weights -= learning_rate * (X.T @ error)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(weights, bias)
+
+    def predict(self, X):
+        """(condition probabilities, risk score 0-10) for a batch of feature vectors"""
+        logits = X @ self.weights + self.bias
+        classes = len(CONDITIONS)
+        return _softmax(logits[:, :classes]), 10.0 * _sigmoid(logits[:, classes])
+
+    def evaluate(self, samples=5000, seed=7):
+        """Top-1 condition accuracy and risk accuracy on fresh synthetic patients"""
+        X, conditions, high_risk = synthetic_patients(samples, seed=seed)
+        probabilities, risk = self.predict(X)
+        return {
+            'condition_accuracy': float((probabilities.argmax(axis=1) == conditions).mean()),
+            'risk_accuracy': float(((risk >= 5) == (high_risk == 1)).mean()),
+        }
+
+
+class MicroBatcher:
+    """Runs queued feature vectors through predict() in batches from one worker thread.
+
+    With batch_size 1 there is no worker: submit() scores on the caller's thread.
+    """
+
+    def __init__(self, predict, batch_size=DEFAULT_BATCH_SIZE, max_delay=DEFAULT_MAX_DELAY):
+        self.predict = predict
+        self.batch_size = max(1, int(batch_size))
+        self.max_delay = max(0.0, float(max_delay))
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.SimpleQueue()
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        if self.batch_size > 1:
+            self._thread = threading.Thread(target=self._run, name='diagnosis-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, features):
+        """Queue one feature vector; the Future resolves to (probabilities, risk)"""
+        future = Future()
+        if self._thread is None:
+            self._score([(features, future)])
+        else:
+            self._queue.put((features, future))
+        return future
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    # Take what is already queued, then wait out the deadline for more
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if len(batch) == 1 or remaining <= 0:
+                        # A lone request is not held back waiting for company
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(batch)
+            if stopping:
+                return
+
+    def _score(self, batch):
+        try:
+            probabilities, risk = self.predict(np.stack([features for features, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._counter_lock:
+            self.batches += 1
+            self.items += len(batch)
+        for i, (_, future) in enumerate(batch):
+            future.set_result((probabilities[i], float(risk[i])))
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def risk_level(score):
+    """Band of a 0-10 risk score, with the thresholds showRiskScore uses on diagnosis.html"""
+    if score <= 3:
+        return 'Low'
+    if score <= 7:
+        return 'Medium'
+    return 'High'
+
+
+class DiagnosisService:
+    """Featurizes requests, serves repeats from the cache and batches the rest through the model"""
+
+    def __init__(self, model=None, batch_size=DEFAULT_BATCH_SIZE, max_delay=DEFAULT_MAX_DELAY,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        self.model = model or DiagnosisModel.train()
+        self.batcher = MicroBatcher(self.model.predict, batch_size, max_delay)
+        self.cache = LRUCache(cache_size)
+
+    def diagnose(self, symptoms, age=None, gender=None, top=3):
+        """Most likely conditions and the risk score for one patient"""
+        features = featurize(symptoms, age, gender)
+        key = features.tobytes()
+        result = self.cache.get(key)
+        if result is None:
+            probabilities, risk = self.batcher.submit(features).result(timeout=REQUEST_TIMEOUT)
+            order = np.argsort(probabilities)[::-1][:top]
+            score = round(risk, 1)
+            result = {
+                'diagnoses': [{'condition': CONDITIONS[i], 'probability': round(float(probabilities[i]), 3)}
+                              for i in order],
+                'risk_score': score,
+                'risk_level': risk_level(score),
+                'matched_symptoms': [symptom for i, symptom in enumerate(SYMPTOMS) if features[i]],
+            }
+            self.cache.put(key, result)
+        return result
+
+    def stats(self):
+        batches = self.batcher.batches
+        return {
+            'batches': batches,
+            'scored': self.batcher.items,
+            'mean_batch_size': round(self.batcher.items / batches, 2) if batches else 0,
+            'batch_size': self.batcher.batch_size,
+            'max_delay_ms': self.batcher.max_delay * 1000,
+            'cache_entries': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }
+
+
+def _random_requests(count, seed=1):
+    """Symptom texts, ages and genders for load tests; mostly distinct vectors"""
+    rng = np.random.default_rng(seed)
+    requests = []
+    for _ in range(count):
+        symptoms = rng.choice(SYMPTOMS, size=rng.integers(1, 5), replace=False)
+        requests.append((', '.join(symptoms), int(rng.integers(1, 98)), GENDERS[rng.integers(0, 2)]))
+    return requests
+
+
+def _load(diagnose, work, clients):
+    """Run work through diagnose from concurrent client threads; (elapsed, sorted latencies)"""
+    latencies = []
+
+    def client(items):
+        for symptoms, age, gender in items:
+            t0 = time.perf_counter()
+            diagnose(symptoms, age, gender)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, [work[i::clients] for i in range(clients)]))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def benchmark(requests=20000, clients=32, batch_size=BENCHMARK_BATCH_SIZE, max_delay=DEFAULT_MAX_DELAY):
+    """Requests per second from concurrent clients, scoring each request directly or through the batcher"""
+    start = time.perf_counter()
+    model = DiagnosisModel.train()
+    print(f"🧠 Trained in {time.perf_counter() - start:.2f}s: {model.evaluate()}")
+    work = _random_requests(requests)
+
+    runs = []
+    for label, size, cache_size in (('direct', 1, 0), ('batched', batch_size, 0),
+                                    ('batched + cache', batch_size, DEFAULT_CACHE_SIZE)):
+        service = DiagnosisService(model, size, max_delay, cache_size=max(1, cache_size))
+        runs.append((label, service.diagnose, service))
+
+    print(f"   {clients} clients, {requests:,} requests, batch size {batch_size}, max delay {max_delay * 1000:g} ms")
+    for label, diagnose, service in runs:
+        elapsed, latencies = _load(diagnose, work, clients)
+        service.batcher.close()
+        stats = service.stats()
+        print(f"{'✅' if requests / elapsed >= 1000 else '❌'} {label:<15} {requests / elapsed:10,.0f} req/s  "
+              f"p50 {latencies[len(latencies) // 2] * 1000:5.2f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1000:5.2f} ms  "
+              f"mean batch {stats['mean_batch_size']}  cache hits {stats['cache_hits']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-batched diagnosis model')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('evaluate', help='Train on synthetic patients and report accuracy')
+
+    bench_parser = subparsers.add_parser('benchmark', help='Measure throughput from concurrent clients')
+    bench_parser.add_argument('--requests', type=int, default=20000)
+    bench_parser.add_argument('--clients', type=int, default=32)
+    bench_parser.add_argument('--batch-size', type=int, default=BENCHMARK_BATCH_SIZE)
+    bench_parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY * 1000)
+
+    args = parser.parse_args()
+    if args.command == 'evaluate':
+        model = DiagnosisModel.train()
+        for metric, value in model.evaluate().items():
+            print(f"📈 {metric}: {value:.1%}")
+    elif args.command == 'benchmark':
+        benchmark(args.requests, args.clients, args.batch_size, args.max_delay_ms / 1000)
+
+
+if __name__ == '__main__':
+    main()
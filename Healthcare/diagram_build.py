@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Incremental, parallel build driver for the healthcare figure generators
+Renders figures in a process pool and skips figures whose source is unchanged
+"""
+
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+
+MANIFEST_NAME = '.figure_manifest.json'
+FINGERPRINT_PACKAGES = ['matplotlib', 'seaborn', 'numpy']
+
+# Modules the figure functions call into by attribute or import inside the
+# function, which _function_source cannot follow; their whole source is hashed
+FIGURE_SUPPORT_MODULES = ['cohort_simulation', 'layered_diagram', 'figure_export']
+
+
+def _init_worker():
+    """Force the non-interactive Agg backend in every worker process"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(module_name, func_name, profile=False):
+    """Import the generator module in the worker and run one create_* function.
+
+    Returns the render time and, when profiling, the per-phase breakdown.
+    """
+    create_figure = getattr(importlib.import_module(module_name), func_name)
+    if not profile:
+        start = time.perf_counter()
+        create_figure()
+        return time.perf_counter() - start, None
+
+    from render_profile import PhaseTimer
+
+    with PhaseTimer() as timer:
+        start = time.perf_counter()
+        create_figure()
+        seconds = time.perf_counter() - start
+    return seconds, timer.breakdown(seconds)
+
+
+def _function_source(module_name, func_name):
+    """Return a function's source plus the module-level helpers and constants it uses.
+
+    The module file is parsed rather than imported, so fingerprinting never
+    pays for matplotlib. Dependencies are followed transitively, so editing
+    a shared helper such as the style setup invalidates every figure using it.
+    """
+    path = importlib.util.find_spec(module_name).origin
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    definitions = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            definitions[node.name] = node
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    definitions[target.id] = node
+
+    if func_name not in definitions:
+        raise LookupError(f"{func_name} not found in {path}")
+
+    seen = []
+    stack = [func_name]
+    while stack:
+        name = stack.pop()
+        node = definitions.get(name)
+        if node is None or node in seen:
+            continue
+        seen.append(node)
+        stack.extend(n.id for n in ast.walk(node) if isinstance(n, ast.Name))
+
+    return '\n'.join(ast.get_source_segment(source, node) for node in seen)
+
+
+def _package_versions():
+    from importlib import metadata
+
+    versions = []
+    for package in FINGERPRINT_PACKAGES:
+        try:
+            versions.append(f"{package}=={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}==missing")
+    return versions
+
+
+def _support_sources():
+    sources = []
+    for module_name in FIGURE_SUPPORT_MODULES:
+        with open(importlib.util.find_spec(module_name).origin, 'r', encoding='utf-8') as f:
+            sources.append(f.read())
+    return sources
+
+
+def figure_fingerprint(module_name, func_name, output_file):
+    """Hash everything that determines a figure: its code, the support modules, output name and library versions"""
+    digest = hashlib.sha256()
+    parts = [_function_source(module_name, func_name)] + _support_sources() + [output_file]
+    for part in parts + _package_versions():
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _export_outputs(output_dir, output_file):
+    """Every file export_figure writes for one figure, and the params that shape them"""
+    from figure_export import EXPORT_DPIS, EXPORT_FORMATS, exported_files
+
+    stem = os.path.splitext(output_file)[0]
+    paths = [os.path.join(output_dir, name) for name in exported_files(stem)]
+    return paths, {'dpis': list(EXPORT_DPIS), 'formats': list(EXPORT_FORMATS)}
+
+
+def build_figures(figures, output_dir, jobs=None, force=False, profile=False, store=None):
+    """Render stale figures in parallel.
+
+    figures is a list of (name, module_name, func_name, output_file) tuples.
+    Returns one result dict per figure with its status and render time, plus
+    a construction/layout/draw/encode breakdown when profile is set. With an
+    ArtifactStore, stale figures whose fingerprint was built before are
+    restored from the store instead of rendered, and new renders are added.
+    """
+    manifest = load_manifest(output_dir)
+    results = {}
+    pending = {}
+
+    for name, module_name, func_name, output_file in figures:
+        fingerprint = figure_fingerprint(module_name, func_name, output_file)
+        output_path = os.path.join(output_dir, output_file)
+        cached = manifest.get(name, {})
+        outputs, params = _export_outputs(output_dir, output_file)
+        if (not force and cached.get('fingerprint') == fingerprint
+                and all(os.path.exists(path) for path in outputs)):
+            results[name] = {'name': name, 'status': 'cached', 'seconds': 0.0, 'output': output_path}
+            continue
+
+        key = None
+        if store is not None:
+            from artifact_store import cache_key
+
+            key = cache_key('figure', fingerprint, params)
+            if not force and store.restore(key, outputs):
+                results[name] = {'name': name, 'status': 'restored', 'seconds': 0.0,
+                                 'output': output_path}
+                manifest[name] = {'fingerprint': fingerprint, 'seconds': cached.get('seconds', 0.0)}
+                continue
+        pending[name] = (module_name, func_name, fingerprint, output_path, key, outputs)
+
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(_render, module_name, func_name, profile): name
+                for name, (module_name, func_name, *_) in pending.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                _, _, fingerprint, output_path, key, outputs = pending[name]
+                try:
+                    seconds, phases = future.result()
+                except Exception as e:
+                    results[name] = {'name': name, 'status': 'failed', 'seconds': 0.0,
+                                     'output': output_path, 'error': str(e)}
+                    manifest.pop(name, None)
+                    continue
+                results[name] = {'name': name, 'status': 'built', 'seconds': seconds,
+                                 'output': output_path}
+                if phases:
+                    results[name]['phases'] = phases
+                manifest[name] = {'fingerprint': fingerprint, 'seconds': round(seconds, 3)}
+                if key is not None:
+                    store.put(key, outputs, meta={'figure': name, 'seconds': round(seconds, 3)})
+
+    if any(result['status'] != 'cached' for result in results.values()):
+        save_manifest(output_dir, manifest)
+
+    return [results[name] for name, _, _, _ in figures]
+
+
+def print_report(results, wall_seconds):
+    """Print per-figure render times"""
+    icons = {'built': '✓', 'cached': '•', 'restored': '↺', 'failed': '✗'}
+    for result in results:
+        line = f"{icons[result['status']]} {result['name']:<22} {result['status']:<8}"
+        if result['status'] == 'built':
+            line += f" {result['seconds']:6.2f}s"
+            if 'phases' in result:
+                line += '  ' + ' '.join(f"{phase} {seconds:.2f}s"
+                                        for phase, seconds in result['phases'].items())
+        elif result['status'] == 'failed':
+            line += f" {result['error']}"
+        print(line)
+    built = sum(1 for r in results if r['status'] == 'built')
+    print(f"Built {built}/{len(results)} figures in {wall_seconds:.2f}s")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Multi-format, multi-resolution export for the healthcare figures
+Each figure is rasterised once at the highest DPI; smaller PNG/WebP variants are
+resampled from that master, and an SVG is written for vector consumers (PDFs).
+"""
+
+import argparse
+import io
+import json
+import os
+
+from paths import OUTPUT_DIR
+
+EXPORT_DPIS = (100, 200, 300)
+EXPORT_FORMATS = ('svg', 'png', 'webp')
+WEBP_QUALITY = 90
+
+
+def variant_name(stem, dpi, fmt, master_dpi):
+    """File name of one raster variant; the master PNG keeps the plain legacy name"""
+    if dpi == master_dpi and fmt == 'png':
+        return f"{stem}.png"
+    return f"{stem}@{dpi}.{fmt}"
+
+
+def exported_files(stem, dpis=EXPORT_DPIS, formats=EXPORT_FORMATS):
+    """Names of every file export_figure writes for a stem"""
+    master_dpi = max(dpis)
+    names = [f"{stem}.svg"] if 'svg' in formats else []
+    names += [variant_name(stem, dpi, fmt, master_dpi)
+              for dpi in sorted(dpis) for fmt in formats if fmt != 'svg']
+    return names + [f"{stem}.srcset.json"]
+
+
+def export_figure(fig, stem, output_dir=None, dpis=EXPORT_DPIS, formats=EXPORT_FORMATS,
+                  facecolor='white'):
+    """Write a figure as SVG plus PNG/WebP at every DPI, and a srcset sidecar.
+
+    Returns the list of paths written. `<stem>.png` is always the
+    highest-DPI PNG so existing pages and PDFs keep working unchanged.
+    """
+    output_dir = output_dir or OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    master_dpi = max(dpis)
+    written = []
+
+    if 'svg' in formats:
+        path = os.path.join(output_dir, f"{stem}.svg")
+        fig.savefig(path, format='svg', bbox_inches='tight', facecolor=facecolor)
+        written.append(path)
+
+    # The only raster draw: everything below is resampled from this buffer
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=master_dpi, bbox_inches='tight', facecolor=facecolor)
+    written += _write_rasters(buffer.getvalue(), stem, output_dir, dpis, formats, write_master=True)
+    return written
+
+
+def export_variants(stem, output_dir=None, dpis=EXPORT_DPIS, formats=EXPORT_FORMATS):
+    """Derive the smaller PNG/WebP variants and the sidecar from an existing `<stem>.png`.
+
+    For figures whose master PNG is checked in or was built elsewhere; the
+    master itself is left untouched. Returns the list of paths written.
+    """
+    output_dir = output_dir or OUTPUT_DIR
+    with open(os.path.join(output_dir, f"{stem}.png"), 'rb') as f:
+        master_png = f.read()
+    return _write_rasters(master_png, stem, output_dir, dpis, formats, write_master=False)
+
+
+def _write_rasters(master_png, stem, output_dir, dpis, formats, write_master):
+    """Resample a master PNG to every DPI and format, then write the srcset sidecar"""
+    from PIL import Image
+
+    master_dpi = max(dpis)
+    written = []
+    master = Image.open(io.BytesIO(master_png))
+    master.load()
+    if master.mode == 'RGBA' and master.getextrema()[3][0] == 255:
+        # Opaque figures encode smaller and faster without the alpha channel
+        master = master.convert('RGB')
+
+    srcset = {fmt: [] for fmt in formats if fmt != 'svg'}
+    widths = {}
+    for dpi in sorted(dpis):
+        if dpi == master_dpi:
+            image = master
+        else:
+            scale = dpi / master_dpi
+            size = (max(1, round(master.width * scale)), max(1, round(master.height * scale)))
+            image = master.resize(size, Image.LANCZOS)
+        widths[dpi] = image.width
+
+        for fmt in srcset:
+            name = variant_name(stem, dpi, fmt, master_dpi)
+            srcset[fmt].append(f"{name} {image.width}w")
+            path = os.path.join(output_dir, name)
+            if dpi == master_dpi and fmt == 'png':
+                if not write_master:
+                    continue
+                with open(path, 'wb') as f:
+                    f.write(master_png)
+            elif fmt == 'png':
+                image.save(path, format='PNG')
+            elif fmt == 'webp':
+                image.save(path, format='WEBP', quality=WEBP_QUALITY, method=4)
+            else:
+                raise ValueError(f"Unsupported export format: {fmt}")
+            written.append(path)
+
+    sidecar = {fmt: ', '.join(entries) for fmt, entries in srcset.items()}
+    sidecar['widths'] = widths
+    if 'svg' in formats and os.path.exists(os.path.join(output_dir, f"{stem}.svg")):
+        sidecar['svg'] = f"{stem}.svg"
+    path = os.path.join(output_dir, f"{stem}.srcset.json")
+    with open(path, 'w') as f:
+        json.dump(sidecar, f, indent=2)
+    written.append(path)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Derive PNG/WebP variants from existing master PNGs')
+    parser.add_argument('stems', nargs='+', help='Figure names, e.g. architecture_diagram')
+    parser.add_argument('--output-dir', default=None, help='Directory holding <stem>.png (default: OUTPUT_DIR)')
+    args = parser.parse_args()
+
+    for stem in args.stems:
+        written = export_variants(stem, output_dir=args.output_dir)
+        print(f"🖼️  {stem}: {len(written)} files written")
+
+
+if __name__ == '__main__':
+    main()
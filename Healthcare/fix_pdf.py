@@ -1,21 +1,22 @@
 #!/usr/bin/env python3
-import weasyprint
 import os
 
-def generate_pdf():
-    """Generate PDF using weasyprint"""
-    html_file = '/home/ubuntu/healthcare/phd_thesis.html'
-    pdf_file = '/home/ubuntu/healthcare/Future_Healthcare_AI_PhD_Thesis_Fixed.pdf'
+from paths import HEALTHCARE_DIR, OUTPUT_DIR
+from pdf_incremental import build_pdf
+from pdf_optimize import optimize_pdf, print_report
+
+def generate_pdf(html_file=None, pdf_file=None):
+    """Generate PDF incrementally with the pooled weasyprint renderer"""
+    html_file = html_file or os.path.join(HEALTHCARE_DIR, 'phd_thesis.html')
+    pdf_file = pdf_file or os.path.join(OUTPUT_DIR, 'Future_Healthcare_AI_PhD_Thesis_Fixed.pdf')
     
     print("Generating PDF with weasyprint...")
     
-    # Generate PDF
-    weasyprint.HTML(filename=html_file).write_pdf(pdf_file)
-    
-    # Check file size
-    size = os.path.getsize(pdf_file) / (1024 * 1024)
-    print(f"✅ PDF generated: {pdf_file}")
-    print(f"📄 File size: {size:.1f} MB")
+    # Generate PDF; build_pdf reports the output size and cache hits
+    build_pdf(html_file, pdf_file)
+
+    # Downsample images to print DPI, subset fonts and report what is left
+    print_report(optimize_pdf(pdf_file))
 
 if __name__ == "__main__":
     generate_pdf()
@@ -1,73 +1,71 @@
 #!/usr/bin/env python3
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import seaborn as sns
-import pandas as pd
-import numpy as np
-from matplotlib.patches import FancyBboxPatch, Rectangle
+# matplotlib, seaborn and numpy are imported inside the figure functions so that
+# listing figures or building a single one does not pay for the whole stack.
+import argparse
+import os
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style
-plt.style.use('default')
-sns.set_palette("husl")
+import figure_export
+from figure_export import export_figure
+
+# Cohort size behind the simulation report (see cohort_simulation.py)
+SIMULATION_PATIENTS = 1_000_000
+
+# seaborn's "husl" palette, inlined so the colour cycle does not require seaborn
+HUSL_PALETTE = ['#f77189', '#bb9832', '#50b131', '#36ada4', '#3ba3ec', '#e866f4']
+
+_style_applied = False
+
+def _pyplot():
+    """Import pyplot and apply the shared figure style once per process"""
+    global _style_applied
+    import matplotlib.pyplot as plt
+    if not _style_applied:
+        from cycler import cycler
+        plt.style.use('default')
+        plt.rcParams['axes.prop_cycle'] = cycler(color=HUSL_PALETTE)
+        _style_applied = True
+    return plt
 
 # 1. AI Healthcare Architecture Diagram
+ARCHITECTURE_SPEC = {
+    'figsize': (12, 8),
+    'xlim': (0, 10),
+    'ylim': (0, 8),
+    'title': {'text': 'AI Healthcare System Architecture', 'fontsize': 16},
+    'styles': {
+        'layer': {'fontsize': 10},
+        'service': {'boxstyle': 'round,pad=0.1', 'facecolor': 'lightyellow',
+                    'width': 1.8, 'height': 1.5},
+        'flow': {'head': 'filled', 'linewidth': 1, 'head_length': 0.1, 'head_width': 0.05},
+    },
+    'layers': [
+        {'label': 'Data Layer\n(EHR, Medical Images, IoT Sensors, Genomics)',
+         'box': [0.5, 6.5, 9, 1], 'facecolor': 'lightblue'},
+        {'label': 'AI Processing Layer\n(ML Models, Deep Learning, NLP, Computer Vision)',
+         'box': [0.5, 4.5, 9, 1.5], 'facecolor': 'lightgreen'},
+        {'services': {'y': 3.25, 'x': [1.4, 3.4, 5.4, 7.4, 9.4],
+                      'names': ['Diagnostic\nImaging', 'Clinical\nDecision Support', 'Drug\nDiscovery',
+                                'Personalized\nMedicine', 'Predictive\nAnalytics']}},
+        {'label': 'User Interface Layer\n(Clinician Dashboard, Patient Portal, Mobile Apps)',
+         'box': [0.5, 0.5, 9, 1], 'facecolor': 'lightcoral'},
+    ],
+    'arrows': {'segments': [[5, 6.4, 5, 5.6], [5, 4.4, 5, 3.6], [5, 2.4, 5, 1.6]]},
+}
+
 def create_architecture_diagram():
-    fig, ax = plt.subplots(1, 1, figsize=(12, 8))
-    ax.set_xlim(0, 10)
-    ax.set_ylim(0, 8)
-    
-    # Data Layer
-    data_box = FancyBboxPatch((0.5, 6.5), 9, 1, boxstyle="round,pad=0.1", 
-                              facecolor='lightblue', edgecolor='black', linewidth=2)
-    ax.add_patch(data_box)
-    ax.text(5, 7, 'Data Layer\n(EHR, Medical Images, IoT Sensors, Genomics)', 
-            ha='center', va='center', fontsize=10, weight='bold')
-    
-    # AI Processing Layer
-    ai_box = FancyBboxPatch((0.5, 4.5), 9, 1.5, boxstyle="round,pad=0.1", 
-                            facecolor='lightgreen', edgecolor='black', linewidth=2)
-    ax.add_patch(ai_box)
-    ax.text(5, 5.25, 'AI Processing Layer\n(ML Models, Deep Learning, NLP, Computer Vision)', 
-            ha='center', va='center', fontsize=10, weight='bold')
-    
-    # Application Layer
-    app_boxes = [
-        (0.5, 2.5, 'Diagnostic\nImaging'),
-        (2.5, 2.5, 'Clinical\nDecision Support'),
-        (4.5, 2.5, 'Drug\nDiscovery'),
-        (6.5, 2.5, 'Personalized\nMedicine'),
-        (8.5, 2.5, 'Predictive\nAnalytics')
-    ]
-    
-    for x, y, text in app_boxes:
-        box = FancyBboxPatch((x, y), 1.8, 1.5, boxstyle="round,pad=0.1", 
-                             facecolor='lightyellow', edgecolor='black')
-        ax.add_patch(box)
-        ax.text(x+0.9, y+0.75, text, ha='center', va='center', fontsize=9)
+    from layered_diagram import render_to_file
+    _pyplot()
     
-    # User Interface Layer
-    ui_box = FancyBboxPatch((0.5, 0.5), 9, 1, boxstyle="round,pad=0.1", 
-                            facecolor='lightcoral', edgecolor='black', linewidth=2)
-    ax.add_patch(ui_box)
-    ax.text(5, 1, 'User Interface Layer\n(Clinician Dashboard, Patient Portal, Mobile Apps)', 
-            ha='center', va='center', fontsize=10, weight='bold')
-    
-    # Arrows
-    for i in range(5):
-        ax.arrow(5, 6.4, 0, -0.7, head_width=0.1, head_length=0.1, fc='black', ec='black')
-        ax.arrow(5, 4.4, 0, -0.7, head_width=0.1, head_length=0.1, fc='black', ec='black')
-        ax.arrow(5, 2.4, 0, -0.7, head_width=0.1, head_length=0.1, fc='black', ec='black')
-    
-    ax.set_title('AI Healthcare System Architecture', fontsize=16, weight='bold', pad=20)
-    ax.axis('off')
-    plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/architecture_diagram.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    render_to_file(ARCHITECTURE_SPEC, 'architecture_diagram')
 
 # 2. AI Implementation Process Flow
 def create_process_flow():
+    from matplotlib.patches import FancyBboxPatch
+    plt = _pyplot()
+    
     fig, ax = plt.subplots(1, 1, figsize=(14, 10))
     ax.set_xlim(0, 12)
     ax.set_ylim(0, 10)
@@ -109,11 +107,13 @@ def create_process_flow():
     ax.set_title('AI Healthcare Implementation Process Flow', fontsize=16, weight='bold', pad=20)
     ax.axis('off')
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/process_flow.png', dpi=300, bbox_inches='tight')
+    export_figure(fig, 'process_flow')
     plt.close()
 
 # 3. AI Adoption Timeline Chart
 def create_timeline_chart():
+    plt = _pyplot()
+    
     fig, ax = plt.subplots(1, 1, figsize=(12, 8))
     
     years = ['2024', '2025', '2026', '2027', '2028', '2029', '2030']
@@ -135,11 +135,13 @@ def create_timeline_chart():
     ax.set_ylim(0, 100)
     
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/timeline_chart.png', dpi=300, bbox_inches='tight')
+    export_figure(fig, 'timeline_chart')
     plt.close()
 
 # 4. Performance Comparison Chart
 def create_performance_chart():
+    plt = _pyplot()
+    
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
     
     # Accuracy comparison
@@ -171,48 +173,54 @@ def create_performance_chart():
                 f'{cost}%', ha='center', va='bottom', fontsize=11, weight='bold')
     
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/performance_chart.png', dpi=300, bbox_inches='tight')
+    export_figure(fig, 'performance_chart')
     plt.close()
 
 # 5. Simulation Report - Patient Outcome Prediction
 def create_simulation_report():
+    import numpy as np
+    import seaborn as sns
+    from cohort_simulation import FEATURES, simulate
+    plt = _pyplot()
+    
+    result = simulate(patients=SIMULATION_PATIENTS)
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
     
     # ROC Curve
-    fpr = np.array([0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
-    tpr = np.array([0, 0.3, 0.5, 0.65, 0.75, 0.82, 0.87, 0.91, 0.94, 0.97, 1.0])
-    
-    ax1.plot(fpr, tpr, 'b-', linewidth=3, label='AI Model (AUC = 0.89)')
+    auc_low, auc_high = result['auc_ci']
+    ax1.plot(result['roc']['fpr'], result['roc']['tpr'], 'b-', linewidth=3,
+             label=f"AI Model (AUC = {result['auc']:.3f}, 95% CI {auc_low:.3f}-{auc_high:.3f})")
     ax1.plot([0, 1], [0, 1], 'r--', linewidth=2, label='Random Classifier')
     ax1.set_xlabel('False Positive Rate', fontsize=10, weight='bold')
     ax1.set_ylabel('True Positive Rate', fontsize=10, weight='bold')
-    ax1.set_title('ROC Curve - Patient Risk Prediction', fontsize=12, weight='bold')
+    ax1.set_title(f"ROC Curve - Patient Risk Prediction ({result['patients']:,} patients)",
+                  fontsize=12, weight='bold')
     ax1.legend()
     ax1.grid(True, alpha=0.3)
     
     # Confusion Matrix
-    conf_matrix = np.array([[850, 50], [30, 870]])
-    sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues', ax=ax2,
+    conf_matrix = np.array(result['confusion_matrix'])
+    sns.heatmap(conf_matrix, annot=True, fmt=',d', cmap='Blues', ax=ax2,
                 xticklabels=['Low Risk', 'High Risk'], yticklabels=['Low Risk', 'High Risk'])
-    ax2.set_title('Confusion Matrix - Risk Classification', fontsize=12, weight='bold')
+    ax2.set_title(f"Confusion Matrix - Risk Classification (threshold {result['threshold']})",
+                  fontsize=12, weight='bold')
     ax2.set_xlabel('Predicted', fontsize=10, weight='bold')
     ax2.set_ylabel('Actual', fontsize=10, weight='bold')
     
-    # Feature Importance
-    features = ['Age', 'BMI', 'Blood Pressure', 'Cholesterol', 'Glucose', 'Family History']
-    importance = [0.25, 0.18, 0.22, 0.15, 0.12, 0.08]
+    # Feature Importance (drop in AUC when the feature is shuffled)
+    importance = [result['feature_importance'][feature] for feature in FEATURES]
     
-    bars = ax3.barh(features, importance, color='lightgreen', edgecolor='black')
+    bars = ax3.barh(FEATURES, importance, color='lightgreen', edgecolor='black')
     ax3.set_xlabel('Feature Importance', fontsize=10, weight='bold')
     ax3.set_title('AI Model Feature Importance', fontsize=12, weight='bold')
     
     # Training Progress
-    epochs = range(1, 51)
-    train_loss = [0.8 - 0.6 * (1 - np.exp(-0.1 * np.array(epochs)))]
-    val_loss = [0.85 - 0.55 * (1 - np.exp(-0.08 * np.array(epochs)))]
+    train_loss = result['training']['train_loss']
+    val_loss = result['training']['val_loss']
+    epochs = range(1, len(train_loss) + 1)
     
-    ax4.plot(epochs, train_loss[0], 'b-', linewidth=2, label='Training Loss')
-    ax4.plot(epochs, val_loss[0], 'r-', linewidth=2, label='Validation Loss')
+    ax4.plot(epochs, train_loss, 'b-', linewidth=2, label='Training Loss')
+    ax4.plot(epochs, val_loss, 'r-', linewidth=2, label='Validation Loss')
     ax4.set_xlabel('Epochs', fontsize=10, weight='bold')
     ax4.set_ylabel('Loss', fontsize=10, weight='bold')
     ax4.set_title('Model Training Progress', fontsize=12, weight='bold')
@@ -221,11 +229,13 @@ def create_simulation_report():
     
     plt.suptitle('AI Healthcare Simulation Report', fontsize=16, weight='bold', y=0.98)
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/simulation_report.png', dpi=300, bbox_inches='tight')
+    export_figure(fig, 'simulation_report')
     plt.close()
 
 # 6. Market Analysis Chart
 def create_market_analysis():
+    plt = _pyplot()
+    
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
     
     # Market size projection
@@ -251,27 +261,58 @@ def create_market_analysis():
     ax2.set_title('AI Healthcare Investment Distribution', fontsize=14, weight='bold')
     
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/market_analysis.png', dpi=300, bbox_inches='tight')
+    export_figure(fig, 'market_analysis')
     plt.close()
 
+# Figure name, generator function and output file, in report order
+FIGURES = [
+    ('architecture', 'create_architecture_diagram', 'architecture_diagram.png'),
+    ('process_flow', 'create_process_flow', 'process_flow.png'),
+    ('timeline', 'create_timeline_chart', 'timeline_chart.png'),
+    ('performance', 'create_performance_chart', 'performance_chart.png'),
+    ('simulation_report', 'create_simulation_report', 'simulation_report.png'),
+    ('market_analysis', 'create_market_analysis', 'market_analysis.png'),
+]
+
 if __name__ == "__main__":
+    from artifact_store import ArtifactStore
+    from diagram_build import build_figures, print_report
+
+    figure_names = [name for name, _, _ in FIGURES]
+    parser = argparse.ArgumentParser(description='Generate healthcare AI diagrams')
+    parser.add_argument('figures', nargs='*', metavar='FIGURE',
+                        help=f"Figures to build (default: all). One of: {', '.join(figure_names)}")
+    parser.add_argument('--list', action='store_true', help='List figure names and exit')
+    parser.add_argument('--force', action='store_true', help='Rebuild figures even if unchanged')
+    parser.add_argument('--output-dir', default=figure_export.OUTPUT_DIR,
+                        help='Directory for exported figures (default: $HEALTHCARE_OUTPUT_DIR)')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--no-store', action='store_true',
+                        help='Do not restore from or add to the artifact store')
+    parser.add_argument('--profile', action='store_true',
+                        help='Break render times into construction/layout/draw/encode phases')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, _, output in FIGURES:
+            print(f"{name:<20} {output}")
+        raise SystemExit(0)
+
+    unknown = set(args.figures) - set(figure_names)
+    if unknown:
+        parser.error(f"unknown figure(s): {', '.join(sorted(unknown))}")
+
+    # Worker processes read the output directory from the environment
+    os.environ['HEALTHCARE_OUTPUT_DIR'] = args.output_dir
+    figure_export.OUTPUT_DIR = args.output_dir
+
+    selected = set(args.figures or figure_names)
     print("Generating healthcare AI diagrams...")
-    create_architecture_diagram()
-    print("✓ Architecture diagram created")
-    
-    create_process_flow()
-    print("✓ Process flow diagram created")
-    
-    create_timeline_chart()
-    print("✓ Timeline chart created")
-    
-    create_performance_chart()
-    print("✓ Performance chart created")
-    
-    create_simulation_report()
-    print("✓ Simulation report created")
-    
-    create_market_analysis()
-    print("✓ Market analysis chart created")
-    
-    print("All diagrams generated successfully!")
+    start = time.perf_counter()
+    results = build_figures(
+        [(name, 'generate_diagrams', func, output)
+         for name, func, output in FIGURES if name in selected],
+        args.output_dir, jobs=args.jobs, force=args.force, profile=args.profile,
+        store=None if args.no_store else ArtifactStore()
+    )
+    print_report(results, time.perf_counter() - start)
@@ -3,174 +3,79 @@
 Generate AWS Healthcare AI Architecture Diagram and Convert Thesis to PDF
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import FancyBboxPatch, ConnectionPatch
-import numpy as np
-import subprocess
+import argparse
 import os
 
+# AWS architecture as data: one entry per layer with its row of services
+AWS_BLUE = '#232F3E'
+SERVICE_X = [2, 5, 8, 11, 14]
+
+AWS_ARCHITECTURE_SPEC = {
+    'figsize': (16, 12),
+    'xlim': (0, 16),
+    'ylim': (0, 12),
+    'title': {'text': 'AWS Cloud Architecture for Healthcare AI',
+              'x': 8, 'y': 11.5, 'fontsize': 20, 'fontweight': 'bold'},
+    'subtitle': {'text': 'Real-time Patient Monitoring and AI-Powered Clinical Decision Support',
+                 'x': 8, 'y': 11, 'fontsize': 14, 'style': 'italic'},
+    'styles': {
+        'layer': {'edgecolor': AWS_BLUE},
+        'service': {'facecolor': '#FF9900', 'edgecolor': AWS_BLUE,
+                    'color': 'white', 'fontweight': 'bold'},
+        'source': {'boxstyle': 'round,pad=0.05', 'facecolor': 'white', 'edgecolor': AWS_BLUE,
+                   'linewidth': 1, 'width': 2.5, 'height': 0.6, 'fontsize': 10,
+                   'fontweight': 'normal', 'color': 'black'},
+        'note': {'edgecolor': AWS_BLUE},
+        'flow': {'color': AWS_BLUE, 'head_length': 0.08, 'head_width': 0.05},
+    },
+    'layers': [
+        {'label': 'Data Sources Layer', 'box': [0.5, 9, 15, 1.5], 'label_at': [8, 10.08],
+         'facecolor': '#E8F4FD',
+         'services': {'preset': 'source', 'y': 9.5, 'x': [2.75, 5.55, 8.35, 11.15, 13.95],
+                      'names': ['EHR Systems', 'Medical Devices', 'Wearables',
+                                'Lab Systems', 'Imaging']}},
+        {'label': 'Data Ingestion & Streaming Layer', 'box': [0.5, 7, 15, 1.5],
+         'label_at': [8, 8.08], 'facecolor': '#E8F5E8',
+         'services': {'y': 7.5, 'x': SERVICE_X,
+                      'names': ['Kinesis Data Streams', 'API Gateway', 'IoT Core',
+                                'Direct Connect', 'S3 Transfer']}},
+        {'label': 'Real-time Processing & Analytics Layer', 'box': [0.5, 5, 15, 1.5],
+         'label_at': [8, 6.08], 'facecolor': '#FFF4E6',
+         'services': {'y': 5.5, 'x': SERVICE_X,
+                      'names': ['Lambda Functions', 'Kinesis Analytics', 'EMR Clusters',
+                                'Glue ETL', 'Step Functions']}},
+        {'label': 'AI/ML Services Layer', 'box': [0.5, 3, 15, 1.5], 'label_at': [8, 4.08],
+         'facecolor': '#F0E6FF',
+         'services': {'y': 3.5, 'x': SERVICE_X, 'facecolor': '#8A2BE2',
+                      'names': ['SageMaker', 'Comprehend Medical', 'Textract',
+                                'Rekognition', 'Bedrock']}},
+        {'label': 'Data Storage & Management Layer', 'box': [0.5, 1, 15, 1.5],
+         'label_at': [8, 2.08], 'facecolor': '#FFE6E6',
+         'services': {'y': 1.5, 'x': SERVICE_X, 'facecolor': '#DC143C',
+                      'names': ['S3 Buckets', 'RDS/Aurora', 'DynamoDB',
+                                'Redshift', 'ElastiCache']}},
+    ],
+    'boxes': [
+        {'text': 'Security: IAM, KMS, VPC, CloudTrail', 'box': [0.2, 0.2, 4, 0.6]},
+        {'text': 'Compliance: HIPAA, SOC 2, ISO 27001', 'box': [11.8, 0.2, 4, 0.6]},
+    ],
+    # Vertical arrows between adjacent layers, tail to head
+    'arrows': {'segments': [[x, top, x, top - 0.4]
+                            for x in SERVICE_X for top in (9.2, 7.2, 5.2, 3.2)]},
+}
+
 def create_aws_architecture_diagram():
     """Create comprehensive AWS Healthcare AI Architecture Diagram"""
-    fig, ax = plt.subplots(1, 1, figsize=(16, 12))
-    ax.set_xlim(0, 16)
-    ax.set_ylim(0, 12)
-    ax.axis('off')
-    
-    # Color scheme
-    aws_orange = '#FF9900'
-    aws_blue = '#232F3E'
-    light_blue = '#E8F4FD'
-    light_green = '#E8F5E8'
-    light_orange = '#FFF4E6'
-    
-    # Title
-    ax.text(8, 11.5, 'AWS Cloud Architecture for Healthcare AI', 
-            fontsize=20, fontweight='bold', ha='center')
-    ax.text(8, 11, 'Real-time Patient Monitoring and AI-Powered Clinical Decision Support', 
-            fontsize=14, ha='center', style='italic')
-    
-    # Data Sources Layer
-    ax.add_patch(FancyBboxPatch((0.5, 9), 15, 1.5, 
-                                boxstyle="round,pad=0.1", 
-                                facecolor=light_blue, 
-                                edgecolor=aws_blue, linewidth=2))
-    ax.text(8, 10, 'Data Sources Layer', fontsize=14, fontweight='bold', ha='center')
-    
-    # Data sources
-    sources = ['EHR Systems', 'Medical Devices', 'Wearables', 'Lab Systems', 'Imaging']
-    for i, source in enumerate(sources):
-        x = 1.5 + i * 2.8
-        ax.add_patch(FancyBboxPatch((x, 9.2), 2.5, 0.6, 
-                                    boxstyle="round,pad=0.05", 
-                                    facecolor='white', 
-                                    edgecolor=aws_blue))
-        ax.text(x + 1.25, 9.5, source, fontsize=10, ha='center')
-    
-    # Data Ingestion Layer
-    ax.add_patch(FancyBboxPatch((0.5, 7), 15, 1.5, 
-                                boxstyle="round,pad=0.1", 
-                                facecolor=light_green, 
-                                edgecolor=aws_blue, linewidth=2))
-    ax.text(8, 8, 'Data Ingestion & Streaming Layer', fontsize=14, fontweight='bold', ha='center')
-    
-    # AWS Ingestion Services
-    ingestion_services = [
-        ('Kinesis Data Streams', 2, 7.5),
-        ('API Gateway', 5, 7.5),
-        ('IoT Core', 8, 7.5),
-        ('Direct Connect', 11, 7.5),
-        ('S3 Transfer', 14, 7.5)
-    ]
-    
-    for service, x, y in ingestion_services:
-        ax.add_patch(FancyBboxPatch((x-0.8, y-0.3), 1.6, 0.6, 
-                                    boxstyle="round,pad=0.05", 
-                                    facecolor=aws_orange, 
-                                    edgecolor=aws_blue))
-        ax.text(x, y, service, fontsize=9, ha='center', color='white', fontweight='bold')
-    
-    # Processing Layer
-    ax.add_patch(FancyBboxPatch((0.5, 5), 15, 1.5, 
-                                boxstyle="round,pad=0.1", 
-                                facecolor=light_orange, 
-                                edgecolor=aws_blue, linewidth=2))
-    ax.text(8, 6, 'Real-time Processing & Analytics Layer', fontsize=14, fontweight='bold', ha='center')
-    
-    # Processing Services
-    processing_services = [
-        ('Lambda Functions', 2, 5.5),
-        ('Kinesis Analytics', 5, 5.5),
-        ('EMR Clusters', 8, 5.5),
-        ('Glue ETL', 11, 5.5),
-        ('Step Functions', 14, 5.5)
-    ]
-    
-    for service, x, y in processing_services:
-        ax.add_patch(FancyBboxPatch((x-0.8, y-0.3), 1.6, 0.6, 
-                                    boxstyle="round,pad=0.05", 
-                                    facecolor=aws_orange, 
-                                    edgecolor=aws_blue))
-        ax.text(x, y, service, fontsize=9, ha='center', color='white', fontweight='bold')
-    
-    # AI/ML Layer
-    ax.add_patch(FancyBboxPatch((0.5, 3), 15, 1.5, 
-                                boxstyle="round,pad=0.1", 
-                                facecolor='#F0E6FF', 
-                                edgecolor=aws_blue, linewidth=2))
-    ax.text(8, 4, 'AI/ML Services Layer', fontsize=14, fontweight='bold', ha='center')
-    
-    # ML Services
-    ml_services = [
-        ('SageMaker', 2, 3.5),
-        ('Comprehend Medical', 5, 3.5),
-        ('Textract', 8, 3.5),
-        ('Rekognition', 11, 3.5),
-        ('Bedrock', 14, 3.5)
-    ]
-    
-    for service, x, y in ml_services:
-        ax.add_patch(FancyBboxPatch((x-0.8, y-0.3), 1.6, 0.6, 
-                                    boxstyle="round,pad=0.05", 
-                                    facecolor='#8A2BE2', 
-                                    edgecolor=aws_blue))
-        ax.text(x, y, service, fontsize=9, ha='center', color='white', fontweight='bold')
-    
-    # Storage Layer
-    ax.add_patch(FancyBboxPatch((0.5, 1), 15, 1.5, 
-                                boxstyle="round,pad=0.1", 
-                                facecolor='#FFE6E6', 
-                                edgecolor=aws_blue, linewidth=2))
-    ax.text(8, 2, 'Data Storage & Management Layer', fontsize=14, fontweight='bold', ha='center')
-    
-    # Storage Services
-    storage_services = [
-        ('S3 Buckets', 2, 1.5),
-        ('RDS/Aurora', 5, 1.5),
-        ('DynamoDB', 8, 1.5),
-        ('Redshift', 11, 1.5),
-        ('ElastiCache', 14, 1.5)
-    ]
-    
-    for service, x, y in storage_services:
-        ax.add_patch(FancyBboxPatch((x-0.8, y-0.3), 1.6, 0.6, 
-                                    boxstyle="round,pad=0.05", 
-                                    facecolor='#DC143C', 
-                                    edgecolor=aws_blue))
-        ax.text(x, y, service, fontsize=9, ha='center', color='white', fontweight='bold')
-    
-    # Add arrows showing data flow
-    arrow_props = dict(arrowstyle='->', lw=2, color=aws_blue)
-    
-    # Vertical arrows between layers
-    for x in [2, 5, 8, 11, 14]:
-        ax.annotate('', xy=(x, 8.8), xytext=(x, 9.2), arrowprops=arrow_props)
-        ax.annotate('', xy=(x, 6.8), xytext=(x, 7.2), arrowprops=arrow_props)
-        ax.annotate('', xy=(x, 4.8), xytext=(x, 5.2), arrowprops=arrow_props)
-        ax.annotate('', xy=(x, 2.8), xytext=(x, 3.2), arrowprops=arrow_props)
-    
-    # Add security and compliance annotations
-    ax.add_patch(FancyBboxPatch((0.2, 0.2), 4, 0.6, 
-                                boxstyle="round,pad=0.05", 
-                                facecolor='#FFD700', 
-                                edgecolor=aws_blue))
-    ax.text(2.2, 0.5, 'Security: IAM, KMS, VPC, CloudTrail', 
-            fontsize=10, ha='center', fontweight='bold')
-    
-    ax.add_patch(FancyBboxPatch((11.8, 0.2), 4, 0.6, 
-                                boxstyle="round,pad=0.05", 
-                                facecolor='#FFD700', 
-                                edgecolor=aws_blue))
-    ax.text(13.8, 0.5, 'Compliance: HIPAA, SOC 2, ISO 27001', 
-            fontsize=10, ha='center', fontweight='bold')
-    
-    plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/aws_architecture_diagram.png', 
-                dpi=300, bbox_inches='tight', facecolor='white')
-    plt.close()
+    from layered_diagram import render_to_file
+
+    render_to_file(AWS_ARCHITECTURE_SPEC, 'aws_architecture_diagram')
 
 def create_real_time_use_case_diagram():
     """Create real-time use case flow diagram"""
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import FancyBboxPatch
+    from figure_export import export_figure
+
     fig, ax = plt.subplots(1, 1, figsize=(14, 10))
     ax.set_xlim(0, 14)
     ax.set_ylim(0, 10)
@@ -268,51 +173,54 @@ def create_real_time_use_case_diagram():
             color='red', fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/healthcare/real_time_use_case.png', 
-                dpi=300, bbox_inches='tight', facecolor='white')
+    export_figure(fig, 'real_time_use_case')
     plt.close()
 
-def convert_html_to_pdf():
-    """Convert HTML thesis to PDF using wkhtmltopdf"""
-    try:
-        # Check if wkhtmltopdf is installed
-        subprocess.run(['which', 'wkhtmltopdf'], check=True, capture_output=True)
-    except subprocess.CalledProcessError:
-        print("Installing wkhtmltopdf...")
-        subprocess.run(['sudo', 'apt-get', 'update'], check=True)
-        subprocess.run(['sudo', 'apt-get', 'install', '-y', 'wkhtmltopdf'], check=True)
-    
-    # Convert HTML to PDF
-    input_file = '/home/ubuntu/healthcare/phd_thesis.html'
-    output_file = '/home/ubuntu/healthcare/Future_Healthcare_AI_PhD_Thesis.pdf'
-    
-    cmd = [
-        'wkhtmltopdf',
-        '--page-size', 'A4',
-        '--margin-top', '0.75in',
-        '--margin-right', '0.75in',
-        '--margin-bottom', '0.75in',
-        '--margin-left', '0.75in',
-        '--encoding', 'UTF-8',
-        '--print-media-type',
-        '--enable-local-file-access',
-        input_file,
-        output_file
-    ]
-    
+def convert_html_to_pdf(html_file=None, pdf_file=None):
+    """Convert HTML thesis to PDF, re-rendering only the chapters that changed"""
+    from pdf_incremental import build_pdf
+    from pdf_optimize import optimize_pdf, print_report
+    from paths import HEALTHCARE_DIR, OUTPUT_DIR
+
+    input_file = html_file or os.path.join(HEALTHCARE_DIR, 'phd_thesis.html')
+    output_file = pdf_file or os.path.join(OUTPUT_DIR, 'Future_Healthcare_AI_PhD_Thesis.pdf')
+    stylesheet = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'print.css')
+
     print("Converting HTML to PDF...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode == 0:
-        print(f"✅ PDF thesis generated successfully: {output_file}")
-        # Get file size
-        size = os.path.getsize(output_file) / (1024 * 1024)  # MB
-        print(f"📄 File size: {size:.1f} MB")
-    else:
-        print(f"❌ Error generating PDF: {result.stderr}")
+    build_pdf(input_file, output_file, stylesheets=[stylesheet])
+    print_report(optimize_pdf(output_file))
+    print(f"✅ PDF thesis generated successfully: {output_file}")
+
+# Thesis figures as (name, function, output file), for the build graph
+FIGURES = [
+    ('aws_architecture', 'create_aws_architecture_diagram', 'aws_architecture_diagram.png'),
+    ('real_time_use_case', 'create_real_time_use_case_diagram', 'real_time_use_case.png'),
+]
+
+# Build targets, in the order main() runs them by default
+TARGETS = {
+    'aws_architecture': create_aws_architecture_diagram,
+    'real_time_use_case': create_real_time_use_case_diagram,
+    'pdf': convert_html_to_pdf,
+}
 
 def main():
     """Main function to generate all diagrams and PDF"""
+    parser = argparse.ArgumentParser(description='Generate thesis diagrams and PDF')
+    parser.add_argument('targets', nargs='*', metavar='TARGET',
+                        help=f"Targets to build (default: all). One of: {', '.join(TARGETS)}")
+    args = parser.parse_args()
+
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    if args.targets:
+        for target in args.targets:
+            TARGETS[target]()
+            print(f"✅ {target} built")
+        return
+
     print("🏥 Generating AWS Healthcare AI Architecture Diagram...")
     create_aws_architecture_diagram()
     print("✅ AWS Architecture diagram created")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Declarative layered-diagram renderer for the healthcare architecture figures
+A spec (dict, JSON or YAML) of layers and services is drawn with shared styles,
+all boxes in a single PatchCollection and all arrows in two collections.
+
+Spec layout:
+
+    {
+        "figsize": [16, 12], "xlim": [0, 16], "ylim": [0, 12],
+        "title": {"text": "...", "x": 8, "y": 11.5, "fontsize": 20},
+        "styles": {"service": {"facecolor": "#FF9900", "color": "white"}},
+        "layers": [
+            {"label": "Data Ingestion Layer", "box": [0.5, 7, 15, 1.5],
+             "label_at": [8, 8], "facecolor": "#E8F5E8",
+             "services": {"names": ["Kinesis", "IoT Core"], "x": [2, 5], "y": 7.5}}
+        ],
+        "boxes": [{"text": "Security: IAM, KMS", "box": [0.2, 0.2, 4, 0.6], "preset": "note"}],
+        "arrows": {"preset": "flow", "segments": [[2, 9.2, 2, 8.8]]},
+        "texts": [{"text": "< 100ms", "x": 3.5, "y": 8.5, "color": "red"}]
+    }
+
+Any box, layer or service may pick a named style with "preset" and override
+style keys inline; "style" is the matplotlib font style (e.g. "italic").
+"""
+
+import argparse
+import json
+import math
+import os
+
+from figure_export import EXPORT_DPIS, export_figure
+
+DEFAULT_STYLES = {
+    'layer': {
+        'boxstyle': 'round,pad=0.1', 'facecolor': 'white', 'edgecolor': 'black',
+        'linewidth': 2, 'fontsize': 14, 'fontweight': 'bold', 'color': 'black',
+    },
+    'service': {
+        'boxstyle': 'round,pad=0.05', 'facecolor': 'white', 'edgecolor': 'black',
+        'linewidth': 1, 'width': 1.6, 'height': 0.6, 'fontsize': 9,
+        'fontweight': 'normal', 'color': 'black',
+    },
+    'note': {
+        'boxstyle': 'round,pad=0.05', 'facecolor': '#FFD700', 'edgecolor': 'black',
+        'linewidth': 1, 'fontsize': 10, 'fontweight': 'bold', 'color': 'black',
+    },
+    'flow': {
+        'color': 'black', 'linewidth': 2, 'head': 'open', 'head_length': 0.15,
+        'head_width': 0.1,
+    },
+    'text': {
+        'fontsize': 10, 'fontweight': 'normal', 'color': 'black', 'style': 'normal',
+    },
+}
+
+TEXT_KEYS = ('fontsize', 'fontweight', 'color', 'style')
+
+
+def load_spec(path):
+    """Load a diagram spec from a .json, .yaml or .yml file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("PyYAML is required for YAML diagram specs: pip install pyyaml") from e
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _resolve(styles, item, default_style):
+    """Merge the item's preset (named style) with any inline overrides on the item"""
+    style = dict(styles[item.get('preset', default_style)])
+    style.update({key: value for key, value in item.items() if key in style})
+    return style
+
+
+def _text_kwargs(style):
+    return {key: style[key] for key in TEXT_KEYS if key in style}
+
+
+class _BoxBatch:
+    """Accumulates boxes and their per-box colours for one PatchCollection"""
+
+    def __init__(self):
+        self.patches = []
+        self.facecolors = []
+        self.edgecolors = []
+        self.linewidths = []
+
+    def add(self, x, y, width, height, style):
+        from matplotlib.patches import FancyBboxPatch
+
+        self.patches.append(FancyBboxPatch((x, y), width, height, boxstyle=style['boxstyle']))
+        self.facecolors.append(style['facecolor'])
+        self.edgecolors.append(style['edgecolor'])
+        self.linewidths.append(style['linewidth'])
+
+    def draw(self, ax):
+        from matplotlib.collections import PatchCollection
+
+        if self.patches:
+            ax.add_collection(PatchCollection(
+                self.patches, match_original=False, facecolors=self.facecolors,
+                edgecolors=self.edgecolors, linewidths=self.linewidths, zorder=1
+            ))
+
+
+def _arrow_geometry(segments, head_length, head_width, head):
+    """Return shaft segments and arrowhead shapes for (x0, y0, x1, y1) arrows"""
+    shafts = []
+    heads = []
+    for x0, y0, x1, y1 in segments:
+        dx, dy = x1 - x0, y1 - y0
+        length = math.hypot(dx, dy)
+        if length == 0:
+            continue
+        ux, uy = dx / length, dy / length
+        bx, by = x1 - ux * head_length, y1 - uy * head_length
+        left = (bx - uy * head_width, by + ux * head_width)
+        right = (bx + uy * head_width, by - ux * head_width)
+        # Filled heads cover the shaft end; open heads need the shaft to reach the tip
+        shafts.append([(x0, y0), (bx, by) if head == 'filled' else (x1, y1)])
+        heads.append([left, (x1, y1), right])
+    return shafts, heads
+
+
+def _draw_arrows(ax, arrows, styles):
+    from matplotlib.collections import LineCollection, PolyCollection
+
+    style = _resolve(styles, arrows, 'flow')
+    shafts, heads = _arrow_geometry(
+        arrows['segments'], style['head_length'], style['head_width'], style['head']
+    )
+    ax.add_collection(LineCollection(
+        shafts, colors=style['color'], linewidths=style['linewidth'], zorder=2
+    ))
+    if style['head'] == 'filled':
+        ax.add_collection(PolyCollection(
+            heads, facecolors=style['color'], edgecolors=style['color'], zorder=2
+        ))
+    else:
+        ax.add_collection(LineCollection(
+            heads, colors=style['color'], linewidths=style['linewidth'], zorder=2
+        ))
+
+
+def render(spec, ax):
+    """Draw a layered-diagram spec onto an existing Axes"""
+    styles = {name: dict(style) for name, style in DEFAULT_STYLES.items()}
+    for name, overrides in spec.get('styles', {}).items():
+        styles.setdefault(name, {}).update(overrides)
+
+    ax.set_xlim(*spec.get('xlim', (0, 10)))
+    ax.set_ylim(*spec.get('ylim', (0, 8)))
+    ax.axis('off')
+
+    boxes = _BoxBatch()
+    labels = []
+
+    for layer in spec.get('layers', []):
+        if 'box' in layer:
+            style = _resolve(styles, layer, 'layer')
+            x, y, width, height = layer['box']
+            boxes.add(x, y, width, height, style)
+            label_x, label_y = layer.get('label_at', (x + width / 2, y + height / 2))
+            if layer.get('label'):
+                labels.append((label_x, label_y, layer['label'], _text_kwargs(style)))
+
+        services = layer.get('services')
+        if services:
+            style = _resolve(styles, services, 'service')
+            xs = services['x']
+            ys = services['y'] if isinstance(services['y'], list) else [services['y']] * len(xs)
+            for name, cx, cy in zip(services['names'], xs, ys):
+                boxes.add(cx - style['width'] / 2, cy - style['height'] / 2,
+                          style['width'], style['height'], style)
+                labels.append((cx, cy, name, _text_kwargs(style)))
+
+    for box in spec.get('boxes', []):
+        style = _resolve(styles, box, 'note')
+        x, y, width, height = box['box']
+        boxes.add(x, y, width, height, style)
+        if box.get('text'):
+            label_x, label_y = box.get('label_at', (x + width / 2, y + height / 2))
+            labels.append((label_x, label_y, box['text'], _text_kwargs(style)))
+
+    boxes.draw(ax)
+
+    if spec.get('arrows'):
+        _draw_arrows(ax, spec['arrows'], styles)
+
+    for x, y, text, kwargs in labels:
+        ax.text(x, y, text, ha='center', va='center', zorder=3, **kwargs)
+
+    for item in spec.get('texts', []):
+        style = _resolve(styles, item, 'text')
+        ax.text(item['x'], item['y'], item['text'], ha=item.get('ha', 'center'),
+                va=item.get('va', 'center'), zorder=3, **_text_kwargs(style))
+
+    for key, default_size in (('title', 16), ('subtitle', 12)):
+        if key not in spec:
+            continue
+        item = spec[key]
+        if 'x' in item:
+            kwargs = _text_kwargs({**styles['text'], 'fontsize': default_size, **item})
+            ax.text(item['x'], item['y'], item['text'], ha='center', va='center', **kwargs)
+        else:
+            ax.set_title(item['text'], fontsize=item.get('fontsize', default_size),
+                         weight=item.get('fontweight', 'bold'), pad=item.get('pad', 20))
+
+
+def render_to_file(spec, stem, output_dir=None, dpis=EXPORT_DPIS):
+    """Render a spec into its own figure and export every format and DPI variant"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(1, 1, figsize=spec.get('figsize', (12, 8)))
+    render(spec, ax)
+    plt.tight_layout()
+    written = export_figure(fig, stem, output_dir=output_dir, dpis=dpis)
+    plt.close(fig)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render a layered architecture diagram spec')
+    parser.add_argument('spec', help='Spec file (.json, .yaml or .yml)')
+    parser.add_argument('stem', help='Output name without extension')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--dpi', type=int, nargs='+', default=list(EXPORT_DPIS))
+    args = parser.parse_args()
+
+    for path in render_to_file(load_spec(args.spec), args.stem, args.output_dir, dpis=args.dpi):
+        print(f"✅ {os.path.abspath(path)}")
+
+
+if __name__ == '__main__':
+    main()
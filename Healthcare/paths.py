@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Filesystem locations shared by the healthcare scripts
+Sources live in HEALTHCARE_DIR (default: this directory); generated figures and
+PDFs go to HEALTHCARE_OUTPUT_DIR (default: HEALTHCARE_DIR) and are cached in the
+artifact store at HEALTHCARE_ARTIFACT_DIR (default: OUTPUT_DIR/.artifacts).
+"""
+
+import os
+
+HEALTHCARE_DIR = os.environ.get('HEALTHCARE_DIR', os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.environ.get('HEALTHCARE_OUTPUT_DIR', HEALTHCARE_DIR)
+ARTIFACT_DIR = os.environ.get('HEALTHCARE_ARTIFACT_DIR', os.path.join(OUTPUT_DIR, '.artifacts'))
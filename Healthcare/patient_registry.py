@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Patient Registry - SQLite-backed patient store for the Healthcare AI Platform
+Provides cursor pagination, name prefix search and a synthetic data generator
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from paths import HEALTHCARE_DIR
+from sqlite_connections import ThreadConnections
+
+DEFAULT_DB_PATH = os.path.join(HEALTHCARE_DIR, 'patients.db')
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    mrn TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    condition TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    risk_score REAL NOT NULL,
+    last_visit TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_mrn ON patients (mrn);
+CREATE INDEX IF NOT EXISTS idx_patients_name ON patients (name_key, id);
+CREATE INDEX IF NOT EXISTS idx_patients_risk ON patients (risk_level, name_key, id);
+"""
+
+PATIENT_COLUMNS = 'id, mrn, name, age, condition, risk_level, risk_score, last_visit'
+
+FIRST_NAMES = [
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+    'William', 'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Charles', 'Karen', 'Daniel', 'Nancy', 'Matthew', 'Lisa',
+    'Anthony', 'Betty', 'Mark', 'Margaret', 'Steven', 'Sandra', 'Paul', 'Ashley',
+    'Andrew', 'Emily', 'Joshua', 'Donna', 'Kevin', 'Michelle', 'Brian', 'Carol',
+    'Priya', 'Wei', 'Aisha', 'Carlos', 'Yuki', 'Fatima', 'Omar', 'Sofia',
+]
+
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+    'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+    'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson',
+    'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson', 'Walker',
+    'Young', 'Allen', 'King', 'Wright', 'Scott', 'Nguyen', 'Patel', 'Kim', 'Chen',
+]
+
+CONDITIONS = [
+    'Hypertension', 'Diabetes', 'Heart Disease', 'Routine Checkup', 'Asthma',
+    'COPD', 'Chronic Kidney Disease', 'Arthritis', 'Obesity', 'Depression',
+]
+
+
+def encode_cursor(name_key, patient_id):
+    """Encode the last row's sort key as an opaque pagination cursor"""
+    raw = json.dumps([name_key, patient_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor back into (name_key, id)"""
+    try:
+        name_key, patient_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(name_key), int(patient_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string above every string starting with prefix, or None if there is none
+
+    SQLite compares TEXT as UTF-8 bytes, which orders like code points, so the
+    bound is the prefix with its last character incremented (skipping the
+    surrogate range, which UTF-8 cannot encode).
+    """
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(0xE000 if last == 0xD7FF else last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+def generate_synthetic_patients(count, seed=42, start_id=1):
+    """Yield synthetic patient rows suitable for PatientRegistry.bulk_insert"""
+    rng = random.Random(seed)
+    today = date.today()
+    for patient_id in range(start_id, start_id + count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        age = rng.randint(1, 98)
+        risk_score = round(min(10.0, max(0.0, rng.gauss(3.5 + age / 25, 2.0))), 1)
+        if risk_score >= 7:
+            risk_level = 'High'
+        elif risk_score >= 4:
+            risk_level = 'Medium'
+        else:
+            risk_level = 'Low'
+        last_visit = (today - timedelta(days=rng.randint(0, 730))).isoformat()
+        yield (
+            patient_id,
+            f"MRN{patient_id:08d}",
+            name,
+            name.lower(),
+            age,
+            rng.choice(CONDITIONS),
+            risk_level,
+            risk_score,
+            last_visit,
+        )
+
+
+class PatientRegistry:
+    """Patient store with keyset pagination over the (name, id) index"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._connections = ThreadConnections(db_path, row_factory=sqlite3.Row)
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """Return this thread's SQLite connection, opening it on first use"""
+        return self._connections.get()
+
+    def close(self):
+        """Close this thread's connection"""
+        self._connections.close()
+
+    def count(self):
+        """Return the total number of patients"""
+        return self.connection().execute('SELECT COUNT(*) FROM patients').fetchone()[0]
+
+    def bulk_insert(self, rows, batch_size=10000):
+        """Insert patient rows in large transactions and return the number inserted"""
+        conn = self.connection()
+        inserted = 0
+        batch = []
+        sql = ('INSERT INTO patients (id, mrn, name, name_key, age, condition, '
+               'risk_level, risk_score, last_visit) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany(sql, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(sql, batch)
+            inserted += len(batch)
+        return inserted
+
+    def seed(self, count, seed=42):
+        """Append synthetic patients after the current highest id"""
+        conn = self.connection()
+        start_id = (conn.execute('SELECT MAX(id) FROM patients').fetchone()[0] or 0) + 1
+        inserted = self.bulk_insert(generate_synthetic_patients(count, seed=seed, start_id=start_id))
+        conn.execute('ANALYZE')
+        return inserted
+
+    def get_by_mrn(self, mrn):
+        """Look up a single patient by MRN"""
+        row = self.connection().execute(
+            f'SELECT {PATIENT_COLUMNS} FROM patients WHERE mrn = ?', (mrn,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def list_patients(self, search=None, risk_level=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """Return one page of patients ordered by name, plus the cursor for the next page"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses = []
+        params = []
+
+        if risk_level:
+            if risk_level not in RISK_LEVELS:
+                raise ValueError(f"Unknown risk level: {risk_level}")
+            clauses.append('risk_level = ?')
+            params.append(risk_level)
+
+        if search:
+            # Prefix search as a half-open range so SQLite can seek the name index
+            prefix = search.strip().lower()
+            upper = prefix_upper_bound(prefix)
+            clauses.append('name_key >= ?')
+            params.append(prefix)
+            if upper is not None:
+                clauses.append('name_key < ?')
+                params.append(upper)
+
+        if cursor:
+            name_key, patient_id = decode_cursor(cursor)
+            clauses.append('(name_key, id) > (?, ?)')
+            params.extend([name_key, patient_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.connection().execute(
+            f'SELECT {PATIENT_COLUMNS}, name_key FROM patients {where} '
+            f'ORDER BY name_key, id LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor(last['name_key'], last['id'])
+
+        patients = []
+        for row in rows:
+            patient = dict(row)
+            del patient['name_key']
+            patients.append(patient)
+        return {'patients': patients, 'next_cursor': next_cursor}
+
+    def risk_summary(self):
+        """Return patient counts per risk level"""
+        rows = self.connection().execute(
+            'SELECT risk_level, COUNT(*) FROM patients GROUP BY risk_level'
+        ).fetchall()
+        summary = {level: 0 for level in RISK_LEVELS}
+        summary.update({level: total for level, total in rows})
+        summary['Total'] = sum(summary[level] for level in RISK_LEVELS)
+        return summary
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def benchmark(db_path, pages=200, page_size=DEFAULT_PAGE_SIZE):
+    """Time first pages, deep cursor walks, prefix searches and risk filters"""
+    registry = PatientRegistry(db_path)
+    total = registry.count()
+    print(f"📊 Benchmarking registry with {total:,} patients ({page_size} rows/page)")
+
+    scenarios = {
+        'first page': lambda _: registry.list_patients(limit=page_size),
+        'prefix search': lambda i: registry.list_patients(
+            search=FIRST_NAMES[i % len(FIRST_NAMES)][:3], limit=page_size),
+        'risk filter': lambda i: registry.list_patients(
+            risk_level=RISK_LEVELS[i % len(RISK_LEVELS)], limit=page_size),
+    }
+
+    results = {}
+    for label, query in scenarios.items():
+        samples = []
+        for i in range(pages):
+            start = time.perf_counter()
+            query(i)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[label] = samples
+
+    # Walk forward through the cursor chain; every page must cost the same
+    samples = []
+    cursor = None
+    for _ in range(pages):
+        start = time.perf_counter()
+        page = registry.list_patients(cursor=cursor, limit=page_size)
+        samples.append((time.perf_counter() - start) * 1000)
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    results['cursor walk'] = samples
+
+    for label, samples in results.items():
+        p50 = _percentile(samples, 0.50)
+        p95 = _percentile(samples, 0.95)
+        status = '✅' if p95 < 20 else '❌'
+        print(f"{status} {label:<14} p50 {p50:6.2f} ms   p95 {p95:6.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Patient registry tools')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite database path')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='Insert synthetic patients')
+    seed_parser.add_argument('--count', type=int, default=1000)
+    seed_parser.add_argument('--seed', type=int, default=42)
+
+    bench_parser = subparsers.add_parser('benchmark', help='Measure page latency')
+    bench_parser.add_argument('--pages', type=int, default=200)
+    bench_parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+
+    args = parser.parse_args()
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+
+    if args.command == 'seed':
+        start = time.perf_counter()
+        inserted = PatientRegistry(args.db).seed(args.count, seed=args.seed)
+        print(f"✅ Seeded {inserted:,} patients in {time.perf_counter() - start:.1f}s")
+    elif args.command == 'benchmark':
+        benchmark(args.db, pages=args.pages, page_size=args.page_size)
+
+
+if __name__ == '__main__':
+    main()
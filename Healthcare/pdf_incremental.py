@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Incremental PDF builds for the thesis and whitepapers
+Splits a document at its top-level title page / chapter / TOC blocks, renders
+each block in parallel through pdf_render, caches every block's PDF by content
+hash and merges them, fixing up the table-of-contents page numbers.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+CACHE_DIR_NAME = '.pdf_sections'
+SECTION_CLASSES = ('title-page', 'chapter', 'toc')
+
+TOC_ITEM_RE = re.compile(
+    r'(<div class="toc-item"><span>)(.*?)(</span><span>)(.*?)(</span></div>)'
+)
+CHAPTER_TITLE_RE = re.compile(r'class="chapter-title">(.*?)</div>', re.S)
+RESOURCE_RE = re.compile(r'''\b(?:src|href)\s*=\s*["']([^"']+)["']''', re.I)
+
+
+def _require_pypdf():
+    try:
+        import pypdf
+    except ImportError as e:
+        raise ImportError("pypdf is required for incremental PDF builds: pip install pypdf") from e
+    return pypdf
+
+
+class _SectionSplitter(HTMLParser):
+    """Records the source offsets of every top-level <div> inside <body>"""
+
+    def __init__(self, source):
+        super().__init__(convert_charrefs=False)
+        self.source = source
+        self.line_offsets = [0]
+        for line in source.splitlines(keepends=True):
+            self.line_offsets.append(self.line_offsets[-1] + len(line))
+        self.body_start = None
+        self.body_end = None
+        self.depth = 0
+        self.blocks = []
+        self._block_start = None
+        self._block_classes = ()
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.body_start = self._offset() + len(self.get_starttag_text())
+        elif tag == 'div' and self.body_start is not None:
+            if self.depth == 0:
+                self._block_start = self._offset()
+                self._block_classes = tuple(dict(attrs).get('class', '').split())
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'body':
+            self.body_end = self._offset()
+        elif tag == 'div' and self.body_start is not None and self.depth > 0:
+            self.depth -= 1
+            if self.depth == 0:
+                end = self.source.index('>', self._offset()) + 1
+                self.blocks.append((self._block_start, end, self._block_classes))
+
+
+def split_sections(source):
+    """Split an HTML document into (head, sections, tail).
+
+    Each section is a dict with its kind, title and HTML fragment. Anything
+    between two top-level blocks (comments, whitespace) travels with the
+    following block so that re-joining the fragments reproduces the body.
+    """
+    splitter = _SectionSplitter(source)
+    splitter.feed(source)
+    splitter.close()
+    if splitter.body_start is None or splitter.body_end is None:
+        raise ValueError("Document has no <body> to split")
+
+    sections = []
+    cursor = splitter.body_start
+    for start, end, classes in splitter.blocks:
+        kind = next((c for c in classes if c in SECTION_CLASSES), None)
+        if kind is None and sections:
+            # Not a page-level block: keep it with the previous section
+            sections[-1]['html'] += source[cursor:end]
+        else:
+            fragment = source[cursor:end]
+            match = CHAPTER_TITLE_RE.search(fragment)
+            title = re.sub(r'\s+', ' ', match.group(1)).strip() if match else (kind or 'front')
+            sections.append({'kind': kind or 'front', 'title': title, 'html': fragment})
+        cursor = end
+
+    if sections:
+        sections[-1]['html'] += source[cursor:splitter.body_end]
+    return source[:splitter.body_start], sections, source[splitter.body_end:]
+
+
+def fix_toc(toc_html, start_pages):
+    """Rewrite TOC entry page numbers from the real merged-document start pages"""
+    def replace(match):
+        title = match.group(2).strip()
+        if title not in start_pages:
+            return match.group(0)
+        return f"{match.group(1)}{match.group(2)}{match.group(3)}{start_pages[title]}{match.group(5)}"
+    return TOC_ITEM_RE.sub(replace, toc_html)
+
+
+def local_resources(html, base_dir):
+    """Paths of the local files an HTML fragment references through src= or href="""
+    paths = []
+    for url in RESOURCE_RE.findall(html):
+        parts = urlsplit(url)
+        if parts.scheme not in ('', 'file') or parts.netloc or not parts.path:
+            continue
+        path = os.path.normpath(os.path.join(base_dir, unquote(parts.path)))
+        if os.path.isfile(path):
+            paths.append(path)
+    return sorted(set(paths))
+
+
+def _file_digest(path, digests):
+    """Content hash of a file, remembered per (path, mtime, size) in the digests dict"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digests[key] = digest.hexdigest()
+    return digests[key]
+
+
+def _section_key(head, fragment, tail, stylesheets, base_url, digests=None):
+    """Hash of everything a section's PDF depends on, including the images it embeds"""
+    digests = {} if digests is None else digests
+    digest = hashlib.sha256()
+    for part in [head, fragment, tail, base_url]:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    for path in stylesheets:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    for path in local_resources(head + fragment + tail, base_url):
+        digest.update(f"{path}={_file_digest(path, digests)}".encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+
+def _page_count(pdf_path):
+    pypdf = _require_pypdf()
+    return len(pypdf.PdfReader(pdf_path).pages)
+
+
+class IncrementalPdfBuilder:
+    """Builds one document from cached per-section PDFs"""
+
+    def __init__(self, html_path, pdf_path, stylesheets=(), pool=None, workers=None):
+        self.html_path = os.path.abspath(html_path)
+        self.pdf_path = os.path.abspath(pdf_path)
+        self.stylesheets = [os.path.abspath(path) for path in stylesheets]
+        self.base_url = os.path.dirname(self.html_path) + os.sep
+        # One cache per output document so pruning never touches another build's sections
+        stem = os.path.splitext(os.path.basename(self.pdf_path))[0]
+        self.cache_dir = os.path.join(os.path.dirname(self.pdf_path), CACHE_DIR_NAME, stem)
+        self.pool = pool
+        self.workers = workers
+        self.stats = {'rendered': 0, 'cached': 0}
+
+    def _render_sections(self, pool, head, tail, fragments):
+        """Render fragments not already cached; returns the cached PDF path for each"""
+        paths = []
+        pending = []
+        digests = {}
+        for fragment in fragments:
+            key = _section_key(head, fragment, tail, self.stylesheets, self.base_url, digests)
+            pdf_path = os.path.join(self.cache_dir, f"{key}.pdf")
+            paths.append(pdf_path)
+            if os.path.exists(pdf_path):
+                self.stats['cached'] += 1
+                continue
+            html_path = os.path.join(self.cache_dir, f"{key}.html")
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(head + fragment + tail)
+            pending.append(pool.submit(html_path, pdf_path + '.tmp', self.stylesheets,
+                                       base_url=self.base_url))
+
+        for job_id in pending:
+            result = pool.wait(job_id)
+            if result['state'] != 'done':
+                raise RuntimeError(f"Section render failed: {result['error']}")
+            os.replace(result['pdf'], result['pdf'][:-len('.tmp')])
+            os.remove(result['html'])
+            self.stats['rendered'] += 1
+        return paths
+
+    def build(self):
+        """Render stale sections, fix the TOC, merge, and return the per-build stats"""
+        from pdf_render import PdfRenderPool
+
+        pypdf = _require_pypdf()
+        start = time.perf_counter()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.html_path, 'r', encoding='utf-8') as f:
+            head, sections, tail = split_sections(f.read())
+
+        pool = self.pool or PdfRenderPool(workers=self.workers)
+        try:
+            body_indexes = [i for i, s in enumerate(sections) if s['kind'] != 'toc']
+            toc_indexes = [i for i, s in enumerate(sections) if s['kind'] == 'toc']
+            paths = [None] * len(sections)
+            for index, path in zip(body_indexes, self._render_sections(
+                    pool, head, tail, [sections[i]['html'] for i in body_indexes])):
+                paths[index] = path
+
+            # TOC numbers depend on the TOC's own length; settle within a few passes
+            toc_pages = {i: 1 for i in toc_indexes}
+            for _ in range(3):
+                counts = [toc_pages[i] if i in toc_pages else _page_count(paths[i])
+                          for i in range(len(sections))]
+                start_pages = {}
+                page = 1
+                for section, count in zip(sections, counts):
+                    start_pages.setdefault(section['title'], page)
+                    page += count
+                fixed = [fix_toc(sections[i]['html'], start_pages) for i in toc_indexes]
+                for index, path in zip(toc_indexes, self._render_sections(pool, head, tail, fixed)):
+                    paths[index] = path
+                actual = {i: _page_count(paths[i]) for i in toc_indexes}
+                if actual == toc_pages:
+                    break
+                toc_pages = actual
+        finally:
+            if self.pool is None:
+                pool.shutdown()
+
+        writer = pypdf.PdfWriter()
+        for section, path in zip(sections, paths):
+            first_page = len(writer.pages)
+            writer.append(path)
+            if section['kind'] in ('chapter', 'toc'):
+                writer.add_outline_item(section['title'], first_page)
+        with open(self.pdf_path + '.tmp', 'wb') as f:
+            writer.write(f)
+        os.replace(self.pdf_path + '.tmp', self.pdf_path)
+
+        used = {os.path.basename(path) for path in paths}
+        for name in os.listdir(self.cache_dir):
+            if name not in used:
+                os.remove(os.path.join(self.cache_dir, name))
+
+        self.stats.update({
+            'sections': len(sections),
+            'pages': len(writer.pages),
+            'seconds': time.perf_counter() - start,
+            'size': os.path.getsize(self.pdf_path),
+        })
+        return self.stats
+
+
+def build_pdf(html_path, pdf_path, stylesheets=(), workers=None):
+    """Incrementally build one PDF and print a summary"""
+    stats = IncrementalPdfBuilder(html_path, pdf_path, stylesheets, workers=workers).build()
+    print(f"✅ PDF generated: {pdf_path}")
+    print(f"📄 {stats['pages']} pages, {stats['size'] / (1024 * 1024):.1f} MB; "
+          f"{stats['rendered']} section renders, {stats['cached']} cached, {stats['seconds']:.1f}s")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally build a PDF from sectioned HTML')
+    parser.add_argument('html')
+    parser.add_argument('pdf')
+    parser.add_argument('--stylesheet', action='append', default=[])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    build_pdf(args.html, args.pdf, args.stylesheet, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
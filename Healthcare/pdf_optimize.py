@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+PDF size optimizer for the generated thesis and whitepapers
+Downsamples over-resolved images to the print DPI, subsets embedded TrueType
+fonts to the glyphs actually drawn, merges duplicate objects and reports which
+objects take up the space.
+"""
+
+import argparse
+import hashlib
+import io
+import math
+import os
+import struct
+import zlib
+
+DEFAULT_TARGET_DPI = 150
+# Only resample when it saves a meaningful amount; avoids re-encoding near-target images
+DOWNSAMPLE_THRESHOLD = 1.1
+JPEG_QUALITY = 85
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+
+def _require_pypdf():
+    try:
+        import pypdf
+    except ImportError as e:
+        raise ImportError("pypdf is required for PDF optimization: pip install pypdf") from e
+    return pypdf
+
+
+def _multiply(m, n):
+    """Concatenate PDF matrices: the result applies m first, then n"""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + b * c2, a * b2 + b * d2,
+        c * a2 + d * c2, c * b2 + d * d2,
+        e * a2 + f * c2 + e2, e * b2 + f * d2 + f2,
+    )
+
+
+def _key(obj):
+    """Stable identity for an indirect object shared between pages"""
+    reference = getattr(obj, 'indirect_reference', None)
+    return reference.idnum if reference is not None else id(obj)
+
+
+def _string_bytes(value):
+    """Raw bytes of a shown string, even if pypdf decoded it as text"""
+    if hasattr(value, 'original_bytes'):
+        return value.original_bytes
+    return bytes(value)
+
+
+class _PageScan:
+    """Walks page content streams collecting image placements and drawn glyphs.
+
+    images maps each image XObject to its stream and the largest size (in
+    points) it is drawn at; glyphs maps each font to the set of 2-byte codes
+    shown with it.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.images = {}
+        self.fonts = {}
+        self.glyphs = {}
+        self.contents = []
+
+    def scan_page(self, page_number, page):
+        contents = page.get_contents()
+        if contents is None:
+            return
+        streams = page['/Contents'].get_object()
+        streams = streams if isinstance(streams, list) else [streams]
+        self.contents.append((page_number, [stream.get_object() for stream in streams]))
+        self._scan(contents, page.get('/Resources'), IDENTITY, page_number, depth=0)
+
+    def _scan(self, contents, resources, ctm, page_number, depth):
+        from pypdf.generic import ContentStream
+
+        resources = resources.get_object() if resources is not None else {}
+        xobjects = resources.get('/XObject', {})
+        xobjects = xobjects.get_object() if xobjects else {}
+        fonts = resources.get('/Font', {})
+        fonts = fonts.get_object() if fonts else {}
+        stack = []
+        font = None
+
+        if not isinstance(contents, ContentStream):
+            contents = ContentStream(contents, self.pdf)
+        for operands, operator in contents.operations:
+            if operator == b'q':
+                stack.append(ctm)
+            elif operator == b'Q':
+                ctm = stack.pop() if stack else IDENTITY
+            elif operator == b'cm':
+                ctm = _multiply(tuple(float(value) for value in operands), ctm)
+            elif operator == b'Tf' and operands[0] in fonts:
+                font = fonts[operands[0]].get_object()
+                self.fonts[_key(font)] = font
+            elif operator in (b'Tj', b"'", b'"', b'TJ') and font is not None:
+                shown = operands[-1]
+                strings = shown if operator == b'TJ' else [shown]
+                codes = self.glyphs.setdefault(_key(font), set())
+                for item in strings:
+                    if isinstance(item, (str, bytes)):
+                        data = _string_bytes(item)
+                        codes.update(int.from_bytes(data[i:i + 2], 'big') for i in range(0, len(data) - 1, 2))
+            elif operator == b'Do' and operands[0] in xobjects:
+                xobject = xobjects[operands[0]].get_object()
+                subtype = xobject.get('/Subtype')
+                if subtype == '/Image':
+                    width = math.hypot(ctm[0], ctm[1])
+                    height = math.hypot(ctm[2], ctm[3])
+                    entry = self.images.setdefault(_key(xobject), {
+                        'stream': xobject, 'name': operands[0], 'width_pt': 0, 'height_pt': 0,
+                        'pages': set(),
+                    })
+                    entry['width_pt'] = max(entry['width_pt'], width)
+                    entry['height_pt'] = max(entry['height_pt'], height)
+                    entry['pages'].add(page_number)
+                elif subtype == '/Form' and depth < 8:
+                    matrix = tuple(float(value) for value in xobject.get('/Matrix', IDENTITY))
+                    self._scan(xobject, xobject.get('/Resources', resources),
+                               _multiply(matrix, ctm), page_number, depth + 1)
+
+
+def _channels(stream):
+    """Number of colour channels for the image colour spaces we can resample"""
+    colorspace = stream.get('/ColorSpace')
+    colorspace = colorspace.get_object() if colorspace is not None else None
+    if colorspace == '/DeviceRGB':
+        return 3
+    if colorspace == '/DeviceGray':
+        return 1
+    if isinstance(colorspace, list) and colorspace and colorspace[0] == '/ICCBased':
+        channels = colorspace[1].get_object().get('/N')
+        return channels if channels in (1, 3) else None
+    return None
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+
+def _decode_flate_image(stream, channels):
+    """Decode an 8-bit Flate image stream into a PIL image.
+
+    Streams using PNG predictors are byte-for-byte a PNG IDAT, so they are
+    wrapped in a PNG container and decoded by Pillow in C; pypdf's pure-Python
+    predictor decoding takes seconds per 300-DPI figure.
+    """
+    from PIL import Image
+
+    mode = 'RGB' if channels == 3 else 'L'
+    size = (stream['/Width'], stream['/Height'])
+    parms = stream.get('/DecodeParms')
+    parms = parms.get_object() if parms is not None else {}
+    if (parms.get('/Predictor', 1) >= 10 and parms.get('/Colors', 1) == channels
+            and parms.get('/Columns', 1) == size[0] and parms.get('/BitsPerComponent', 8) == 8):
+        header = struct.pack('>IIBBBBB', size[0], size[1], 8, 2 if channels == 3 else 0, 0, 0, 0)
+        png = (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+               # _data is the still-encoded stream body
+               + _png_chunk(b'IDAT', stream._data) + _png_chunk(b'IEND', b''))
+        image = Image.open(io.BytesIO(png))
+        image.load()
+        return image
+    return Image.frombytes(mode, size, stream.get_data())
+
+
+def _resample_stream(stream, size, channels):
+    """Replace an 8-bit Flate image stream with a Lanczos-resampled copy"""
+    from PIL import Image
+    from pypdf.generic import NameObject, NumberObject
+
+    image = _decode_flate_image(stream, channels).resize(size, Image.LANCZOS)
+    if '/DecodeParms' in stream:
+        del stream['/DecodeParms']
+    stream.set_data(image.tobytes())
+    stream[NameObject('/Width')] = NumberObject(size[0])
+    stream[NameObject('/Height')] = NumberObject(size[1])
+
+
+def _downsample(entry, target_dpi, image_files):
+    """Downsample one placed image (and its soft mask); returns True if resampled.
+
+    Flate images (PNG sources) are rewritten in place; JPEGs are re-encoded
+    through pypdf's ImageFile.replace, looked up in image_files by object id.
+    """
+    from PIL import Image
+
+    stream = entry['stream']
+    width_px, height_px = stream.get('/Width'), stream.get('/Height')
+    if not entry['width_pt'] or not width_px or stream.get('/BitsPerComponent') != 8:
+        return False
+    channels = _channels(stream)
+    if channels is None:
+        return False
+
+    effective_dpi = width_px / (entry['width_pt'] / 72)
+    if effective_dpi <= target_dpi * DOWNSAMPLE_THRESHOLD:
+        return False
+    scale = target_dpi / effective_dpi
+    size = (max(1, round(width_px * scale)), max(1, round(height_px * scale)))
+
+    if stream.get('/Filter') in ('/DCTDecode', ['/DCTDecode']) and '/SMask' not in stream:
+        image_file = image_files().get(_key(stream))
+        if image_file is None:
+            return False
+        image_file.replace(image_file.image.resize(size, Image.LANCZOS), quality=JPEG_QUALITY)
+        return True
+    if stream.get('/Filter') not in ('/FlateDecode', ['/FlateDecode']):
+        return False
+
+    mask = stream.get('/SMask')
+    if mask is not None:
+        mask = mask.get_object()
+        if (mask.get('/Filter') not in ('/FlateDecode', ['/FlateDecode'])
+                or mask.get('/BitsPerComponent') != 8 or '/Matte' in mask):
+            return False
+        _resample_stream(mask, size, 1)
+    _resample_stream(stream, size, channels)
+    return True
+
+
+def _subset_font(font, codes):
+    """Subset a Type0/Identity-H TrueType font to the drawn glyph ids.
+
+    Glyph ids are retained so the existing content streams stay valid.
+    Fonts that are already subset (ABCDEF+Name) are left alone; weasyprint
+    subsets its own fonts, so this mainly catches fonts embedded by other
+    tools or merged in from elsewhere. Returns bytes saved.
+    """
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from pypdf.generic import NameObject, NumberObject
+
+    base_font = str(font.get('/BaseFont', ''))
+    if font.get('/Subtype') != '/Type0' or font.get('/Encoding') != '/Identity-H':
+        return 0
+    if len(base_font) > 8 and base_font[7] == '+':
+        return 0
+    descendant = font['/DescendantFonts'][0].get_object()
+    if descendant.get('/CIDToGIDMap', '/Identity') != '/Identity':
+        return 0
+    descriptor = descendant['/FontDescriptor'].get_object()
+    if '/FontFile2' not in descriptor:
+        return 0
+
+    font_file = descriptor['/FontFile2'].get_object()
+    if font_file.get('/Filter') not in (None, '/FlateDecode', ['/FlateDecode']):
+        return 0
+    original = font_file.get_data()
+    ttfont = TTFont(io.BytesIO(original))
+    options = subset.Options()
+    options.retain_gids = True
+    options.notdef_outline = True
+    options.name_IDs = ['*']
+    options.drop_tables += ['FFTM']
+    # Embedded fonts often lack a cmap; nothing to recompute Unicode ranges from
+    options.prune_unicode_ranges = False
+    subsetter = subset.Subsetter(options)
+    glyph_count = ttfont['maxp'].numGlyphs
+    subsetter.populate(gids=sorted(gid for gid in codes | {0} if gid < glyph_count))
+    buffer = io.BytesIO()
+    try:
+        subsetter.subset(ttfont)
+        ttfont.save(buffer)
+    except Exception:
+        # Leave fonts fontTools cannot process untouched rather than fail the build
+        return 0
+    subsetted = buffer.getvalue()
+    if len(subsetted) >= len(original):
+        return 0
+
+    font_file.set_data(subsetted)
+    font_file[NameObject('/Length1')] = NumberObject(len(subsetted))
+    # Subset fonts carry a six-letter tag derived from the glyph set
+    digest = hashlib.sha256(repr(sorted(codes)).encode()).digest()
+    tag = ''.join(chr(ord('A') + byte % 26) for byte in digest[:6])
+    name = NameObject(f"/{tag}+{base_font.lstrip('/')}")
+    font[NameObject('/BaseFont')] = name
+    descendant[NameObject('/BaseFont')] = name
+    descriptor[NameObject('/FontName')] = name
+    return len(original) - len(subsetted)
+
+
+def _stream_size(stream):
+    """Size of an object as written to the file, dictionary included"""
+    buffer = io.BytesIO()
+    stream.write_to_stream(buffer)
+    return len(buffer.getvalue())
+
+
+def attribute_sizes(path):
+    """Per-object size attribution of a PDF: images, font files and page content streams"""
+    pypdf = _require_pypdf()
+    reader = pypdf.PdfReader(path)
+    scan = _PageScan(reader)
+    for page_number, page in enumerate(reader.pages, start=1):
+        scan.scan_page(page_number, page)
+
+    objects = {}
+    for key, entry in scan.images.items():
+        stream = entry['stream']
+        size = _stream_size(stream)
+        mask = stream.get('/SMask')
+        if mask is not None:
+            size += _stream_size(mask.get_object())
+        pages = sorted(entry['pages'])
+        objects[('image', key)] = {
+            'kind': 'image',
+            'name': f"{entry['name']} {stream.get('/Width')}x{stream.get('/Height')} (page {pages[0]}"
+                    f"{f' +{len(pages) - 1}' if len(pages) > 1 else ''})",
+            'size': size,
+        }
+    for key, font in scan.fonts.items():
+        fonts = [font]
+        if '/DescendantFonts' in font:
+            fonts.append(font['/DescendantFonts'][0].get_object())
+        for candidate in fonts:
+            descriptor = candidate.get('/FontDescriptor')
+            if descriptor is None:
+                continue
+            descriptor = descriptor.get_object()
+            for file_key in ('/FontFile', '/FontFile2', '/FontFile3'):
+                if file_key in descriptor:
+                    objects[('font', key)] = {
+                        'kind': 'font',
+                        'name': str(font.get('/BaseFont', '?')).lstrip('/'),
+                        'size': _stream_size(descriptor[file_key].get_object()),
+                    }
+    for page_number, streams in scan.contents:
+        objects[('content', page_number)] = {
+            'kind': 'content',
+            'name': f"page {page_number}",
+            'size': sum(_stream_size(stream) for stream in streams),
+        }
+    return sorted(objects.values(), key=lambda item: item['size'], reverse=True)
+
+
+def optimize_pdf(path, output=None, target_dpi=DEFAULT_TARGET_DPI, subset_fonts=True):
+    """Optimize a PDF in place (or into output) and return size statistics.
+
+    The original file is kept when the optimized version would not be smaller.
+    """
+    pypdf = _require_pypdf()
+    output = output or path
+    original_size = os.path.getsize(path)
+
+    writer = pypdf.PdfWriter(clone_from=pypdf.PdfReader(path))
+    scan = _PageScan(writer)
+    for page_number, page in enumerate(writer.pages, start=1):
+        scan.scan_page(page_number, page)
+
+    image_files = {}
+
+    def lookup_image_files():
+        # Decoding every image is costly, so only build the lookup when a JPEG needs it
+        if not image_files:
+            for page in writer.pages:
+                for image_file in page.images:
+                    if image_file.indirect_reference is not None:
+                        image_files.setdefault(image_file.indirect_reference.idnum, image_file)
+        return image_files
+
+    downsampled = sum(_downsample(entry, target_dpi, lookup_image_files)
+                      for entry in scan.images.values())
+    font_bytes_saved = 0
+    if subset_fonts:
+        for key, font in scan.fonts.items():
+            font_bytes_saved += _subset_font(font, scan.glyphs.get(key, set()))
+
+    for page in writer.pages:
+        page.compress_content_streams()
+    # Merges byte-identical image XObjects, fonts and resources across merged chapters
+    writer.compress_identical_objects()
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    optimized = buffer.getvalue()
+    kept_original = len(optimized) >= original_size
+    if kept_original:
+        if output != path:
+            with open(path, 'rb') as src, open(output, 'wb') as dst:
+                dst.write(src.read())
+    else:
+        with open(output + '.tmp', 'wb') as f:
+            f.write(optimized)
+        os.replace(output + '.tmp', output)
+
+    return {
+        'path': output,
+        'original_size': original_size,
+        'size': os.path.getsize(output),
+        'kept_original': kept_original,
+        'images': len(scan.images),
+        'downsampled': downsampled,
+        'font_bytes_saved': font_bytes_saved,
+        'objects': attribute_sizes(output),
+    }
+
+
+def print_report(stats, top=10):
+    """Print before/after sizes, per-kind totals and the largest objects"""
+    before = stats['original_size'] / (1024 * 1024)
+    after = stats['size'] / (1024 * 1024)
+    saved = 100 * (1 - stats['size'] / stats['original_size']) if stats['original_size'] else 0
+    print(f"🗜️  {stats['path']}: {before:.2f} MB -> {after:.2f} MB ({saved:.0f}% smaller)")
+    if stats['kept_original']:
+        print("    optimized output was not smaller; kept the original")
+    print(f"    {stats['downsampled']}/{stats['images']} images downsampled, "
+          f"{stats['font_bytes_saved'] / 1024:.0f} KB saved by font subsetting")
+
+    totals = {}
+    for item in stats['objects']:
+        totals[item['kind']] = totals.get(item['kind'], 0) + item['size']
+    attributed = sum(totals.values())
+    totals['other'] = max(0, stats['size'] - attributed)
+    for kind, size in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        print(f"    {kind:8} {size / 1024:9.0f} KB")
+    print("    Largest objects:")
+    for item in stats['objects'][:top]:
+        print(f"    {item['size'] / 1024:9.0f} KB  {item['kind']:8} {item['name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shrink generated PDFs and report what uses the space')
+    parser.add_argument('pdfs', nargs='+')
+    parser.add_argument('--output', help='Write here instead of optimizing in place (single PDF only)')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_TARGET_DPI, help='Target image DPI')
+    parser.add_argument('--no-subset', action='store_true', help='Skip font subsetting')
+    parser.add_argument('--top', type=int, default=10, help='Largest objects to list')
+    args = parser.parse_args()
+    if args.output and len(args.pdfs) > 1:
+        parser.error('--output needs exactly one PDF')
+
+    for path in args.pdfs:
+        stats = optimize_pdf(path, args.output, target_dpi=args.dpi, subset_fonts=not args.no_subset)
+        print_report(stats, top=args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+PDF Rendering Service - pooled, warmed-up weasyprint workers for HTML to PDF
+Workers stay alive between jobs and reuse fetched resources, parsed stylesheets
+and decoded images, so batches of documents render in parallel across cores.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_PORT = 8090
+WARMUP_HTML = '<html><body><p>warm-up</p></body></html>'
+
+RESOURCE_CACHE_BYTES = 256 * 1024 * 1024
+IMAGE_CACHE_ENTRIES = 512
+
+# Per-worker caches, populated lazily inside each worker process. Fetched
+# resources are LRU-bounded by size; local files are re-checked before each
+# job, and a changed one drops it and the decoded images.
+_resource_cache = OrderedDict()  # url -> (file stat or None, size, fetched response)
+_resource_bytes = 0
+_stylesheet_cache = {}
+_image_cache = {}
+_fetcher = None
+
+
+def _file_stat(url):
+    """(mtime_ns, size) of a file:// URL's file, None for other URLs or missing files"""
+    parts = urlsplit(url)
+    if parts.scheme != 'file':
+        return None
+    try:
+        stat = os.stat(unquote(parts.path))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached_resource(url):
+    entry = _resource_cache.get(url)
+    if entry is None:
+        return None
+    _resource_cache.move_to_end(url)
+    return entry[2]
+
+
+def _cache_resource(url, response, size):
+    global _resource_bytes
+    old = _resource_cache.pop(url, None)
+    if old is not None:
+        _resource_bytes -= old[1]
+    _resource_cache[url] = (_file_stat(url), size, response)
+    _resource_bytes += size
+    while _resource_bytes > RESOURCE_CACHE_BYTES and len(_resource_cache) > 1:
+        _, (_, evicted, _) = _resource_cache.popitem(last=False)
+        _resource_bytes -= evicted
+
+
+def _refresh_caches():
+    """Forget local resources whose files changed since they were fetched, with every decoded image"""
+    global _resource_bytes
+    stale = [url for url, (stat, _, _) in _resource_cache.items()
+             if stat is not None and _file_stat(url) != stat]
+    for url in stale:
+        _resource_bytes -= _resource_cache.pop(url)[1]
+    if stale or len(_image_cache) > IMAGE_CACHE_ENTRIES:
+        _image_cache.clear()
+
+
+def _url_fetcher():
+    """Return this worker's url_fetcher, which keeps fetched CSS, fonts and images in memory"""
+    global _fetcher
+    if _fetcher is not None:
+        return _fetcher
+
+    import weasyprint
+
+    if hasattr(weasyprint, 'URLFetcher'):
+        # weasyprint >= 66: fetchers are URLFetcher subclasses returning responses
+        from weasyprint.urls import URLFetcherResponse
+
+        class CachingURLFetcher(weasyprint.URLFetcher):
+            def fetch(self, url, headers=None):
+                cached = _cached_resource(url)
+                if cached is None:
+                    response = super().fetch(url, headers)
+                    try:
+                        body = response.read()
+                    finally:
+                        response.close()
+                    cached = (response.url, body, dict(response.headers.items()), response.status)
+                    _cache_resource(url, cached, len(body))
+                final_url, body, response_headers, status = cached
+                return URLFetcherResponse(final_url, body, response_headers, status)
+
+        _fetcher = CachingURLFetcher()
+    else:
+        def caching_url_fetcher(url, timeout=10, ssl_context=None):
+            cached = _cached_resource(url)
+            if cached is None:
+                cached = weasyprint.default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+                if 'file_obj' in cached:
+                    with cached.pop('file_obj') as file_obj:
+                        cached['string'] = file_obj.read()
+                _cache_resource(url, cached, len(cached.get('string') or b''))
+            return dict(cached)
+
+        _fetcher = caching_url_fetcher
+    return _fetcher
+
+
+def _stylesheet(path):
+    """Parse a user stylesheet once per worker; re-parse only if the file changed"""
+    import weasyprint
+
+    mtime = os.path.getmtime(path)
+    cached = _stylesheet_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        css = weasyprint.CSS(filename=path, url_fetcher=_url_fetcher())
+        _stylesheet_cache[path] = cached = (mtime, css)
+    return cached[1]
+
+
+def _init_worker():
+    """Import weasyprint and render a throwaway page so fonts and pango are loaded"""
+    import weasyprint
+
+    weasyprint.HTML(string=WARMUP_HTML).write_pdf()
+
+
+def _render_job(html_path, pdf_path, stylesheets, base_url=None):
+    """Render one HTML file to PDF inside a worker and return timing and size"""
+    import weasyprint
+
+    start = time.perf_counter()
+    _refresh_caches()
+    document = weasyprint.HTML(filename=html_path, base_url=base_url, url_fetcher=_url_fetcher())
+    document.write_pdf(
+        pdf_path,
+        stylesheets=[_stylesheet(path) for path in stylesheets],
+        cache=_image_cache,
+    )
+    return {
+        'pid': os.getpid(),
+        'seconds': time.perf_counter() - start,
+        'size': os.path.getsize(pdf_path),
+    }
+
+
+class PdfRenderPool:
+    """Persistent pool of warmed-up weasyprint workers"""
+
+    def __init__(self, workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, html_path, pdf_path, stylesheets=(), base_url=None):
+        """Queue one document and return its job id.
+
+        base_url resolves relative links when the HTML file does not live
+        next to its images, e.g. for split-out thesis sections.
+        """
+        job_id = next(self._ids)
+        job = {
+            'id': job_id,
+            'html': os.path.abspath(html_path),
+            'pdf': os.path.abspath(pdf_path),
+            'state': 'queued',
+            'submitted': time.time(),
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+
+        future = self.executor.submit(
+            _render_job, job['html'], job['pdf'], list(stylesheets), base_url
+        )
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        job['future'] = future
+        return job_id
+
+    def _finish(self, job_id, future):
+        """Record a finished future's outcome; runs from the done-callback and from wait()"""
+        with self._lock:
+            job = self.jobs[job_id]
+            if job['state'] != 'queued':
+                return
+            try:
+                job.update(future.result())
+                job['state'] = 'done'
+            except Exception as e:
+                job['state'] = 'failed'
+                job['error'] = str(e)
+
+    def status(self, job_id):
+        """Return a JSON-serialisable view of a job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != 'future'}
+
+    def wait(self, job_id):
+        """Block until a job finishes and return its status"""
+        future = self.jobs[job_id]['future']
+        future.exception()
+        # Waiters wake before done-callbacks run, so record the outcome here too
+        self._finish(job_id, future)
+        return self.status(job_id)
+
+    def render_many(self, documents, stylesheets=()):
+        """Render (html_path, pdf_path) pairs in parallel and return their statuses"""
+        job_ids = [self.submit(html, pdf, stylesheets) for html, pdf in documents]
+        return [self.wait(job_id) for job_id in job_ids]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def render_pdfs(documents, stylesheets=(), workers=None):
+    """Render a batch with a short-lived pool and print a per-document report"""
+    pool = PdfRenderPool(workers=workers)
+    try:
+        results = pool.render_many(documents, stylesheets)
+    finally:
+        pool.shutdown()
+
+    for result in results:
+        if result['state'] == 'done':
+            size = result['size'] / (1024 * 1024)
+            print(f"✅ {result['pdf']} ({size:.1f} MB, {result['seconds']:.1f}s)")
+        else:
+            print(f"❌ {result['html']}: {result['error']}")
+    return results
+
+
+class PdfJobHandler(BaseHTTPRequestHandler):
+    """Local job API: POST /api/jobs to queue, GET /api/jobs[/<id>] to poll"""
+
+    pool = None
+
+    def do_GET(self):
+        """Handle GET requests"""
+        if self.path == '/api/jobs':
+            with self.pool._lock:
+                job_ids = list(self.pool.jobs)
+            self.send_json_response({'jobs': [self.pool.status(job_id) for job_id in job_ids]})
+        elif self.path.startswith('/api/jobs/'):
+            try:
+                job = self.pool.status(int(self.path.split('/')[-1]))
+            except ValueError:
+                job = None
+            if job is None:
+                self.send_json_response({'error': 'Job not found'}, 404)
+            else:
+                self.send_json_response(job)
+        else:
+            self.send_json_response({'error': 'Not Found'}, 404)
+
+    def do_POST(self):
+        """Handle POST requests"""
+        if self.path != '/api/jobs':
+            self.send_json_response({'error': 'Not Found'}, 404)
+            return
+        try:
+            content_length = int(self.headers['Content-Length'])
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            documents = data['documents'] if 'documents' in data else [data]
+            job_ids = [
+                self.pool.submit(doc['html'], doc['pdf'], doc.get('stylesheets', []))
+                for doc in documents
+            ]
+            self.send_json_response({'job_ids': job_ids}, 202)
+        except (KeyError, ValueError, TypeError) as e:
+            self.send_json_response({'error': f"Invalid job request: {e}"}, 400)
+
+    def send_json_response(self, data, status_code=200):
+        """Send JSON response"""
+        body = json.dumps(data, default=str).encode()
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port=DEFAULT_PORT, workers=None):
+    """Run the local job API until interrupted"""
+    PdfJobHandler.pool = PdfRenderPool(workers=workers)
+    httpd = ThreadingHTTPServer(('127.0.0.1', port), PdfJobHandler)
+    print(f"📄 PDF rendering service on http://127.0.0.1:{port}/api/jobs")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Service stopped by user")
+    finally:
+        httpd.server_close()
+        PdfJobHandler.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pooled HTML to PDF rendering')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render_parser = subparsers.add_parser('render', help='Render documents and exit')
+    render_parser.add_argument('documents', nargs='+', metavar='HTML:PDF')
+    render_parser.add_argument('--stylesheet', action='append', default=[])
+
+    serve_parser = subparsers.add_parser('serve', help='Run the local job API')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args()
+    if args.command == 'render':
+        documents = [tuple(pair.rsplit(':', 1)) for pair in args.documents]
+        render_pdfs(documents, args.stylesheet, workers=args.workers)
+    else:
+        serve(args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
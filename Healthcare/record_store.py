@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Record Store - streaming medical-record uploads for the Healthcare AI Platform
+Upload bodies (raw, chunked or multipart/form-data) are read in fixed-size
+chunks, hashed and written to a temporary file as they arrive, so memory use
+does not depend on file size. Files are stored content-addressed by SHA-256
+and a file that is already stored is counted as a duplicate and dropped.
+
+New files are handed to a background process pool that detects the file type
+and extracts a term index from text records; the index backs record search.
+Metadata lives in SQLite next to the files:
+
+    records/
+        records.db
+        blobs/ab/ab12...   one file per SHA-256
+        tmp/               uploads in progress
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from email.message import Message
+
+from paths import HEALTHCARE_DIR
+from sqlite_connections import ThreadConnections
+
+DEFAULT_RECORDS_DIR = os.path.join(HEALTHCARE_DIR, 'records')
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get('HEALTHCARE_MAX_UPLOAD_BYTES', 20 * 1024 ** 3))
+MAX_HEADER_BYTES = 16 * 1024
+MAX_LINE = 1024
+MAX_TERMS = 1000  # most frequent terms indexed per record
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+TERM_RE = re.compile(r'[a-z][a-z0-9]{2,}')
+MAX_DISTINCT_TERMS = 1_000_000
+# Lowercases ASCII letters, keeps digits and turns every other byte into a word separator
+_TERM_TABLE = bytes(c | 0x20 if 65 <= c <= 90 or 97 <= c <= 122 else c if 48 <= c <= 57 else 32 for c in range(256))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    sha256 TEXT PRIMARY KEY,
+    filename TEXT,
+    content_type TEXT,
+    size INTEGER NOT NULL,
+    kind TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    uploads INTEGER NOT NULL DEFAULT 1,
+    uploaded_at TEXT NOT NULL,
+    indexed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_uploaded ON records (uploaded_at);
+CREATE TABLE IF NOT EXISTS record_terms (
+    term TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, sha256)
+) WITHOUT ROWID;
+"""
+
+RECORD_COLUMNS = 'sha256, filename, content_type, size, kind, status, error, uploads, uploaded_at, indexed_at'
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class LimitedReader:
+    """Reads at most length bytes from a stream, e.g. a request body of known Content-Length"""
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.stream.read(size)
+        if not data:
+            raise ValueError("Request body ended early")
+        self.remaining -= len(data)
+        return data
+
+
+class ChunkedReader:
+    """Decodes a Transfer-Encoding: chunked request body"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.remaining = 0
+        self.done = False
+
+    def read(self, size=-1):
+        if self.done:
+            return b''
+        if self.remaining == 0:
+            line = self.stream.readline(MAX_LINE)
+            try:
+                self.remaining = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError as e:
+                raise ValueError(f"Invalid chunk size line: {line[:40]!r}") from e
+            if self.remaining == 0:
+                # Skip trailers up to the blank line that ends the body
+                while self.stream.readline(MAX_LINE) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.done = True
+                return b''
+        size = min(self.remaining, CHUNK_SIZE if size < 0 else size)
+        data = self.stream.read(size)
+        if not data:
+            raise ValueError("Request body ended inside a chunk")
+        self.remaining -= len(data)
+        if self.remaining == 0:
+            self.stream.readline(MAX_LINE)  # CRLF after the chunk data
+        return data
+
+
+def _header_params(value, header='content-disposition'):
+    message = Message()
+    message[header] = value
+    return message
+
+
+class MultipartReader:
+    """Streams the parts of a multipart/form-data body with a buffer of about one chunk"""
+
+    def __init__(self, stream, boundary, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+        self.buffer = b'\r\n'  # so the first boundary looks like every other delimiter
+        self.chunk_size = chunk_size
+
+    def _fill(self):
+        data = self.stream.read(self.chunk_size)
+        self.buffer += data
+        return bool(data)
+
+    def read(self, size=CHUNK_SIZE):
+        """Data of the current part, at most size bytes; b'' at the end of the part"""
+        while True:
+            end = self.buffer.find(self.delimiter)
+            if end < 0:
+                if len(self.buffer) < self.chunk_size and self._fill():
+                    continue
+                # Everything except a possible partial delimiter at the end is data
+                end = len(self.buffer) - len(self.delimiter) + 1
+                if end <= 0:
+                    raise ValueError("Multipart body ended inside a part")
+            elif end == 0:
+                return b''
+            data = self.buffer[:min(end, size)]
+            self.buffer = self.buffer[len(data):]
+            return data
+
+    def parts(self):
+        """Yield (headers, filename) for each part; read its data with read() before the next"""
+        while True:
+            while self.read():
+                pass  # the preamble, or whatever the caller left of the previous part
+            self.buffer = self.buffer[len(self.delimiter):]
+            while len(self.buffer) < 2:
+                if not self._fill():
+                    raise ValueError("Multipart body ended after a boundary")
+            if self.buffer.startswith(b'--'):
+                return
+            while b'\r\n\r\n' not in self.buffer:
+                if len(self.buffer) > MAX_HEADER_BYTES or not self._fill():
+                    raise ValueError("Invalid multipart part headers")
+            head, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
+            headers = {}
+            for line in head.decode('utf-8', 'replace').split('\r\n'):
+                name, _, value = line.partition(':')
+                if value:
+                    headers[name.strip().lower()] = value.strip()
+            disposition = _header_params(headers.get('content-disposition', ''))
+            yield headers, disposition.get_param('filename', header='content-disposition')
+
+
+def detect_kind(head):
+    """File type from the first bytes of a file"""
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(b'\x89PNG'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head[128:132] == b'DICM':
+        return 'dicom'
+    if b'\x00' in head:
+        return 'binary'
+    return 'text'
+
+
+def extract_record(path):
+    """Type and term counts of a stored file; runs in the worker processes"""
+    with open(path, 'rb') as f:
+        head = f.read(8192)
+        kind = detect_kind(head)
+        if kind != 'text':
+            return {'kind': kind, 'terms': {}}
+
+        f.seek(0)
+        counts = Counter()
+        carry = b''
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            text = carry + chunk.translate(_TERM_TABLE)
+            if chunk:
+                # Hold back a word that may continue in the next chunk
+                cut = text.rfind(b' ') + 1
+                text, carry = text[:cut], text[cut:]
+                if len(carry) > MAX_LINE:
+                    carry = b''
+            counts.update(text.split())
+            if len(counts) > MAX_DISTINCT_TERMS:
+                counts = Counter(dict(counts.most_common(MAX_TERMS * 10)))
+            if not chunk:
+                break
+    terms = Counter({term.decode('ascii'): count for term, count in counts.items()
+                     if len(term) >= 3 and term[:1].isalpha()})
+    return {'kind': kind, 'terms': dict(terms.most_common(MAX_TERMS))}
+
+
+class RecordStore:
+    """Content-addressed record files with SQLite metadata and background indexing"""
+
+    def __init__(self, directory=DEFAULT_RECORDS_DIR, workers=None):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, 'blobs')
+        self.tmp_dir = os.path.join(directory, 'tmp')
+        self.db_path = os.path.join(directory, 'records.db')
+        self.workers = workers or os.cpu_count() or 1
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._connections = ThreadConnections(self.db_path, row_factory=sqlite3.Row, timeout=30)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._pending = set()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """Return this thread's SQLite connection, opening it on first use"""
+        return self._connections.get()
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def executor(self):
+        """The extraction process pool, started on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: forking a process that is serving requests on other threads is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _reset_executor(self, broken):
+        """Drop a pool whose worker died, so the next job starts a new one"""
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def save_stream(self, stream, filename=None, content_type=None):
+        """Store one file read from stream; returns its record plus 'duplicate'"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise ValueError(f"Upload is larger than {MAX_UPLOAD_BYTES} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            if not size:
+                raise ValueError("Upload is empty")
+            return self._commit(tmp, digest.hexdigest(), size, filename, content_type)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _commit(self, tmp, digest, size, filename, content_type):
+        # The blob is in place before its row exists, so a crash in between
+        # leaves an unreferenced file rather than a record without one
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        conn = self.connection()
+        with conn:
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO records (sha256, filename, content_type, size, status, uploaded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (digest, filename, content_type, size, 'queued', _now())
+            ).rowcount
+            if not inserted:
+                conn.execute('UPDATE records SET uploads = uploads + 1 WHERE sha256 = ?', (digest,))
+        if inserted:
+            self._submit(digest)
+        record = self.get(digest)
+        record['duplicate'] = not inserted
+        return record
+
+    def _submit(self, digest):
+        executor = self.executor()
+        try:
+            future = executor.submit(extract_record, self.blob_path(digest))
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            executor = self.executor()
+            future = executor.submit(extract_record, self.blob_path(digest))
+        self._pending.add(future)
+        future.add_done_callback(lambda done: self._indexed(digest, done, executor))
+
+    def _indexed(self, digest, future, executor):
+        """Store a finished extraction job's results (called on the pool's result thread)"""
+        self._pending.discard(future)
+        conn = self.connection()
+        try:
+            result = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor(executor)
+            with conn:
+                conn.execute("UPDATE records SET status = 'failed', error = ? WHERE sha256 = ?", (str(e), digest))
+            return
+        with conn:
+            conn.execute('DELETE FROM record_terms WHERE sha256 = ?', (digest,))
+            conn.executemany('INSERT INTO record_terms (term, sha256, count) VALUES (?, ?, ?)',
+                             [(term, digest, count) for term, count in result['terms'].items()])
+            conn.execute("UPDATE records SET status = 'indexed', kind = ?, error = NULL, indexed_at = ? "
+                         "WHERE sha256 = ?", (result['kind'], _now(), digest))
+
+    def ingest_body(self, body, content_type, filename=None):
+        """Store the files of an upload body: multipart/form-data, or the body itself as one file"""
+        params = _header_params(content_type or 'application/octet-stream', 'content-type')
+        if params.get_content_type() != 'multipart/form-data':
+            return {'files': [self.save_stream(body, filename, params.get_content_type())]}
+
+        boundary = params.get_param('boundary', header='content-type')
+        if not boundary:
+            raise ValueError("multipart/form-data without a boundary")
+        reader = MultipartReader(body, boundary)
+        files = []
+        for headers, part_filename in reader.parts():
+            if part_filename:
+                files.append(self.save_stream(reader, os.path.basename(part_filename),
+                                              headers.get('content-type', 'application/octet-stream')))
+        if not files:
+            raise ValueError("No files in upload")
+        return {'files': files}
+
+    def resume(self):
+        """Queue extraction for records left unindexed by a previous run"""
+        rows = self.connection().execute("SELECT sha256 FROM records WHERE status = 'queued'").fetchall()
+        for row in rows:
+            self._submit(row['sha256'])
+        return len(rows)
+
+    def wait(self, timeout=None):
+        """Block until queued extraction jobs have finished"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+        return not self._pending
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def get(self, digest):
+        row = self.connection().execute(
+            f'SELECT {RECORD_COLUMNS} FROM records WHERE sha256 = ?', (digest,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def list_records(self, limit=50):
+        rows = self.connection().execute(
+            f'SELECT {RECORD_COLUMNS} FROM records ORDER BY uploaded_at DESC LIMIT ?', (min(int(limit), 500),)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, query, limit=50):
+        """Records containing every term of query, most matches first"""
+        terms = TERM_RE.findall(query.lower())
+        if not terms:
+            raise ValueError("Search needs at least one word of three or more letters")
+        placeholders = ', '.join('?' * len(terms))
+        rows = self.connection().execute(
+            f'SELECT {RECORD_COLUMNS}, SUM(t.count) AS matches FROM record_terms t '
+            f'JOIN records USING (sha256) WHERE t.term IN ({placeholders}) '
+            f'GROUP BY sha256 HAVING COUNT(*) = ? ORDER BY matches DESC LIMIT ?',
+            terms + [len(set(terms)), min(int(limit), 500)]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark(directory, size_mb=1024, uploads=4):
+    """Upload several large files concurrently through the HTTP server and report memory use"""
+    import http.client
+    import socketserver
+    from concurrent.futures import ThreadPoolExecutor
+
+    import server
+
+    store = RecordStore(directory)
+    server.HealthcareHandler.records = store
+    server.HealthcareHandler.log_message = lambda *args: None
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    httpd = socketserver.ThreadingTCPServer(('127.0.0.1', 0), server.HealthcareHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+    rss_before = _peak_rss_mb()
+
+    def upload(i):
+        # Chunked upload of generated text; no file ever exists in full on the client side
+        line = f"Patient record {i}: blood pressure reading, glucose panel and follow-up notes\n".encode()
+        block = line * (CHUNK_SIZE // len(line))
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.putrequest('POST', f'/api/records/upload?name=record{i}.txt')
+        conn.putheader('Transfer-Encoding', 'chunked')
+        conn.putheader('Content-Type', 'text/plain')
+        conn.endheaders()
+        for _ in range(size_mb):
+            conn.send(f"{len(block):x}\r\n".encode() + block + b"\r\n")
+        conn.send(b"0\r\n\r\n")
+        response = conn.getresponse()
+        return response.status, response.read()
+
+    print(f"📤 Uploading {uploads} × {size_mb:,} MB concurrently")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=uploads) as executor:
+        results = list(executor.map(upload, range(uploads)))
+    elapsed = time.perf_counter() - start
+    httpd.shutdown()
+    ok = sum(status == 200 for status, _ in results)
+    total_mb = uploads * size_mb
+    print(f"{'✅' if ok == uploads else '❌'} {ok}/{uploads} uploads, {total_mb / elapsed:,.0f} MB/s; "
+          f"peak RSS grew by {_peak_rss_mb() - rss_before:,.0f} MB")
+
+    start = time.perf_counter()
+    store.wait()
+    print(f"✅ Indexed in {time.perf_counter() - start:.1f}s more; "
+          f"search 'glucose': {len(store.search('glucose'))} records")
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Medical record store')
+    parser.add_argument('--dir', default=DEFAULT_RECORDS_DIR, help='Record store directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help='Store and index local files')
+    add_parser.add_argument('files', nargs='+')
+
+    search_parser = subparsers.add_parser('search', help='Find records containing words')
+    search_parser.add_argument('query')
+
+    bench_parser = subparsers.add_parser('benchmark', help='Concurrent large uploads over HTTP')
+    bench_parser.add_argument('--size-mb', type=int, default=1024)
+    bench_parser.add_argument('--uploads', type=int, default=4)
+
+    args = parser.parse_args()
+    if args.command == 'add':
+        store = RecordStore(args.dir)
+        for path in args.files:
+            with open(path, 'rb') as f:
+                record = store.save_stream(f, os.path.basename(path))
+            print(f"{'♻️ ' if record['duplicate'] else '✅'} {path}: {record['sha256'][:12]} ({record['size']:,} bytes)")
+        store.wait()
+        store.close()
+    elif args.command == 'search':
+        for record in RecordStore(args.dir).search(args.query):
+            print(f"📄 {record['filename']} ({record['sha256'][:12]}): {record['matches']} matches")
+    elif args.command == 'benchmark':
+        benchmark(args.dir, args.size_mb, args.uploads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Render-time profiling for the figure generators
+Splits each figure's render time into construction, layout, draw and encode
+phases and records peak memory; results can be saved per commit and compared
+against the previous run, pytest-benchmark style.
+
+Phases are measured by wrapping the matplotlib and Pillow entry points while a
+figure renders, counting only the time not spent in a nested phase:
+
+    layout        Figure.tight_layout and Figure.get_tightbbox (bbox_inches='tight')
+    draw          Figure.draw, for every rasterisation and the SVG pass
+    encode        PNG/SVG writers plus Pillow resampling and saving
+    construction  everything else: creating axes, plotting, data preparation
+"""
+
+import argparse
+import functools
+import glob
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(SCRIPT_DIR, '.benchmarks', 'render')
+PHASES = ['construction', 'layout', 'draw', 'encode']
+
+# (dotted owner, attribute, phase) wrapped while profiling
+HOOKS = [
+    ('matplotlib.figure.Figure', 'tight_layout', 'layout'),
+    ('matplotlib.figure.Figure', 'get_tightbbox', 'layout'),
+    ('matplotlib.figure.Figure', 'draw', 'draw'),
+    ('matplotlib.backends.backend_agg.FigureCanvasAgg', 'print_png', 'encode'),
+    ('matplotlib.backends.backend_svg.FigureCanvasSVG', 'print_svg', 'encode'),
+    ('PIL.Image.Image', 'resize', 'encode'),
+    ('PIL.Image.Image', 'save', 'encode'),
+]
+
+
+def _resolve(dotted):
+    module_name, _, attribute = dotted.rpartition('.')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class PhaseTimer:
+    """Context manager that attributes wall time to render phases.
+
+    Time spent in a nested hook is charged to the inner phase only, so the
+    phase totals add up to the time spent inside hooks.
+    """
+
+    def __init__(self, hooks=HOOKS):
+        self.hooks = hooks
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self._stack = []
+        self._originals = []
+
+    def _wrap(self, original, phase):
+        timer = self
+
+        # wraps() keeps __module__ and the signature, which savefig inspects
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            frame = [0.0]  # time spent in nested phases
+            timer._stack.append(frame)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                timer._stack.pop()
+                timer.totals[phase] += elapsed - frame[0]
+                if timer._stack:
+                    timer._stack[-1][0] += elapsed
+
+        return wrapper
+
+    def __enter__(self):
+        for owner_name, attribute, phase in self.hooks:
+            owner = _resolve(owner_name)
+            # Inherited methods are shadowed on the subclass and removed again on exit
+            own = owner.__dict__.get(attribute)
+            self._originals.append((owner, attribute, own))
+            setattr(owner, attribute, self._wrap(getattr(owner, attribute), phase))
+        return self
+
+    def breakdown(self, total):
+        """Phase times for a render that took total seconds; the remainder is construction"""
+        phases = dict(self.totals)
+        phases['construction'] = max(0.0, total - sum(phases.values()))
+        return {phase: phases[phase] for phase in PHASES}
+
+    def __exit__(self, *exc_info):
+        for owner, attribute, own in reversed(self._originals):
+            if own is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, own)
+        self._originals = []
+
+
+def _max_rss_mb():
+    import resource
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+def profile_figure(module_name, func_name, output_dir):
+    """Render one figure in this process and return its phase timings.
+
+    Module import and style setup happen before timing starts. Peak memory is
+    how far the process's peak RSS grew while the figure rendered, so this is
+    meant to run in a fresh process per figure.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401  (import cost is not part of a figure)
+    import figure_export
+
+    figure_export.OUTPUT_DIR = output_dir
+    module = importlib.import_module(module_name)
+    if hasattr(module, '_pyplot'):
+        module._pyplot()
+    create_figure = getattr(module, func_name)
+
+    baseline_rss = _max_rss_mb()
+    with PhaseTimer() as timer:
+        start = time.perf_counter()
+        create_figure()
+        total = time.perf_counter() - start
+
+    return {'total': total, 'phases': timer.breakdown(total),
+            'peak_rss_mb': _max_rss_mb() - baseline_rss}
+
+
+def _profile_in_subprocess(module_name, func_name, output_dir):
+    """Run profile_figure in a fresh interpreter so peak memory is per figure"""
+    code = ('import json, sys, render_profile; '
+            'print(json.dumps(render_profile.profile_figure(*sys.argv[1:])))')
+    result = subprocess.run(
+        [sys.executable, '-c', code, module_name, func_name, output_dir],
+        cwd=SCRIPT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Profiling {module_name}.{func_name} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def all_figures():
+    """(name, module, function) for every figure the build knows about"""
+    figures = []
+    for module_name in ['generate_diagrams', 'generate_thesis_pdf']:
+        for name, func_name, _ in importlib.import_module(module_name).FIGURES:
+            figures.append((name, module_name, func_name))
+    return figures
+
+
+def benchmark(figures, runs=3):
+    """Median phase timings and peak memory per figure over several fresh-process runs"""
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, module_name, func_name in figures:
+            samples = [_profile_in_subprocess(module_name, func_name, output_dir) for _ in range(runs)]
+            results[name] = {
+                'total': statistics.median(s['total'] for s in samples),
+                'phases': {phase: statistics.median(s['phases'][phase] for s in samples)
+                           for phase in PHASES},
+                'peak_rss_mb': statistics.median(s['peak_rss_mb'] for s in samples),
+                'runs': runs,
+            }
+    return results
+
+
+def print_table(results, previous=None):
+    """Print per-figure phase times; with previous results, the change in total"""
+    header = f"{'figure':<20} {'total':>7} " + ' '.join(f"{p:>12}" for p in PHASES) + f" {'peak MB':>8}"
+    if previous:
+        header += f" {'vs prev':>8}"
+    print(header)
+    for name, result in sorted(results.items(), key=lambda item: item[1]['total'], reverse=True):
+        line = f"{name:<20} {result['total']:6.2f}s "
+        line += ' '.join(f"{result['phases'][p]:6.2f}s {100 * result['phases'][p] / result['total']:3.0f}%"
+                         for p in PHASES)
+        line += f" {result['peak_rss_mb']:8.1f}"
+        if previous and name in previous:
+            change = 100 * (result['total'] / previous[name]['total'] - 1)
+            line += f" {change:+7.1f}%"
+        print(line)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(results):
+    """Store a run as .benchmarks/render/NNNN_<commit>.json and return its path"""
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    number = len(glob.glob(os.path.join(BENCHMARK_DIR, '*.json'))) + 1
+    commit = _git_commit()
+    path = os.path.join(BENCHMARK_DIR, f"{number:04d}_{commit}.json")
+    with open(path, 'w') as f:
+        json.dump({'commit': commit, 'datetime': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'python': sys.version.split()[0], 'figures': results}, f, indent=2)
+    return path
+
+
+def load_previous():
+    """The most recently saved run, or None"""
+    paths = sorted(glob.glob(os.path.join(BENCHMARK_DIR, '*.json')))
+    if not paths:
+        return None
+    with open(paths[-1], 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile figure render phases and track them across commits')
+    parser.add_argument('figures', nargs='*', metavar='FIGURE', help='Figures to profile (default: all)')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--save', action='store_true', help='Save results under .benchmarks/render/')
+    parser.add_argument('--compare', action='store_true', help='Compare with the last saved run')
+    parser.add_argument('--max-regression', type=float, default=None, metavar='PCT',
+                        help='With --compare, fail if any figure got this much slower')
+    args = parser.parse_args()
+
+    figures = all_figures()
+    unknown = set(args.figures) - {name for name, _, _ in figures}
+    if unknown:
+        parser.error(f"unknown figure(s): {', '.join(sorted(unknown))}")
+    if args.figures:
+        figures = [figure for figure in figures if figure[0] in args.figures]
+
+    previous = load_previous() if args.compare else None
+    if args.compare and previous is None:
+        print("No saved run to compare with")
+    previous_figures = previous['figures'] if previous else None
+    if previous:
+        print(f"Comparing with {previous['commit']} ({previous['datetime']})")
+
+    results = benchmark(figures, runs=args.runs)
+    print_table(results, previous_figures)
+
+    if args.save:
+        print(f"💾 Saved {save_results(results)}")
+
+    if previous_figures and args.max_regression is not None:
+        slower = {name: 100 * (result['total'] / previous_figures[name]['total'] - 1)
+                  for name, result in results.items() if name in previous_figures}
+        slower = {name: pct for name, pct in slower.items() if pct > args.max_regression}
+        for name, pct in slower.items():
+            print(f"❌ {name} is {pct:.1f}% slower (budget {args.max_regression:.1f}%)")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,329 @@
 #!/usr/bin/env python3
+import hashlib
 import http.server
 import socketserver
+import json
 import os
+import re
+import time
+from urllib.parse import urlparse, parse_qs, unquote
+
+from analytics_store import AnalyticsStore, DEFAULT_POINTS, parse_time
+from appointment_scheduler import AppointmentScheduler, BookingConflict
+from artifact_store import ArtifactStore, IMMUTABLE_CACHE_CONTROL
+from diagnosis_service import DiagnosisService
+from record_store import SHA256_RE, ChunkedReader, LimitedReader, RecordStore
+from patient_registry import PatientRegistry, DEFAULT_PAGE_SIZE
+from paths import HEALTHCARE_DIR
 
 PORT = 8080
-os.chdir('/home/ubuntu/healthcare')
+PATIENT_DB = os.path.join(HEALTHCARE_DIR, 'patients.db')
+ARTIFACT_URL_RE = re.compile(r'^/artifacts/([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+MAX_JSON_BODY = 16 * 1024 * 1024
+DEFAULT_ANALYTICS_DAYS = 365
+
+
+class HealthcareHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the static pages plus the JSON APIs under /api/"""
+
+    registry = None
+    store = None
+    analytics = None
+    diagnosis = None
+    records = None
+    scheduler = None
+
+    def do_GET(self):
+        """Handle GET requests"""
+        parsed_path = urlparse(self.path)
+        path = parsed_path.path
+
+        if not path.startswith('/api/'):
+            if not (self.store and self.handle_artifact(path)):
+                super().do_GET()
+            return
+
+        query = parse_qs(parsed_path.query)
+        try:
+            if path == '/api/patients':
+                self.handle_list_patients(query)
+            elif path == '/api/patients/stats':
+                self.send_json_response(self.registry.risk_summary())
+            elif path.startswith('/api/patients/'):
+                self.handle_get_patient(path.split('/')[-1])
+            elif path == '/api/analytics/series':
+                self.handle_analytics_series(query)
+            elif path == '/api/analytics/totals':
+                kind, start, end = self.analytics_range(query)
+                self.send_json_response(self.analytics.totals(kind, start, end))
+            elif path == '/api/analytics/stats':
+                self.send_json_response(self.analytics.stats())
+            elif path == '/api/diagnose/stats':
+                self.send_json_response(self.diagnosis.stats())
+            elif path == '/api/records':
+                self.send_json_response({'records': self.records.list_records(query.get('limit', [50])[0])})
+            elif path == '/api/records/search':
+                self.send_json_response({'records': self.records.search(query.get('q', [''])[0])})
+            elif path.startswith('/api/records/'):
+                self.handle_get_record(path.split('/')[-1])
+            elif path == '/api/appointments':
+                self.handle_list_appointments(query)
+            elif path == '/api/appointments/free':
+                self.handle_free_slots(query)
+            elif path == '/api/appointments/stats':
+                self.send_json_response(self.scheduler.stats())
+            else:
+                self.send_json_response({'error': 'Not Found'}, 404)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+
+    def do_POST(self):
+        """Handle POST requests"""
+        path = urlparse(self.path).path
+        try:
+            if path == '/api/analytics/events':
+                self.handle_ingest_events()
+            elif path == '/api/diagnose':
+                self.handle_diagnose()
+            elif path == '/api/records/upload':
+                self.handle_upload_records(parse_qs(urlparse(self.path).query))
+            elif path == '/api/appointments':
+                self.handle_book_appointment()
+            elif path == '/api/appointments/bulk':
+                self.handle_book_appointments()
+            else:
+                self.send_json_response({'error': 'Not Found'}, 404)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+
+    def do_DELETE(self):
+        """Handle DELETE requests"""
+        path = urlparse(self.path).path
+        try:
+            if path.startswith('/api/appointments/'):
+                appointment = self.scheduler.cancel(unquote(path.split('/')[-1]))
+                if appointment is None:
+                    self.send_json_response({'error': 'Appointment not found'}, 404)
+                else:
+                    self.send_json_response({'cancelled': appointment})
+            else:
+                self.send_json_response({'error': 'Not Found'}, 404)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+
+    def read_json_body(self):
+        """Parse the request body as JSON"""
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_JSON_BODY:
+            raise ValueError(f"Request body is larger than {MAX_JSON_BODY} bytes")
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def analytics_range(self, query):
+        """(kind, start, end) from ?kind=&start=&end=; the range defaults to the last year"""
+        end = parse_time(query['end'][0]) if 'end' in query else int(time.time())
+        start = (parse_time(query['start'][0]) if 'start' in query
+                 else end - DEFAULT_ANALYTICS_DAYS * 86400)
+        if start >= end:
+            raise ValueError("start must be before end")
+        return query.get('kind', ['visit'])[0], start, end
+
+    def handle_analytics_series(self, query):
+        """Return event counts per bucket for a chart"""
+        kind, start, end = self.analytics_range(query)
+        self.send_json_response(self.analytics.series(
+            kind, start, end,
+            resolution=query.get('resolution', [None])[0],
+            max_points=int(query.get('points', [DEFAULT_POINTS])[0]),
+            by_condition=query.get('by', [None])[0] == 'condition',
+        ))
+
+    def handle_get_record(self, digest):
+        """Return a stored record's metadata; lets clients skip uploading files already stored"""
+        record = self.records.get(digest) if SHA256_RE.match(digest) else None
+        if record is None:
+            self.send_json_response({'error': f"Record {digest} not found"}, 404)
+        else:
+            self.send_json_response(record)
+
+    def handle_upload_records(self, query):
+        """Stream a raw, chunked or multipart/form-data upload into the record store"""
+        if 'chunked' in (self.headers.get('Transfer-Encoding') or '').lower():
+            body = ChunkedReader(self.rfile)
+        else:
+            body = LimitedReader(self.rfile, int(self.headers.get('Content-Length') or 0))
+        filename = query.get('name', [None])[0] or self.headers.get('X-Filename')
+        self.send_json_response(self.records.ingest_body(body, self.headers.get('Content-Type'), filename))
+
+    def handle_diagnose(self):
+        """Score {"symptoms", "age", "gender"} with the batched diagnosis model"""
+        data = self.read_json_body()
+        if not isinstance(data, dict) or not str(data.get('symptoms') or '').strip():
+            raise ValueError("symptoms are required")
+        self.send_json_response(self.diagnosis.diagnose(str(data['symptoms']), data.get('age'), data.get('gender')))
+
+    def handle_book_appointment(self):
+        """Book {"clinician", "start", "duration", "patient"}; 409 with the clashing appointment if busy"""
+        data = self.read_json_body()
+        if not isinstance(data, dict):
+            raise ValueError("Expected an appointment object")
+        try:
+            appointment = self.scheduler.book(data.get('clinician'), data.get('start'),
+                                              data.get('duration'), data.get('patient'))
+        except BookingConflict as e:
+            self.send_json_response({'error': str(e), 'conflict': e.appointment}, 409)
+        else:
+            self.send_json_response(appointment, 201)
+
+    def handle_book_appointments(self):
+        """Book a JSON list of appointments (or {"appointments": [...]}); one result per entry"""
+        data = self.read_json_body()
+        appointments = data.get('appointments') if isinstance(data, dict) else data
+        if not isinstance(appointments, list):
+            raise ValueError("Expected a list of appointments")
+        results = self.scheduler.book_many(appointments)
+        self.send_json_response({'booked': sum('id' in result for result in results), 'results': results})
+
+    def handle_list_appointments(self, query):
+        """A clinician's appointments between ?start= and ?end= (default: the next 7 days)"""
+        if 'clinician' not in query:
+            raise ValueError("clinician is required")
+        start = parse_time(query['start'][0]) if 'start' in query else int(time.time())
+        end = parse_time(query['end'][0]) if 'end' in query else start + 7 * 86400
+        self.send_json_response({'appointments': self.scheduler.list_appointments(query['clinician'][0], start, end)})
+
+    def handle_free_slots(self, query):
+        """The next ?count= free slots of ?duration= minutes for ?clinician= after ?after= (default now)"""
+        if 'clinician' not in query:
+            raise ValueError("clinician is required")
+        slots = self.scheduler.next_free(
+            query['clinician'][0],
+            query['after'][0] if 'after' in query else int(time.time()),
+            query.get('duration', [30])[0],
+            query.get('count', [1])[0],
+        )
+        self.send_json_response({'slots': slots})
+
+    def handle_ingest_events(self):
+        """Append a JSON list of events (or {"events": [...]}) to the analytics store"""
+        data = self.read_json_body()
+        events = data.get('events') if isinstance(data, dict) else data
+        if not isinstance(events, list):
+            raise ValueError("Expected a list of events")
+        ingested = self.analytics.ingest_records(events)
+        self.analytics.maybe_save()
+        self.send_json_response({'ingested': ingested, 'events': self.analytics.events})
+
+    def handle_list_patients(self, query):
+        """Return one cursor-paginated page of patients"""
+        page = self.registry.list_patients(
+            search=query.get('q', [None])[0],
+            risk_level=query.get('risk', [None])[0],
+            cursor=query.get('cursor', [None])[0],
+            limit=query.get('limit', [DEFAULT_PAGE_SIZE])[0],
+        )
+        self.send_json_response(page)
+
+    def handle_get_patient(self, mrn):
+        """Return a single patient by MRN"""
+        patient = self.registry.get_by_mrn(mrn)
+        if patient is None:
+            self.send_json_response({'error': f"Patient {mrn} not found"}, 404)
+        else:
+            self.send_json_response(patient)
+
+    def handle_artifact(self, path):
+        """Serve generated files through the artifact store; False to fall back to static files.
+
+        /artifacts/<sha256>.<ext> never changes, so it is cached for a year.
+        Published names (timeline.png) and HTML pages, whose references are
+        rewritten to those immutable URLs, are revalidated by ETag instead.
+        """
+        match = ARTIFACT_URL_RE.match(path)
+        if match:
+            blob = self.store.blob_path(match.group(1))
+            if not os.path.exists(blob):
+                self.send_error(404)
+                return True
+            self.send_cached_file(blob, match.group(1), IMMUTABLE_CACHE_CONTROL,
+                                  self.guess_type(path))
+            return True
+
+        name = path.lstrip('/')
+        if path.endswith('.html') and '/' not in name and os.path.isfile(name):
+            with open(name, 'r', encoding='utf-8') as f:
+                body = self.store.rewrite_references(f.read(), base_dir='.').encode('utf-8')
+            self.send_cached_body(body, hashlib.sha256(body).hexdigest(), 'no-cache',
+                                  'text/html; charset=utf-8')
+            return True
+
+        # A file on disk that differs from the published blob is served instead
+        digest = self.store.current_digest(name, base_dir='.')
+        if digest and os.path.exists(self.store.blob_path(digest)):
+            self.send_cached_file(self.store.blob_path(digest), digest, 'no-cache', self.guess_type(path))
+            return True
+        return False
+
+    def _not_modified(self, etag, cache_control):
+        if etag not in (self.headers.get('If-None-Match') or ''):
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        return True
+
+    def send_cached_file(self, path, digest, cache_control, content_type):
+        etag = f'"{digest}"'
+        if self._not_modified(etag, cache_control):
+            return
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        with open(path, 'rb') as f:
+            self.copyfile(f, self.wfile)
+
+    def send_cached_body(self, body, digest, cache_control, content_type):
+        etag = f'"{digest}"'
+        if self._not_modified(etag, cache_control):
+            return
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_response(self, data, status_code=200):
+        """Send JSON response"""
+        body = json.dumps(data, default=str).encode()
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+    os.chdir(HEALTHCARE_DIR)
+    HealthcareHandler.registry = PatientRegistry(PATIENT_DB)
+    HealthcareHandler.store = ArtifactStore()
+    HealthcareHandler.analytics = AnalyticsStore()
+    HealthcareHandler.diagnosis = DiagnosisService()
+    HealthcareHandler.records = RecordStore()
+    HealthcareHandler.records.resume()
+    HealthcareHandler.scheduler = AppointmentScheduler()
 
-Handler = http.server.SimpleHTTPRequestHandler
-with socketserver.TCPServer(("", PORT), Handler) as httpd:
-    print(f"🏥 Healthcare AI Platform running at http://localhost:{PORT}")
-    httpd.serve_forever()
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer(("", PORT), HealthcareHandler) as httpd:
+        print(f"🏥 Healthcare AI Platform running at http://localhost:{PORT}")
+        httpd.serve_forever()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Per-thread SQLite connections shared by the healthcare stores
+sqlite3 connections cannot be shared between the server's request threads,
+so each thread opens its own on first use, in WAL mode so readers do not
+block the writer.
+"""
+
+import sqlite3
+import threading
+
+
+class ThreadConnections:
+    """One connection to db_path per thread, opened on first use"""
+
+    def __init__(self, db_path, row_factory=None, timeout=5.0):
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Appointment scheduler: bookings after a clinician's calendar has been emptied
+"""
+
+import pytest
+
+from appointment_scheduler import AppointmentScheduler, BookingConflict
+
+DAY = '2025-07-24'
+
+
+@pytest.fixture(params=[None, 'sqlite'])
+def scheduler(request, tmp_path):
+    return AppointmentScheduler(db_path=None if request.param is None else str(tmp_path / 'appointments.db'))
+
+
+def test_rebooking_after_cancel_still_detects_conflicts(scheduler):
+    first = scheduler.book('DR1', f'{DAY}T09:00:00Z', 30)
+    assert scheduler.cancel(first['id'])['id'] == first['id']
+
+    scheduler.book('DR1', f'{DAY}T09:00:00Z', 30)
+    with pytest.raises(BookingConflict):
+        scheduler.book('DR1', f'{DAY}T09:10:00Z', 30)
+    assert scheduler.next_free('DR1', f'{DAY}T09:00:00Z', 30)[0]['start'] == f'{DAY}T09:30:00Z'
+    assert scheduler.stats()['appointments'] == 1
+
+
+def test_bulk_rebooking_after_cancel_lands_in_the_calendar(scheduler):
+    first = scheduler.book('DR1', f'{DAY}T09:00:00Z', 30)
+    scheduler.cancel(first['id'])
+
+    results = scheduler.book_many([{'clinician': 'DR1', 'start': f'{DAY}T09:00:00Z', 'duration': 30}])
+    assert 'id' in results[0]
+    assert [a['start'] for a in scheduler.list_appointments('DR1', f'{DAY}T00:00:00Z', f'{DAY}T23:59:00Z')] \
+        == [f'{DAY}T09:00:00Z']
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Patient registry: name prefix search beyond the Basic Multilingual Plane
+"""
+
+from patient_registry import PatientRegistry, prefix_upper_bound
+
+
+def _patient(patient_id, name):
+    return (patient_id, f'MRN{patient_id:06d}', name, name.lower(), 40,
+            'Asthma', 'Low', 2.0, '2025-07-24')
+
+
+def test_prefix_search_matches_names_continuing_outside_the_bmp(tmp_path):
+    registry = PatientRegistry(str(tmp_path / 'patients.db'))
+    registry.bulk_insert([_patient(1, 'Ana \U0001F600'), _patient(2, 'Ana \uffff'),
+                          _patient(3, 'Anb'), _patient(4, 'Am')])
+
+    names = [p['name'] for p in registry.list_patients(search='ana ')['patients']]
+    assert sorted(names) == ['Ana \uffff', 'Ana \U0001F600']
+    assert [p['name'] for p in registry.list_patients(search='\U0010FFFF')['patients']] == []
+
+
+def test_prefix_upper_bound_skips_surrogates_and_the_last_code_point():
+    assert prefix_upper_bound('ab') == 'ac'
+    assert prefix_upper_bound('a\ud7ff') == 'a'
+    assert prefix_upper_bound('a\U0010FFFF') == 'b'
+    assert prefix_upper_bound('\U0010FFFF') is None
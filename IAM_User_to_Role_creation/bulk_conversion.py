@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Replayable bulk conversion from exported configuration files
+Reads conversions in the example-conversion-config.json shape (one exported
+file per conversion, or the bare "conversion" object) from a JSON array or
+NDJSON stream, one record at a time, plans each with conversion_planner and
+applies the plans in parallel under a shared IAM call rate limit.
+
+Every conversion is appended to a checkpoint file when it starts and when it
+finishes, so re-running the same input skips what was applied and continues
+conversions that failed or were interrupted part-way:
+
+    {"index": 12, "userName": "alice", "roleName": "alice-Role", "planId": "...",
+     "status": "started" | "applied" | "failed" | "invalid", "completed": 3, "error": null}
+"""
+
+import argparse
+import codecs
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from conversion_planner import execute_plan, existing_role_names, plan_conversion
+from iam_inventory import fetch_inventory
+from role_verification import SOURCE_USER_TAG
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+BULK_WORKERS = 8
+BULK_CALLS_PER_SECOND = 5.0   # IAM mutating calls are throttled account-wide
+BULK_IN_FLIGHT = 64           # conversions parsed ahead of the executor
+MAX_RECORD_CHARS = 16 * 1024 * 1024
+
+
+def iter_json_records(stream, read_size=READ_SIZE):
+    """Yield the objects of a JSON array or NDJSON text stream one at a time.
+
+    Only the current record and one read buffer are held in memory. A
+    syntax error raises ValueError as soon as it is followed by a newline
+    (JSON strings cannot span lines, so more input cannot fix it) rather
+    than after reading to the end.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()  # for byte streams; keeps split characters
+    buffer = ''
+    position = 0
+    in_array = None
+    eof = False
+    records = 0
+
+    while True:
+        # Skip whitespace and array punctuation between records
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if in_array is None and position < len(buffer):
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+                continue
+        if position < len(buffer) and buffer[position] == ']' and in_array:
+            return
+
+        if position < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # A record cut off by the read size fails at the end of the buffer
+                if eof or e.pos < buffer.rfind('\n') or len(buffer) - position > MAX_RECORD_CHARS:
+                    raise ValueError(f"Invalid JSON after record {records}: {e.msg}: "
+                                     f"{buffer[e.pos:e.pos + 40]!r}") from e
+            else:
+                # A record ending exactly at the buffer end may be a truncated number or literal
+                if end < len(buffer) or eof:
+                    yield record
+                    records += 1
+                    position = end
+                    continue
+
+        if eof:
+            if buffer[position:].strip():
+                raise ValueError(f"Unexpected trailing data: {buffer[position:position + 40]!r}")
+            return
+        chunk = stream.read(read_size)
+        if not chunk:
+            eof = True
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk, final=eof)
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+class LimitedReader:
+    """Reads at most length bytes from a stream, e.g. a request body of known Content-Length"""
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def config_to_conversion(record):
+    """The conversion inside an exported config (or a bare conversion object), checked for shape"""
+    if not isinstance(record, dict):
+        raise ValueError("Record is not a JSON object")
+    conversion = record.get('conversion', record)
+    if not isinstance(conversion, dict):
+        raise ValueError("conversion is not a JSON object")
+    if not isinstance(conversion.get('userName'), str) or not conversion['userName']:
+        raise ValueError("Conversion is missing userName")
+    if not isinstance(conversion.get('trustPolicy'), dict):
+        raise ValueError("Conversion is missing trustPolicy")
+    for field in ('roleName', 'roleDescription'):
+        if conversion.get(field) is not None and not isinstance(conversion[field], str):
+            raise ValueError(f"{field} must be a string")
+    policies = conversion.get('policies', [])
+    if not isinstance(policies, list):
+        raise ValueError("policies must be a list")
+    for number, policy in enumerate(policies):
+        if not isinstance(policy, dict) or not isinstance(policy.get('PolicyName'), str):
+            raise ValueError(f"Policy {number} has no PolicyName")
+        if policy.get('Type') == 'Managed' and not isinstance(policy.get('PolicyArn'), str):
+            raise ValueError(f"Managed policy {policy['PolicyName']} has no PolicyArn")
+        if policy.get('Type') == 'Inline' and not isinstance(policy.get('Document'), (dict, type(None))):
+            raise ValueError(f"Inline policy {policy['PolicyName']} document is not a JSON object")
+    return conversion
+
+
+def replay_inventory(conversion):
+    """A one-user inventory built from the config's own policies, so replays do not depend on the live user"""
+    policies = conversion.get('policies', [])
+    return {
+        'users': {conversion['userName']: {
+            'Groups': [],
+            'AttachedPolicies': [{'PolicyName': p['PolicyName'], 'PolicyArn': p['PolicyArn']}
+                                 for p in policies if p.get('Type') == 'Managed'],
+            'InlinePolicies': {p['PolicyName']: p.get('Document')
+                               for p in policies if p.get('Type') == 'Inline'},
+        }},
+        'roles': {},
+    }
+
+
+def load_checkpoint(path):
+    """Latest checkpoint record per input index"""
+    records = {}
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record['index']] = record
+    return records
+
+
+class RateLimitedClient:
+    """Proxies an IAM client, blocking each API call until the shared token bucket allows it"""
+
+    def __init__(self, client, calls_per_second):
+        from session_auth import TokenBucket
+
+        self._client = client
+        self._bucket = TokenBucket(rate=calls_per_second, burst=max(1, int(calls_per_second)))
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            while True:
+                delay = self._bucket.acquire()
+                if not delay:
+                    return method(*args, **kwargs)
+                time.sleep(delay)
+
+        return call
+
+
+def resume_step(iam, plan):
+    """Step to resume an interrupted plan at: 1 if its role exists and was converted from its user.
+
+    The remaining steps (attaching and putting policies) can safely be repeated.
+    """
+    try:
+        role = iam.get_role(RoleName=plan['roleName'])['Role']
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'NoSuchEntity':
+            return 0
+        raise
+    tags = {tag['Key']: tag['Value'] for tag in role.get('Tags', [])}
+    if tags.get(SOURCE_USER_TAG) != plan['userName']:
+        raise ValueError(f"Role {plan['roleName']} already exists and was not converted from {plan['userName']}")
+    return 1
+
+
+def run_bulk(iam, stream, checkpoint_path=None, workers=BULK_WORKERS, calls_per_second=BULK_CALLS_PER_SECOND,
+             dry_run=False, quotas=None, on_applied=None):
+    """Plan and apply every conversion in stream; returns a summary dict.
+
+    on_applied(plan) is called after each successful conversion (the backend
+    uses it for cache invalidation). With dry_run, plans are validated
+    against the account's roles but nothing is written or checkpointed.
+    """
+    done = load_checkpoint(checkpoint_path)
+    existing_names = existing_role_names(fetch_inventory(iam, filters=['Role']))
+    reserved_names = set()
+    client = RateLimitedClient(iam, calls_per_second)
+    counts = {'applied': 0, 'failed': 0, 'invalid': 0, 'skipped': 0, 'planned': 0}
+    errors = []
+    lock = threading.Lock()
+    checkpoint = open(checkpoint_path, 'a') if checkpoint_path and not dry_run else None
+
+    def record(entry):
+        with lock:
+            counts[entry['status']] += 1
+            if entry.get('error') and len(errors) < 100:
+                errors.append({'index': entry['index'], 'userName': entry['userName'], 'error': entry['error']})
+            if checkpoint:
+                checkpoint.write(json.dumps(entry) + '\n')
+                checkpoint.flush()
+
+    def apply(index, plan, start):
+        try:
+            if start is None:
+                start = resume_step(client, plan)
+            if checkpoint:
+                with lock:
+                    checkpoint.write(json.dumps({
+                        'index': index, 'userName': plan['userName'], 'roleName': plan['roleName'],
+                        'planId': plan['planId'], 'status': 'started', 'completed': start, 'error': None}) + '\n')
+                    checkpoint.flush()
+            result = execute_plan(client, plan, start=start)
+        except Exception as e:
+            result = {'success': False, 'completed': start or 0, 'failed': {'error': str(e)}}
+        entry = {'index': index, 'userName': plan['userName'], 'roleName': plan['roleName'],
+                 'planId': plan['planId'], 'completed': result['completed'],
+                 'status': 'applied' if result['success'] else 'failed',
+                 'error': None if result['success'] else result['failed']['error']}
+        record(entry)
+        if result['success'] and on_applied:
+            on_applied(plan)
+
+    start_time = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for index, raw in enumerate(iter_json_records(stream)):
+                previous = done.get(index)
+                # A partially applied or interrupted conversion may already have created its role
+                resuming = previous is not None and (
+                    previous['status'] == 'started' or (previous['status'] == 'failed' and previous['completed'] > 0))
+                names = existing_names - {previous['roleName'].lower()} if resuming else existing_names
+                try:
+                    conversion = config_to_conversion(raw)
+                    plan = plan_conversion(replay_inventory(conversion), conversion, quotas, reserved_names, names)
+                except Exception as e:
+                    user_name = raw.get('conversion', raw) if isinstance(raw, dict) else None
+                    record({'index': index,
+                            'userName': user_name.get('userName') if isinstance(user_name, dict) else None,
+                            'roleName': None, 'planId': None, 'status': 'invalid', 'completed': 0,
+                            'error': str(e)})
+                    continue
+
+                if previous is not None and previous['status'] == 'applied' and previous['planId'] == plan['planId']:
+                    counts['skipped'] += 1
+                    continue
+                if not plan['valid']:
+                    record({'index': index, 'userName': plan['userName'], 'roleName': plan['roleName'],
+                            'planId': plan['planId'], 'status': 'invalid', 'completed': 0,
+                            'error': '; '.join(plan['errors'])})
+                    continue
+                if dry_run:
+                    counts['planned'] += 1
+                    continue
+
+                if not resuming:
+                    start = 0
+                elif previous['status'] == 'failed' and previous['planId'] == plan['planId']:
+                    start = previous['completed']
+                else:
+                    start = None  # interrupted mid-step, or re-planned: check the role first
+                pending.add(executor.submit(apply, index, plan, start))
+                if len(pending) >= BULK_IN_FLIGHT:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    return dict(counts, seconds=round(time.perf_counter() - start_time, 3), errors=errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply exported IAM user-to-role conversion configs in bulk')
+    parser.add_argument('input', help="JSON array or NDJSON file of configs ('-' for stdin)")
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <input>.checkpoint.jsonl)')
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS)
+    parser.add_argument('--rate', type=float, default=BULK_CALLS_PER_SECOND, help='IAM API calls per second')
+    parser.add_argument('--dry-run', action='store_true', help='Validate every conversion without writing')
+    args = parser.parse_args()
+
+    import boto3
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    checkpoint = args.checkpoint
+    if checkpoint is None and args.input != '-':
+        checkpoint = args.input + '.checkpoint.jsonl'
+
+    stream = sys.stdin if args.input == '-' else open(args.input, 'r')
+    try:
+        summary = run_bulk(boto3.client('iam'), stream, checkpoint, workers=args.workers,
+                           calls_per_second=args.rate, dry_run=args.dry_run)
+    finally:
+        stream.close()
+
+    for error in summary['errors']:
+        print(f"❌ #{error['index']} {error['userName']}: {error['error']}")
+    print(f"✅ {summary['applied']} applied, {summary['skipped']} already done, {summary['planned']} planned, "
+          f"{summary['invalid']} invalid, {summary['failed']} failed in {summary['seconds']:.1f}s")
+    sys.exit(1 if summary['failed'] or summary['invalid'] else 0)
+
+
+if __name__ == '__main__':
+    main()
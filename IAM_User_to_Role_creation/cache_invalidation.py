@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Cache invalidation for the IAM Conversion Backend
+Evicts only the cached results that depend on a changed IAM user, role or
+policy, from two sources:
+
+- write-through: the backend's own create-role / attach-policies handlers
+- a change feed: CloudTrail-style IAM events read from a local file that
+  other tools (or a CloudTrail/EventBridge forwarder) append to
+
+The feed is newline-delimited JSON; each line is either one CloudTrail record
+or a CloudTrail log document ({"Records": [...]}):
+
+    {"eventSource": "iam.amazonaws.com", "eventName": "AttachUserPolicy", "eventID": "...",
+     "requestParameters": {"userName": "alice", "policyArn": "arn:aws:iam::aws:policy/ReadOnlyAccess"}}
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+FEED_POLL_INTERVAL = 5      # seconds between change-feed reads
+SEEN_EVENT_IDS = 10000      # event ids remembered to skip duplicate deliveries
+
+# requestParameters fields naming the entity an IAM event changed
+ENTITY_PARAMETERS = {
+    'userName': 'user',
+    'roleName': 'role',
+    'policyArn': 'policy',
+}
+
+
+def event_entities(record):
+    """(kind, name) entities changed by one CloudTrail record; empty for reads and non-IAM events"""
+    if record.get('eventSource') != 'iam.amazonaws.com' or record.get('readOnly'):
+        return set()
+    event_name = str(record.get('eventName', ''))
+    if event_name.startswith(('Get', 'List', 'Generate', 'Simulate')):
+        return set()
+    if record.get('errorCode'):
+        return set()
+    parameters = record.get('requestParameters')
+    if not isinstance(parameters, dict):
+        return set()
+    return {(kind, parameters[field]) for field, kind in ENTITY_PARAMETERS.items()
+            if isinstance(parameters.get(field), str) and parameters[field]}
+
+
+class CacheInvalidator:
+    """Evicts affected entries from every session's result cache"""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.evicted = 0
+        self.events = 0
+
+    def invalidate(self, users=(), roles=(), policies=()):
+        """Evict results built from the given users, roles or policy ARNs"""
+        entities = ({('user', name) for name in users} | {('role', name) for name in roles}
+                    | {('policy', arn) for arn in policies})
+        return self.invalidate_entities(entities)
+
+    def invalidate_entities(self, entities):
+        if not entities:
+            return 0
+        evicted = sum(session.cache.evict_tagged(entities) for session in self.sessions.sessions())
+        self.evicted += evicted
+        logger.info("Invalidated %s cached results for %s", evicted, sorted(entities))
+        return evicted
+
+    def apply_record(self, record):
+        """Invalidate for one CloudTrail record; returns the number of evicted entries"""
+        self.events += 1
+        return self.invalidate_entities(event_entities(record))
+
+
+class ChangeFeedPoller:
+    """Tails a newline-delimited CloudTrail feed file and invalidates for each new event.
+
+    Only complete lines are consumed; the read offset is reset if the file
+    shrinks (rotated or truncated). Events seen before, by eventID, are
+    skipped so at-least-once delivery is harmless.
+    """
+
+    def __init__(self, path, invalidator, interval=FEED_POLL_INTERVAL, from_start=False):
+        self.path = path
+        self.invalidator = invalidator
+        self.interval = interval
+        self.offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+        self._seen = OrderedDict()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _records(self, line):
+        """The records of one feed line; ValueError if it is not JSON or not a record list"""
+        document = json.loads(line)
+        if isinstance(document, dict):
+            document = document.get('Records', [document])
+        if not isinstance(document, list):
+            raise ValueError(f"expected a record or a list of records, got {type(document).__name__}")
+        return document
+
+    def _is_duplicate(self, record):
+        event_id = record.get('eventID')
+        if not isinstance(event_id, str):
+            return False
+        if event_id in self._seen:
+            return True
+        self._seen[event_id] = None
+        if len(self._seen) > SEEN_EVENT_IDS:
+            self._seen.popitem(last=False)
+        return False
+
+    def poll(self):
+        """Consume new lines once; returns the number of events applied"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            logger.info("Change feed %s was truncated, reading from the start", self.path)
+            self.offset = 0
+        if size == self.offset:
+            return 0
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        complete = data[:data.rfind(b'\n') + 1]
+        self.offset += len(complete)
+
+        applied = 0
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records = self._records(line)
+            except ValueError as e:
+                logger.warning("Skipping malformed change feed line: %s", e)
+                continue
+            for record in records:
+                if not isinstance(record, dict):
+                    logger.warning("Skipping malformed change feed record: %r", record)
+                    continue
+                if not self._is_duplicate(record):
+                    self.invalidator.apply_record(record)
+                    applied += 1
+        return applied
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("Change feed poll failed: %s", e)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='iam-change-feed', daemon=True)
+        self._thread.start()
+        logger.info("Watching IAM change feed %s every %ss", self.path, self.interval)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Dry-run planning and execution of user-to-role conversions
+plan_conversions builds the complete list of IAM calls for one or many users
+from an inventory snapshot (iam_inventory.fetch_inventory) without calling
+AWS, and checks it against IAM quotas and existing role names first, so a
+conversion cannot fail half-way on a limit. execute_plan then makes exactly
+the calls in the plan.
+
+A plan per user:
+
+    {'userName', 'roleName', 'valid': bool, 'errors': [...], 'warnings': [...],
+     'steps': [{'action': 'create_role', 'params': {...}},
+               {'action': 'attach_role_policy', 'params': {...}},
+               {'action': 'put_role_policy', 'params': {...}}],
+     'planId': sha256 of the steps}
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from role_verification import SOURCE_USER_TAG
+
+# IAM defaults; managed policies per role can be raised to 20 by quota request
+DEFAULT_QUOTAS = {
+    'role_name_length': 64,
+    'policy_name_length': 128,
+    'description_length': 1000,
+    'managed_policies_per_role': 10,
+    'inline_policy_chars_per_role': 10240,
+    'trust_policy_chars': 2048,
+}
+ROLE_NAME_RE = re.compile(r'^[\w+=,.@-]+$')
+# The only IAM calls a plan may make
+PLAN_ACTIONS = {'create_role', 'attach_role_policy', 'put_role_policy'}
+ISSUED_PLAN_TTL = 3600  # seconds a previewed plan can still be applied
+MAX_ISSUED_PLANS = 10000
+DEFAULT_ROLE_NAME = '{user}-Role'
+DEFAULT_DESCRIPTION = 'Converted from IAM user {user}'
+
+
+def compact_json(document):
+    """A policy document as JSON without whitespace; its length is what IAM size quotas count"""
+    return json.dumps(document, separators=(',', ':'))
+
+
+def existing_role_names(inventory):
+    """Lowercased names of the inventory's roles; IAM role names are unique case-insensitively"""
+    return {name.lower() for name in inventory['roles']}
+
+
+def plan_conversion(inventory, conversion, quotas=None, reserved_names=None, existing_names=None):
+    """Plan one conversion: {'userName', 'roleName'?, 'roleDescription'?, 'trustPolicy'}.
+
+    reserved_names holds lowercased role names planned earlier in the same
+    batch; existing_names is existing_role_names(inventory), passed in when
+    planning many conversions against one inventory.
+    """
+    quotas = dict(DEFAULT_QUOTAS, **(quotas or {}))
+    if existing_names is None:
+        existing_names = existing_role_names(inventory)
+    user_name = conversion['userName']
+    role_name = conversion.get('roleName') or DEFAULT_ROLE_NAME.format(user=user_name)
+    description = conversion.get('roleDescription') or DEFAULT_DESCRIPTION.format(user=user_name)
+    trust_policy = conversion.get('trustPolicy')
+    plan = {'userName': user_name, 'roleName': role_name, 'errors': [], 'warnings': [], 'steps': []}
+    errors, warnings = plan['errors'], plan['warnings']
+
+    user = inventory['users'].get(user_name)
+    if user is None:
+        errors.append(f"User {user_name} not found")
+
+    if len(role_name) > quotas['role_name_length']:
+        errors.append(f"Role name is {len(role_name)} characters; the limit is {quotas['role_name_length']}")
+    if not ROLE_NAME_RE.match(role_name):
+        errors.append("Role name may only contain letters, digits and +=,.@_-")
+    lowered = role_name.lower()
+    if lowered in existing_names:
+        errors.append(f"Role {role_name} already exists")
+    if reserved_names is not None:
+        if lowered in reserved_names:
+            errors.append(f"Role {role_name} is planned more than once")
+        reserved_names.add(lowered)
+    if len(description) > quotas['description_length']:
+        errors.append(f"Description is {len(description)} characters; the limit is {quotas['description_length']}")
+
+    trust_json = compact_json(trust_policy)
+    if not trust_policy:
+        errors.append("Trust policy is required")
+    elif len(trust_json) > quotas['trust_policy_chars']:
+        errors.append(f"Trust policy is {len(trust_json)} characters; "
+                      f"the limit is {quotas['trust_policy_chars']}")
+
+    if user is not None:
+        if user.get('Groups'):
+            warnings.append(f"Policies inherited from groups {', '.join(user['Groups'])} are not converted")
+
+        managed = user['AttachedPolicies']
+        if len(managed) > quotas['managed_policies_per_role']:
+            errors.append(f"User has {len(managed)} managed policies; a role allows "
+                          f"{quotas['managed_policies_per_role']}")
+
+        inline = {}
+        for policy_name, document in sorted(user['InlinePolicies'].items()):
+            if document is None:
+                errors.append(f"Inline policy {policy_name} has no document")
+                continue
+            if len(policy_name) > quotas['policy_name_length']:
+                errors.append(f"Inline policy name {policy_name} is longer than {quotas['policy_name_length']}")
+            inline[policy_name] = compact_json(document)
+        inline_chars = sum(len(document) for document in inline.values())
+        if inline_chars > quotas['inline_policy_chars_per_role']:
+            errors.append(f"Inline policies total {inline_chars} characters; a role allows "
+                          f"{quotas['inline_policy_chars_per_role']}")
+        if not managed and not user['InlinePolicies']:
+            warnings.append(f"User {user_name} has no policies to convert")
+
+        create_params = {
+            'RoleName': role_name,
+            'AssumeRolePolicyDocument': trust_json,
+            'Path': '/',
+            'Description': description,
+            'Tags': [{'Key': SOURCE_USER_TAG, 'Value': user_name}],
+        }
+        plan['steps'].append({'action': 'create_role', 'params': create_params})
+        for policy in managed:
+            plan['steps'].append({'action': 'attach_role_policy',
+                                  'params': {'RoleName': role_name, 'PolicyArn': policy['PolicyArn']}})
+        for policy_name, document in inline.items():
+            plan['steps'].append({'action': 'put_role_policy', 'params': {
+                'RoleName': role_name, 'PolicyName': policy_name, 'PolicyDocument': document,
+            }})
+
+    plan['valid'] = not errors
+    plan['planId'] = hashlib.sha256(json.dumps(plan['steps'], sort_keys=True).encode('utf-8')).hexdigest()
+    return plan
+
+
+def plan_conversions(inventory, conversions, quotas=None):
+    """Plan a batch of conversions, checking role names against each other as well"""
+    reserved_names = set()
+    existing_names = existing_role_names(inventory)
+    plans = [plan_conversion(inventory, conversion, quotas, reserved_names, existing_names)
+             for conversion in conversions]
+    return {
+        'plans': plans,
+        'summary': {
+            'total': len(plans),
+            'valid': sum(plan['valid'] for plan in plans),
+            'invalid': sum(not plan['valid'] for plan in plans),
+            'api_calls': sum(len(plan['steps']) for plan in plans),
+        },
+    }
+
+
+class IssuedPlans:
+    """Valid plans handed out by /api/plan, kept on the server until they are applied.
+
+    Clients send back only the planId; the steps that run are the server's
+    own copy, so a client cannot change what a plan does.
+    """
+
+    def __init__(self, ttl=ISSUED_PLAN_TTL, limit=MAX_ISSUED_PLANS):
+        self.ttl = ttl
+        self.limit = limit
+        self._plans = OrderedDict()  # planId -> (issued at, plan)
+        self._lock = threading.Lock()
+
+    def issue(self, plans):
+        now = time.monotonic()
+        with self._lock:
+            for plan in plans:
+                if plan['valid']:
+                    self._plans.pop(plan['planId'], None)
+                    self._plans[plan['planId']] = (now, plan)
+            while len(self._plans) > self.limit:
+                self._plans.popitem(last=False)
+
+    def claim(self, plan_id):
+        """Remove and return the issued plan with this id, or None if unknown or expired"""
+        with self._lock:
+            entry = self._plans.pop(plan_id, None)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+
+def check_steps(plan):
+    """Raise ValueError unless every step is an allowed call on the plan's own role"""
+    for step in plan['steps']:
+        if step.get('action') not in PLAN_ACTIONS:
+            raise ValueError(f"Plan step {step.get('action')!r} is not allowed")
+        if not isinstance(step.get('params'), dict) or step['params'].get('RoleName') != plan['roleName']:
+            raise ValueError(f"Plan step {step['action']} does not target role {plan['roleName']}")
+
+
+def execute_plan(iam, plan, start=0):
+    """Make the plan's IAM calls in order, stopping at the first failure.
+
+    start skips steps a previous, interrupted run already made. Returns
+    {'success', 'roleName', 'role_arn', 'completed': steps done in total,
+    'failed': the failing step with its error, or None}.
+    """
+    if not plan.get('valid'):
+        raise ValueError(f"Plan for {plan.get('userName')} is not valid: {'; '.join(plan.get('errors', []))}")
+    check_steps(plan)
+
+    result = {'success': False, 'roleName': plan['roleName'], 'role_arn': None, 'completed': start,
+              'failed': None}
+    for step in plan['steps'][start:]:
+        try:
+            response = getattr(iam, step['action'])(**step['params'])
+        except Exception as e:
+            result['failed'] = {'action': step['action'], 'params': step['params'], 'error': str(e)}
+            return result
+        if step['action'] == 'create_role':
+            result['role_arn'] = response['Role']['Arn']
+        result['completed'] += 1
+    result['success'] = True
+    return result
+
+
+def benchmark(users=5000, policies_per_user=3):
+    """Seconds to plan a synthetic batch of users"""
+    document = {'Version': '2012-10-17',
+                'Statement': [{'Effect': 'Allow', 'Action': ['s3:GetObject'], 'Resource': '*'}]}
+    inventory = {'roles': {f'existing{i}': {} for i in range(users)}, 'users': {
+        f'user{i}': {
+            'Groups': [],
+            'AttachedPolicies': [{'PolicyName': f'p{j}', 'PolicyArn': f'arn:aws:iam::aws:policy/p{j}'}
+                                 for j in range(policies_per_user)],
+            'InlinePolicies': {f'inline{j}': document for j in range(policies_per_user)},
+        } for i in range(users)
+    }}
+    trust_policy = {'Version': '2012-10-17', 'Statement': [{
+        'Effect': 'Allow', 'Principal': {'Service': 'ec2.amazonaws.com'}, 'Action': 'sts:AssumeRole'}]}
+    conversions = [{'userName': name, 'trustPolicy': trust_policy} for name in inventory['users']]
+    start = time.perf_counter()
+    plan_conversions(inventory, conversions)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f"Planned 5000 users in {benchmark():.3f}s")
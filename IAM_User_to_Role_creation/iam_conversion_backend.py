@@ -5,17 +5,26 @@ Provides API endpoints for converting IAM users to IAM roles
 """
 
 import json
+import os
+import re
 import boto3
 import logging
 import base64
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
 import time
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from bulk_conversion import BULK_CALLS_PER_SECOND, BULK_WORKERS, LimitedReader, run_bulk
+from cache_invalidation import CacheInvalidator, ChangeFeedPoller
+from conversion_planner import IssuedPlans, execute_plan, plan_conversions
+from iam_inventory import fetch_inventory
+from multi_account import AssumedRoleSessions, collect_inventory, load_accounts
+from role_verification import SOURCE_USER_TAG, source_user_for, verify_batch, verify_conversion
+from session_auth import SessionManager, check_password
+from structured_logging import SAMPLED, configure_logging, start_request
+
 logger = logging.getLogger(__name__)
 
 # Authentication credentials
@@ -23,22 +32,77 @@ VALID_CREDENTIALS = {
     'admin': '123@admin'
 }
 
+# Paths served without a session token
+PUBLIC_PATHS = {'/', '/api/login'}
+
+# Checkpoints of bulk conversion jobs, one file per job id
+BULK_CHECKPOINT_DIR = os.environ.get(
+    'IAM_BULK_CHECKPOINT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bulk_checkpoints')
+)
+JOB_ID_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+# Largest JSON request body read into memory (bulk conversions are streamed instead)
+MAX_JSON_BODY = 16 * 1024 * 1024
+
+# Correlation ids accepted from X-Request-ID; anything else gets a generated id
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+
+# JSON list of {"roleArn", "alias"?, "externalId"?} for the multi-account inventory
+ACCOUNTS_CONFIG = os.environ.get('IAM_ACCOUNTS_CONFIG')
+
 class IAMConversionHandler(BaseHTTPRequestHandler):
+    sessions = SessionManager(VALID_CREDENTIALS)
+    invalidator = CacheInvalidator(sessions)
+    issued_plans = IssuedPlans()
+    account_sessions = None  # assumed-role sessions, shared so credentials are reused
+    account_sessions_lock = threading.Lock()
+
     def __init__(self, *args, **kwargs):
         self.iam_client = None
         self.sts_client = None
         self.account_id = None
+        self.session = None
+        self.request_id = None
         super().__init__(*args, **kwargs)
 
+    def parse_request(self):
+        """Parse the request line and headers, then set the request's correlation id for logging"""
+        if not super().parse_request():
+            return False
+        request_id = self.headers.get('X-Request-ID', '')
+        self.request_id = start_request(request_id if REQUEST_ID_RE.match(request_id) else None)
+        return True
+
     def authenticate_request(self):
-        """Check if request is authenticated (for demo purposes, we'll skip complex auth)"""
-        # In a production environment, you would implement proper session management
-        # For this demo, we'll allow all requests after initial login validation
+        """Return the caller's session from its bearer token, or None"""
+        return self.sessions.authenticate(self.headers.get('Authorization'))
+
+    def require_session(self, path):
+        """Authenticate and rate-limit an API call; sends the error response and returns False if refused"""
+        if path in PUBLIC_PATHS:
+            return True
+        self.session = self.authenticate_request()
+        if self.session is None:
+            self.send_json_response({'error': 'Authentication required'}, 401)
+            return False
+        retry_after = self.session.limiter.acquire()
+        if retry_after:
+            logger.warning("Rate limit exceeded for user: %s", self.session.user)
+            self.send_json_response({'error': 'Rate limit exceeded'}, 429,
+                                    headers={'Retry-After': str(max(1, round(retry_after)))})
+            return False
         return True
 
+    def cached_result(self, key, compute, tags=()):
+        """Serve key from the session's result cache, computing it on a miss.
+
+        tags name the IAM entities the result depends on (see cache_invalidation).
+        """
+        return self.session.cache.get_or_compute(key, compute, tags)
+
     def validate_credentials(self, username, password):
         """Validate login credentials"""
-        return username in VALID_CREDENTIALS and VALID_CREDENTIALS[username] == password
+        return check_password(VALID_CREDENTIALS, username, password)
 
     def do_GET(self):
         """Handle GET requests"""
@@ -46,6 +110,8 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
         path = parsed_path.path
         
         try:
+            if not self.require_session(path):
+                return
             if path == '/':
                 self.serve_html()
             elif path == '/api/status':
@@ -55,10 +121,18 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
             elif path.startswith('/api/users/') and path.endswith('/details'):
                 username = path.split('/')[-2]
                 self.handle_get_user_details(username)
+            elif path == '/api/roles':
+                self.handle_get_roles()
+            elif path == '/api/accounts/inventory':
+                self.handle_accounts_inventory()
+            elif path.startswith('/api/roles/') and path.endswith('/verify'):
+                role_name = path.split('/')[-2]
+                query = parse_qs(parsed_path.query)
+                self.handle_verify_role(role_name, query.get('user', [None])[0])
             else:
                 self.send_error(404, "Not Found")
         except Exception as e:
-            logger.error(f"Error handling GET request: {str(e)}")
+            logger.error("Error handling GET request: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
     def do_POST(self):
@@ -67,20 +141,46 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
         path = parsed_path.path
         
         try:
-            content_length = int(self.headers['Content-Length'])
+            if path == '/api/bulk-convert':
+                # Streamed: the body can be far larger than other requests
+                if self.require_session(path):
+                    self.handle_bulk_convert(parse_qs(parsed_path.query))
+                return
+            
+            # Authenticate before reading anything the client sent
+            if not self.require_session(path):
+                return
+            try:
+                content_length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                content_length = -1
+            if content_length < 0:
+                self.send_json_response({'error': 'Invalid Content-Length'}, 400)
+                return
+            if content_length > MAX_JSON_BODY:
+                self.send_json_response({'error': f'Request body is larger than {MAX_JSON_BODY} bytes'}, 413)
+                return
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
-            
+
             if path == '/api/login':
                 self.handle_login(data)
+            elif path == '/api/logout':
+                self.handle_logout()
             elif path == '/api/create-role':
                 self.handle_create_role(data)
             elif path == '/api/attach-policies':
                 self.handle_attach_policies(data)
+            elif path == '/api/roles/verify':
+                self.handle_verify_roles(data)
+            elif path == '/api/plan':
+                self.handle_plan(data)
+            elif path == '/api/execute-plan':
+                self.handle_execute_plan(data)
             else:
                 self.send_error(404, "Not Found")
         except Exception as e:
-            logger.error(f"Error handling POST request: {str(e)}")
+            logger.error("Error handling POST request: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
     def handle_login(self, data):
@@ -89,24 +189,34 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
             username = data.get('username', '').strip()
             password = data.get('password', '')
             
-            if self.validate_credentials(username, password):
-                logger.info(f"Successful login for user: {username}")
+            login = self.sessions.login(username, password)
+            if login:
+                token, expires_at = login
+                logger.info("Successful login for user: %s", username)
                 self.send_json_response({
                     'success': True,
                     'message': 'Authentication successful',
-                    'user': username
+                    'user': username,
+                    'token': token,
+                    'expires_at': expires_at
                 })
             else:
-                logger.warning(f"Failed login attempt for user: {username}")
+                logger.warning("Failed login attempt for user: %s", username)
                 self.send_json_response({
                     'success': False,
                     'message': 'Invalid credentials'
                 }, 401)
                 
         except Exception as e:
-            logger.error(f"Login error: {str(e)}")
+            logger.error("Login error: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
+    def handle_logout(self):
+        """End the caller's session; its token is rejected from now on"""
+        self.sessions.logout(self.session)
+        logger.info("User logged out: %s", self.session.user)
+        self.send_json_response({'success': True})
+
     def serve_html(self):
         """Serve the main HTML file"""
         try:
@@ -135,7 +245,7 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
                 'user_arn': response.get('Arn', 'Unknown')
             })
         except Exception as e:
-            logger.error(f"AWS connection failed: {str(e)}")
+            logger.error("AWS connection failed: %s", e)
             self.send_json_response({
                 'status': 'disconnected',
                 'error': str(e)
@@ -144,140 +254,337 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
     def handle_get_users(self):
         """Get all IAM users"""
         try:
-            if not self.iam_client:
-                self.iam_client = boto3.client('iam')
+            users = self.cached_result(('users',), self.fetch_users, tags={('user', '*')})
+            self.send_json_response({'users': users})
+            logger.info("Retrieved %s IAM users", len(users))
             
-            users = []
-            paginator = self.iam_client.get_paginator('list_users')
-            
-            for page in paginator.paginate():
-                for user in page['Users']:
-                    # Get basic user info
-                    user_info = {
-                        'UserName': user['UserName'],
-                        'UserId': user['UserId'],
-                        'Arn': user['Arn'],
-                        'CreateDate': user['CreateDate'].isoformat(),
-                        'Path': user['Path']
-                    }
+        except Exception as e:
+            logger.error("Failed to get users: %s", e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def fetch_users(self):
+        """List all IAM users with their attached and inline policy names"""
+        if not self.iam_client:
+            self.iam_client = boto3.client('iam')
+        
+        users = []
+        paginator = self.iam_client.get_paginator('list_users')
+        
+        for page in paginator.paginate():
+            for user in page['Users']:
+                # Get basic user info
+                user_info = {
+                    'UserName': user['UserName'],
+                    'UserId': user['UserId'],
+                    'Arn': user['Arn'],
+                    'CreateDate': user['CreateDate'].isoformat(),
+                    'Path': user['Path']
+                }
+                
+                # Get attached policies count
+                try:
+                    attached_policies = self.iam_client.list_attached_user_policies(
+                        UserName=user['UserName']
+                    )
+                    user_info['AttachedPolicies'] = attached_policies['AttachedPolicies']
+                except Exception as e:
+                    logger.warning("Failed to get attached policies for %s: %s", user['UserName'], e,
+                                   extra=SAMPLED)
+                    user_info['AttachedPolicies'] = []
+                
+                # Get inline policies count
+                try:
+                    inline_policies = self.iam_client.list_user_policies(
+                        UserName=user['UserName']
+                    )
+                    user_info['InlinePolicies'] = inline_policies['PolicyNames']
+                except Exception as e:
+                    logger.warning("Failed to get inline policies for %s: %s", user['UserName'], e,
+                                   extra=SAMPLED)
+                    user_info['InlinePolicies'] = []
+                
+                users.append(user_info)
+        
+        return users
+
+    def handle_get_user_details(self, username):
+        """Get detailed information about a specific user"""
+        try:
+            user_details = self.cached_result(
+                ('user_details', username),
+                lambda: self.fetch_user_details(username),
+                tags=lambda details: {('user', username)} | {
+                    ('policy', policy['PolicyArn']) for policy in details['policies'] if policy.get('PolicyArn')
+                }
+            )
+            self.send_json_response(user_details)
+            logger.info("Retrieved details for user %s", username)
+            
+        except Exception as e:
+            logger.error("Failed to get user details for %s: %s", username, e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def fetch_user_details(self, username):
+        """A user's policies (with documents) and groups"""
+        if not self.iam_client:
+            self.iam_client = boto3.client('iam')
+        
+        user_details = {'policies': []}
+        
+        # Get attached managed policies
+        try:
+            attached_policies = self.iam_client.list_attached_user_policies(
+                UserName=username
+            )
+            
+            for policy in attached_policies['AttachedPolicies']:
+                # Get policy version details
+                try:
+                    policy_details = self.iam_client.get_policy(
+                        PolicyArn=policy['PolicyArn']
+                    )
                     
-                    # Get attached policies count
-                    try:
-                        attached_policies = self.iam_client.list_attached_user_policies(
-                            UserName=user['UserName']
-                        )
-                        user_info['AttachedPolicies'] = attached_policies['AttachedPolicies']
-                    except Exception as e:
-                        logger.warning(f"Failed to get attached policies for {user['UserName']}: {str(e)}")
-                        user_info['AttachedPolicies'] = []
+                    policy_version = self.iam_client.get_policy_version(
+                        PolicyArn=policy['PolicyArn'],
+                        VersionId=policy_details['Policy']['DefaultVersionId']
+                    )
                     
-                    # Get inline policies count
-                    try:
-                        inline_policies = self.iam_client.list_user_policies(
-                            UserName=user['UserName']
-                        )
-                        user_info['InlinePolicies'] = inline_policies['PolicyNames']
-                    except Exception as e:
-                        logger.warning(f"Failed to get inline policies for {user['UserName']}: {str(e)}")
-                        user_info['InlinePolicies'] = []
+                    user_details['policies'].append({
+                        'PolicyName': policy['PolicyName'],
+                        'PolicyArn': policy['PolicyArn'],
+                        'Type': 'Managed',
+                        'Document': policy_version['PolicyVersion']['Document']
+                    })
+                except Exception as e:
+                    logger.warning("Failed to get policy details for %s: %s", policy['PolicyName'], e)
+                    user_details['policies'].append({
+                        'PolicyName': policy['PolicyName'],
+                        'PolicyArn': policy['PolicyArn'],
+                        'Type': 'Managed',
+                        'Document': None,
+                        'Error': str(e)
+                    })
                     
-                    users.append(user_info)
+        except Exception as e:
+            logger.warning("Failed to get attached policies for %s: %s", username, e)
+        
+        # Get inline policies
+        try:
+            inline_policies = self.iam_client.list_user_policies(
+                UserName=username
+            )
             
-            self.send_json_response({'users': users})
-            logger.info(f"Retrieved {len(users)} IAM users")
+            for policy_name in inline_policies['PolicyNames']:
+                try:
+                    policy_document = self.iam_client.get_user_policy(
+                        UserName=username,
+                        PolicyName=policy_name
+                    )
+                    
+                    user_details['policies'].append({
+                        'PolicyName': policy_name,
+                        'Type': 'Inline',
+                        'Document': policy_document['PolicyDocument']
+                    })
+                except Exception as e:
+                    logger.warning("Failed to get inline policy %s: %s", policy_name, e)
+                    user_details['policies'].append({
+                        'PolicyName': policy_name,
+                        'Type': 'Inline',
+                        'Document': None,
+                        'Error': str(e)
+                    })
+                    
+        except Exception as e:
+            logger.warning("Failed to get inline policies for %s: %s", username, e)
+        
+        # Get user groups
+        try:
+            groups = self.iam_client.list_groups_for_user(UserName=username)
+            user_details['groups'] = [group['GroupName'] for group in groups['Groups']]
+        except Exception as e:
+            logger.warning("Failed to get groups for %s: %s", username, e)
+            user_details['groups'] = []
+        
+        return user_details
+
+    def handle_get_roles(self):
+        """List all IAM roles with their attachments, read in bulk"""
+        try:
+            roles = self.cached_result(('roles',), self.fetch_roles, tags={('role', '*')})
+            self.send_json_response({'roles': roles})
+            logger.info("Retrieved %s IAM roles", len(roles))
             
         except Exception as e:
-            logger.error(f"Failed to get users: {str(e)}")
+            logger.error("Failed to get roles: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
-    def handle_get_user_details(self, username):
-        """Get detailed information about a specific user"""
+    def fetch_roles(self):
+        """All roles with attached policies, inline policy names and source user"""
+        if not self.iam_client:
+            self.iam_client = boto3.client('iam')
+        
+        roles = []
+        for role in fetch_inventory(self.iam_client, filters=['Role'])['roles'].values():
+            roles.append({
+                'RoleName': role['Name'],
+                'Arn': role['Arn'],
+                'Path': role['Path'],
+                'AttachedPolicies': role['AttachedPolicies'],
+                'InlinePolicies': sorted(role['InlinePolicies']),
+                'SourceUser': source_user_for(role)
+            })
+        return roles
+
+    def handle_verify_role(self, role_name, user_name=None):
+        """Compare a converted role against its source user's policies"""
         try:
             if not self.iam_client:
                 self.iam_client = boto3.client('iam')
             
-            user_details = {'policies': []}
+            result = verify_conversion(self.iam_client, role_name, user_name)
+            status_code = 404 if result['status'] == 'role_not_found' else 200
+            self.send_json_response(result, status_code)
+            logger.info("Verified role %s: %s", role_name, result['status'])
             
-            # Get attached managed policies
-            try:
-                attached_policies = self.iam_client.list_attached_user_policies(
-                    UserName=username
-                )
-                
-                for policy in attached_policies['AttachedPolicies']:
-                    # Get policy version details
-                    try:
-                        policy_details = self.iam_client.get_policy(
-                            PolicyArn=policy['PolicyArn']
-                        )
-                        
-                        policy_version = self.iam_client.get_policy_version(
-                            PolicyArn=policy['PolicyArn'],
-                            VersionId=policy_details['Policy']['DefaultVersionId']
-                        )
-                        
-                        user_details['policies'].append({
-                            'PolicyName': policy['PolicyName'],
-                            'PolicyArn': policy['PolicyArn'],
-                            'Type': 'Managed',
-                            'Document': policy_version['PolicyVersion']['Document']
-                        })
-                    except Exception as e:
-                        logger.warning(f"Failed to get policy details for {policy['PolicyName']}: {str(e)}")
-                        user_details['policies'].append({
-                            'PolicyName': policy['PolicyName'],
-                            'PolicyArn': policy['PolicyArn'],
-                            'Type': 'Managed',
-                            'Document': None,
-                            'Error': str(e)
-                        })
-                        
-            except Exception as e:
-                logger.warning(f"Failed to get attached policies for {username}: {str(e)}")
+        except Exception as e:
+            logger.error("Failed to verify role %s: %s", role_name, e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def handle_verify_roles(self, data):
+        """Verify many conversions in parallel: {"conversions": [{"roleName", "userName"?}]} or {"roles": [...]}"""
+        try:
+            if not self.iam_client:
+                self.iam_client = boto3.client('iam')
             
-            # Get inline policies
-            try:
-                inline_policies = self.iam_client.list_user_policies(
-                    UserName=username
-                )
-                
-                for policy_name in inline_policies['PolicyNames']:
-                    try:
-                        policy_document = self.iam_client.get_user_policy(
-                            UserName=username,
-                            PolicyName=policy_name
-                        )
-                        
-                        user_details['policies'].append({
-                            'PolicyName': policy_name,
-                            'Type': 'Inline',
-                            'Document': policy_document['PolicyDocument']
-                        })
-                    except Exception as e:
-                        logger.warning(f"Failed to get inline policy {policy_name}: {str(e)}")
-                        user_details['policies'].append({
-                            'PolicyName': policy_name,
-                            'Type': 'Inline',
-                            'Document': None,
-                            'Error': str(e)
-                        })
-                        
-            except Exception as e:
-                logger.warning(f"Failed to get inline policies for {username}: {str(e)}")
+            conversions = data.get('conversions') or [{'roleName': name} for name in data.get('roles', [])]
+            report = verify_batch(self.iam_client, conversions)
+            self.send_json_response(report)
+            logger.info("Verified %s roles: %s", len(conversions), report['summary'])
             
-            # Get user groups
-            try:
-                groups = self.iam_client.get_groups_for_user(UserName=username)
-                user_details['groups'] = [group['GroupName'] for group in groups['Groups']]
-            except Exception as e:
-                logger.warning(f"Failed to get groups for {username}: {str(e)}")
-                user_details['groups'] = []
+        except Exception as e:
+            logger.error("Failed to verify roles: %s", e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def get_inventory(self):
+        """The account's users and roles, read in bulk and cached until any of them changes"""
+        if not self.iam_client:
+            self.iam_client = boto3.client('iam')
+        return self.cached_result(('inventory',), lambda: fetch_inventory(self.iam_client),
+                                  tags={('user', '*'), ('role', '*')})
+
+    def handle_accounts_inventory(self):
+        """Users, roles and customer managed policies of every configured account, tagged by account"""
+        try:
+            if not ACCOUNTS_CONFIG:
+                self.send_json_response({'error': 'IAM_ACCOUNTS_CONFIG is not set'}, 404)
+                return
             
-            self.send_json_response(user_details)
-            logger.info(f"Retrieved details for user {username}")
+            cls = type(self)
+            with cls.account_sessions_lock:
+                if cls.account_sessions is None:
+                    cls.account_sessions = AssumedRoleSessions()
+            
+            index = self.cached_result(
+                ('accounts_inventory',),
+                lambda: collect_inventory(load_accounts(ACCOUNTS_CONFIG), cls.account_sessions),
+                tags={('user', '*'), ('role', '*'), ('policy', '*')}
+            )
+            self.send_json_response(index)
+            logger.info("Retrieved inventory of %s accounts", len(index['accounts']))
+            
+        except Exception as e:
+            logger.error("Failed to get multi-account inventory: %s", e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def handle_plan(self, data):
+        """Plan conversions without writing: {"conversions": [{"userName", "roleName"?, "roleDescription"?,
+        "trustPolicy"}]} or {"users": [...], "trustPolicy": {...}}, plus optional "quotas" overrides"""
+        try:
+            conversions = data.get('conversions') or [
+                {'userName': name, 'trustPolicy': data.get('trustPolicy')} for name in data.get('users', [])
+            ]
+            report = plan_conversions(self.get_inventory(), conversions, data.get('quotas'))
+            self.issued_plans.issue(report['plans'])
+            self.send_json_response(report)
+            logger.info("Planned %s conversions: %s", len(conversions), report['summary'])
             
         except Exception as e:
-            logger.error(f"Failed to get user details for {username}: {str(e)}")
+            logger.error("Failed to plan conversions: %s", e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def handle_execute_plan(self, data):
+        """Apply plans issued by /api/plan: {"plan": {...}} or {"plans": [...]}, or just their planIds.
+
+        Only the planId of each submitted plan is used; the steps run are the
+        ones the server planned, and each issued plan can be applied once.
+        """
+        try:
+            if not self.iam_client:
+                self.iam_client = boto3.client('iam')
+            
+            submitted = data.get('plans') or [data['plan']]
+            plan_ids = [plan.get('planId') if isinstance(plan, dict) else plan for plan in submitted]
+            plans = [self.issued_plans.claim(plan_id) for plan_id in plan_ids]
+            unknown = [str(plan_id) for plan_id, plan in zip(plan_ids, plans) if plan is None]
+            if unknown:
+                self.issued_plans.issue([plan for plan in plans if plan is not None])
+                self.send_json_response({'error': f"Unknown or expired plans (plan again): {', '.join(unknown)}"}, 400)
+                return
+            
+            results = []
+            for plan in plans:
+                result = execute_plan(self.iam_client, plan)
+                self.invalidator.invalidate(roles=[plan['roleName']])
+                results.append(result)
+                if result['success']:
+                    logger.info("Executed plan %s: %s -> %s", plan['planId'][:12], plan['userName'], plan['roleName'])
+                else:
+                    logger.error("Plan for %s failed at %s: %s", plan['userName'],
+                                 result['failed']['action'], result['failed']['error'])
+            
+            self.send_json_response({
+                'success': all(result['success'] for result in results),
+                'results': results
+            })
+            
+        except Exception as e:
+            logger.error("Failed to execute plan: %s", e)
+            self.send_json_response({'error': str(e)}, 500)
+
+    def handle_bulk_convert(self, query):
+        """Apply a JSON array or NDJSON body of exported configs, parsed as it arrives.
+
+        ?job=<id> checkpoints progress so re-posting the same body resumes;
+        ?dry_run=1 only validates; ?workers= and ?rate= (IAM calls/second) tune the executor.
+        """
+        try:
+            if not self.iam_client:
+                self.iam_client = boto3.client('iam')
+            
+            job = query.get('job', [None])[0]
+            checkpoint = None
+            if job:
+                if not JOB_ID_RE.match(job):
+                    self.send_json_response({'error': 'Invalid job id'}, 400)
+                    return
+                os.makedirs(BULK_CHECKPOINT_DIR, exist_ok=True)
+                checkpoint = os.path.join(BULK_CHECKPOINT_DIR, f"{job}.jsonl")
+            
+            body = LimitedReader(self.rfile, int(self.headers['Content-Length']))
+            summary = run_bulk(
+                self.iam_client, body, checkpoint,
+                workers=int(query.get('workers', [BULK_WORKERS])[0]),
+                calls_per_second=float(query.get('rate', [BULK_CALLS_PER_SECOND])[0]),
+                dry_run=query.get('dry_run', ['0'])[0] in ('1', 'true'),
+                on_applied=lambda plan: self.invalidator.invalidate(roles=[plan['roleName']])
+            )
+            self.send_json_response(dict(summary, job=job))
+            logger.info("Bulk conversion %s: %s applied, %s failed, %s invalid",
+                        job or '', summary['applied'], summary['failed'], summary['invalid'])
+            
+        except Exception as e:
+            logger.error("Bulk conversion failed: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
     def handle_create_role(self, data):
@@ -299,10 +606,14 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
             
             if description:
                 create_role_params['Description'] = description
+            if data.get('userName'):
+                # Lets verification find the source user
+                create_role_params['Tags'] = [{'Key': SOURCE_USER_TAG, 'Value': data['userName']}]
             
             response = self.iam_client.create_role(**create_role_params)
+            self.invalidator.invalidate(roles=[role_name])
             
-            logger.info(f"Created IAM role: {role_name}")
+            logger.info("Created IAM role: %s", role_name)
             self.send_json_response({
                 'success': True,
                 'role_arn': response['Role']['Arn'],
@@ -314,7 +625,7 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
             logger.error(error_msg)
             self.send_json_response({'error': error_msg}, 409)
         except Exception as e:
-            logger.error(f"Failed to create role: {str(e)}")
+            logger.error("Failed to create role: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
     def handle_attach_policies(self, data):
@@ -362,13 +673,15 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
                             })
                             
                 except Exception as e:
-                    logger.warning(f"Failed to attach policy {policy['PolicyName']}: {str(e)}")
+                    logger.warning("Failed to attach policy %s: %s", policy['PolicyName'], e)
                     failed_policies.append({
                         'name': policy['PolicyName'],
                         'error': str(e)
                     })
             
-            logger.info(f"Attached {len(attached_policies)} policies to role {role_name}")
+            if attached_policies:
+                self.invalidator.invalidate(roles=[role_name])
+            logger.info("Attached %s policies to role %s", len(attached_policies), role_name)
             
             self.send_json_response({
                 'success': True,
@@ -378,16 +691,21 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
             })
             
         except Exception as e:
-            logger.error(f"Failed to attach policies: {str(e)}")
+            logger.error("Failed to attach policies: %s", e)
             self.send_json_response({'error': str(e)}, 500)
 
-    def send_json_response(self, data, status_code=200):
+    def send_json_response(self, data, status_code=200, headers=None):
         """Send JSON response"""
         self.send_response(status_code)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Request-ID')
+        self.send_header('Access-Control-Expose-Headers', 'X-Request-ID')
+        if self.request_id:
+            self.send_header('X-Request-ID', self.request_id)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         
         response_json = json.dumps(data, indent=2, default=str)
@@ -398,20 +716,22 @@ class IAMConversionHandler(BaseHTTPRequestHandler):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Request-ID')
         self.end_headers()
 
     def log_message(self, format, *args):
-        """Override to use our logger"""
-        logger.info(f"{self.address_string()} - {format % args}")
+        """Override to use our logger; the line is only formatted if INFO is enabled"""
+        logger.info("%s - " + format, self.address_string(), *args)
 
-def start_server(port=8081):
-    """Start the HTTP server"""
+def start_server(port=8081, change_feed=None):
+    """Start the HTTP server, optionally watching a CloudTrail-style IAM change feed file"""
     server_address = ('', port)
-    httpd = HTTPServer(server_address, IAMConversionHandler)
+    httpd = ThreadingHTTPServer(server_address, IAMConversionHandler)
+    if change_feed:
+        ChangeFeedPoller(change_feed, IAMConversionHandler.invalidator).start()
     
-    logger.info(f"Starting IAM Conversion Server on port {port}")
-    logger.info(f"Open your browser to: http://localhost:{port}")
+    logger.info("Starting IAM Conversion Server on port %s", port)
+    logger.info("Open your browser to: http://localhost:%s", port)
     logger.info("Press Ctrl+C to stop the server")
     
     try:
@@ -421,16 +741,20 @@ def start_server(port=8081):
         httpd.server_close()
 
 if __name__ == '__main__':
+    # Queued logging: request threads never wait on the log stream
+    configure_logging(os.environ.get('IAM_LOG_LEVEL', 'INFO'),
+                      json_format=os.environ.get('IAM_LOG_FORMAT', 'json') == 'json')
+
     # Check AWS credentials
     try:
         sts = boto3.client('sts')
         identity = sts.get_caller_identity()
-        logger.info(f"AWS credentials configured for account: {identity['Account']}")
-        logger.info(f"User/Role ARN: {identity['Arn']}")
+        logger.info("AWS credentials configured for account: %s", identity['Account'])
+        logger.info("User/Role ARN: %s", identity['Arn'])
     except Exception as e:
-        logger.error(f"AWS credentials not configured properly: {str(e)}")
+        logger.error("AWS credentials not configured properly: %s", e)
         logger.error("Please run 'aws configure' or set environment variables")
         exit(1)
     
     # Start server
-    start_server()
+    start_server(change_feed=os.environ.get('IAM_CHANGE_FEED'))
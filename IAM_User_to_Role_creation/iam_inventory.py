@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+IAM inventory fetchers for the IAM Conversion Backend
+Users and roles are returned in one shape whichever API they came from:
+
+    {'Name', 'Arn', 'Path', 'Tags': {key: value},
+     'AttachedPolicies': [{'PolicyName', 'PolicyArn'}],
+     'InlinePolicies': {policy name: policy document}}
+
+plus 'Groups' for users and 'Description' / 'AssumeRolePolicyDocument' for
+roles. fetch_inventory reads a whole account with the bulk
+GetAccountAuthorizationDetails API (optionally including customer managed
+policies with their default document); fetch_user / fetch_role read one entity.
+"""
+
+import json
+import logging
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+
+def decode_document(document):
+    """Policy documents arrive as dicts from boto3, but may be URL-encoded JSON strings"""
+    if isinstance(document, str):
+        return json.loads(unquote(document))
+    return document
+
+
+def _tags(tags):
+    return {tag['Key']: tag['Value'] for tag in tags or []}
+
+
+def _paginate(iam, operation, key, **kwargs):
+    items = []
+    for page in iam.get_paginator(operation).paginate(**kwargs):
+        items.extend(page[key])
+    return items
+
+
+def fetch_inventory(iam, filters=('User', 'Role')):
+    """All users and/or roles of the account, as {'users': {name: user}, 'roles': {name: role}}.
+
+    With 'LocalManagedPolicy' in filters, inventory['policies'] maps customer
+    managed policy ARNs to {'Name', 'Arn', 'AttachmentCount', 'Document'}.
+    """
+    inventory = {'users': {}, 'roles': {}, 'policies': {}}
+    paginator = iam.get_paginator('get_account_authorization_details')
+    for page in paginator.paginate(Filter=list(filters)):
+        for user in page.get('UserDetailList', []):
+            inventory['users'][user['UserName']] = {
+                'Name': user['UserName'],
+                'Arn': user['Arn'],
+                'Path': user.get('Path', '/'),
+                'Tags': _tags(user.get('Tags')),
+                'Groups': user.get('GroupList', []),
+                'AttachedPolicies': user.get('AttachedManagedPolicies', []),
+                'InlinePolicies': {p['PolicyName']: decode_document(p['PolicyDocument'])
+                                   for p in user.get('UserPolicyList', [])},
+            }
+        for role in page.get('RoleDetailList', []):
+            inventory['roles'][role['RoleName']] = {
+                'Name': role['RoleName'],
+                'Arn': role['Arn'],
+                'Path': role.get('Path', '/'),
+                'Tags': _tags(role.get('Tags')),
+                'Description': role.get('Description', ''),
+                'AssumeRolePolicyDocument': decode_document(role.get('AssumeRolePolicyDocument')),
+                'AttachedPolicies': role.get('AttachedManagedPolicies', []),
+                'InlinePolicies': {p['PolicyName']: decode_document(p['PolicyDocument'])
+                                   for p in role.get('RolePolicyList', [])},
+            }
+        for policy in page.get('Policies', []):
+            default = next((v for v in policy.get('PolicyVersionList', []) if v.get('IsDefaultVersion')), None)
+            inventory['policies'][policy['Arn']] = {
+                'Name': policy.get('PolicyName') or policy['Arn'].rsplit('/', 1)[-1],
+                'Arn': policy['Arn'],
+                'AttachmentCount': policy.get('AttachmentCount', 0),
+                'Document': decode_document(default['Document']) if default else None,
+            }
+    logger.info("Fetched inventory: %s users, %s roles", len(inventory['users']), len(inventory['roles']))
+    return inventory
+
+
+def fetch_user(iam, user_name):
+    """One user in inventory shape, or None if it does not exist"""
+    try:
+        user = iam.get_user(UserName=user_name)['User']
+    except iam.exceptions.NoSuchEntityException:
+        return None
+    inline = {}
+    for policy_name in _paginate(iam, 'list_user_policies', 'PolicyNames', UserName=user_name):
+        document = iam.get_user_policy(UserName=user_name, PolicyName=policy_name)['PolicyDocument']
+        inline[policy_name] = decode_document(document)
+    return {
+        'Name': user['UserName'],
+        'Arn': user['Arn'],
+        'Path': user.get('Path', '/'),
+        'Tags': _tags(user.get('Tags')),
+        'Groups': [g['GroupName'] for g in _paginate(iam, 'list_groups_for_user', 'Groups', UserName=user_name)],
+        'AttachedPolicies': _paginate(iam, 'list_attached_user_policies', 'AttachedPolicies', UserName=user_name),
+        'InlinePolicies': inline,
+    }
+
+
+def fetch_role(iam, role_name):
+    """One role in inventory shape, or None if it does not exist"""
+    try:
+        role = iam.get_role(RoleName=role_name)['Role']
+    except iam.exceptions.NoSuchEntityException:
+        return None
+    inline = {}
+    for policy_name in _paginate(iam, 'list_role_policies', 'PolicyNames', RoleName=role_name):
+        document = iam.get_role_policy(RoleName=role_name, PolicyName=policy_name)['PolicyDocument']
+        inline[policy_name] = decode_document(document)
+    return {
+        'Name': role['RoleName'],
+        'Arn': role['Arn'],
+        'Path': role.get('Path', '/'),
+        'Tags': _tags(role.get('Tags')),
+        'Description': role.get('Description', ''),
+        'AssumeRolePolicyDocument': decode_document(role.get('AssumeRolePolicyDocument')),
+        'AttachedPolicies': _paginate(iam, 'list_attached_role_policies', 'AttachedPolicies', RoleName=role_name),
+        'InlinePolicies': inline,
+    }
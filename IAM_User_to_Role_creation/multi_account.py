@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Multi-account IAM inventory for the IAM Conversion Backend
+Assumes a role in each configured account and reads the accounts' users,
+roles and customer managed policies in parallel into one index whose entries
+are tagged with their account.
+
+Accounts are listed in a JSON file (IAM_ACCOUNTS_CONFIG):
+
+    [{"roleArn": "arn:aws:iam::111111111111:role/IamMigrationRead", "alias": "prod",
+      "externalId": "optional", "region": "optional STS region"}]
+
+Credentials are assumed once per role and refreshed by botocore shortly
+before they expire, so long-running servers never use expired keys.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from iam_inventory import fetch_inventory
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_WORKERS = 8
+SESSION_NAME = 'iam-user-to-role-inventory'
+SESSION_DURATION = 3600  # seconds; botocore refreshes within 15 minutes of expiry
+
+
+def normalize_account(account):
+    """An account entry with its id (from the role ARN) and alias filled in"""
+    account = dict(account)
+    account.setdefault('accountId', account['roleArn'].split(':')[4])
+    account.setdefault('alias', account['accountId'])
+    return account
+
+
+def load_accounts(path):
+    """Account entries from a JSON config file"""
+    with open(path, 'r') as f:
+        return [normalize_account(account) for account in json.load(f)]
+
+
+class AssumedRoleSessions:
+    """boto3 sessions with auto-refreshing assumed-role credentials, one per role ARN"""
+
+    def __init__(self, base_session=None):
+        import boto3
+
+        self.base_session = base_session or boto3.Session()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.assume_calls = 0
+
+    def _refresher(self, account):
+        sts = self.base_session.client('sts', region_name=account.get('region'))
+        params = {'RoleArn': account['roleArn'], 'RoleSessionName': SESSION_NAME,
+                  'DurationSeconds': SESSION_DURATION}
+        if account.get('externalId'):
+            params['ExternalId'] = account['externalId']
+
+        def refresh():
+            credentials = sts.assume_role(**params)['Credentials']
+            self.assume_calls += 1
+            return {
+                'access_key': credentials['AccessKeyId'],
+                'secret_key': credentials['SecretAccessKey'],
+                'token': credentials['SessionToken'],
+                'expiry_time': credentials['Expiration'].isoformat(),
+            }
+
+        return refresh
+
+    def session(self, account):
+        """A boto3 session acting as the account's role, created on first use"""
+        import boto3
+        from botocore.credentials import RefreshableCredentials
+        from botocore.session import get_session
+
+        with self._lock:
+            session = self._sessions.get(account['roleArn'])
+            if session is None:
+                refresh = self._refresher(account)
+                botocore_session = get_session()
+                botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+                    metadata=refresh(), refresh_using=refresh, method='sts-assume-role'
+                )
+                session = boto3.Session(botocore_session=botocore_session)
+                self._sessions[account['roleArn']] = session
+            return session
+
+    def client(self, account, service):
+        return self.session(account).client(service, region_name=account.get('region'))
+
+
+def _tag(entities, account, prefix=True):
+    """Entities tagged with their account, keyed '<account id>:<name>' (or by ARN with prefix=False)"""
+    return {f"{account['accountId']}:{key}" if prefix else key:
+            dict(entity, Account=account['accountId'], AccountAlias=account['alias'])
+            for key, entity in entities.items()}
+
+
+def collect_inventory(accounts, sessions=None, workers=ACCOUNT_WORKERS):
+    """Read every account's users, roles and customer managed policies in parallel.
+
+    Returns {'accounts': {id: status}, 'users': {'<id>:<name>': user},
+    'roles': {'<id>:<name>': role}, 'policies': {arn: policy}}; an account
+    that fails is reported in 'accounts' and does not stop the others.
+    """
+    sessions = sessions or AssumedRoleSessions()
+    accounts = [normalize_account(account) for account in accounts]
+
+    def read(account):
+        start = time.perf_counter()
+        try:
+            iam = sessions.client(account, 'iam')
+            inventory = fetch_inventory(iam, filters=('User', 'Role', 'LocalManagedPolicy'))
+        except Exception as e:
+            logger.error("Inventory of account %s failed: %s", account['alias'], e)
+            return account, None, {'status': 'error', 'error': str(e)}
+        return account, inventory, {
+            'status': 'ok', 'alias': account['alias'], 'seconds': round(time.perf_counter() - start, 3),
+            'users': len(inventory['users']), 'roles': len(inventory['roles']),
+            'policies': len(inventory['policies']),
+        }
+
+    index = {'accounts': {}, 'users': {}, 'roles': {}, 'policies': {}}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for account, inventory, status in executor.map(read, accounts):
+            index['accounts'][account['accountId']] = status
+            if inventory is not None:
+                index['users'].update(_tag(inventory['users'], account))
+                index['roles'].update(_tag(inventory['roles'], account))
+                index['policies'].update(_tag(inventory['policies'], account, prefix=False))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Collect IAM users, roles and policies across accounts')
+    parser.add_argument('accounts', help='JSON file listing account role ARNs')
+    parser.add_argument('--output', help='Write the combined index to this JSON file')
+    parser.add_argument('--workers', type=int, default=ACCOUNT_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start = time.perf_counter()
+    index = collect_inventory(load_accounts(args.accounts), workers=args.workers)
+    for account_id, status in sorted(index['accounts'].items()):
+        if status['status'] == 'ok':
+            print(f"✅ {account_id} ({status['alias']}): {status['users']} users, {status['roles']} roles, "
+                  f"{status['policies']} policies in {status['seconds']:.1f}s")
+        else:
+            print(f"❌ {account_id}: {status['error']}")
+    print(f"📊 {len(index['users'])} users across {len(index['accounts'])} accounts "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(index, f, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
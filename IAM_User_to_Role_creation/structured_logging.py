@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Non-blocking structured logging for the IAM Conversion Backend
+Request threads only put records on a queue; a QueueListener thread formats
+them as one JSON object per line and writes them out. Messages use logging's
+lazy %-style arguments, so nothing is formatted for disabled levels and the
+formatting that is done happens on the listener thread.
+
+Each record carries the correlation id of the request that logged it.
+Records logged with extra=SAMPLED (the per-user warnings of a user listing,
+for example) are sampled by message template: the first few per window are
+logged, the rest are counted and reported on the next one that gets through.
+Everything else is always logged.
+
+    {"time": "2025-07-24T10:00:00.123Z", "level": "WARNING", "logger": "__main__",
+     "message": "Failed to get inline policies for alice: ...", "correlation_id": "3f9c...",
+     "suppressed": 12}
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+
+SAMPLE_WINDOW = 60    # seconds
+SAMPLE_LIMIT = 5      # records per message template per window
+SAMPLED = {'sampled': True}  # extra= for records that may be sampled
+
+correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def start_request(request_id=None):
+    """Set the correlation id for the current request (generated if not given) and return it"""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    correlation_id.set(request_id)
+    return request_id
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the current correlation id in the thread that logged them"""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through SAMPLE_LIMIT records per message template and window among those logged with extra=SAMPLED.
+
+    The template is the unformatted message ("Failed to get policies for %s"),
+    so warnings about different users count as repeats of one another.
+    """
+
+    def __init__(self, limit=SAMPLE_LIMIT, window=SAMPLE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._counts = {}  # (logger, template) -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False):
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                entry = self._counts[key] = [now, 0, 0]
+            else:
+                suppressed = entry[2]
+            if entry[1] >= self.limit:
+                entry[2] += 1
+                return False
+            entry[1] += 1
+            entry[2] = 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the message in the logging thread so records
+    can be pickled; this queue never leaves the process, so records are
+    passed through as they are.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level='INFO', stream=None, json_format=True):
+    """Route the root logger through a queue to a background writer; returns the listener"""
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    queue_handler.addFilter(SamplingFilter())
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - [%(correlation_id)s] %(message)s'))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging, listener)
+    return listener
+
+
+def stop_logging(listener):
+    """Write out queued records and stop the listener thread (safe to call twice)"""
+    if listener._thread is not None:
+        listener.stop()
+
+
+class _SlowStream:
+    """A log destination whose writes block, like a full pipe or a congested disk"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def write(self, text):
+        time.sleep(self.latency)
+
+    def flush(self):
+        pass
+
+
+def benchmark(records=2000, write_latency=0.0005):
+    """Microseconds a request thread spends per logger.info call, queued vs written directly"""
+    results = {}
+    logger = logging.getLogger('benchmark')
+    root = logging.getLogger()
+    for name in ('direct', 'queued'):
+        saved = root.handlers[:], root.level
+        stream = _SlowStream(write_latency)
+        if name == 'queued':
+            listener = configure_logging(stream=stream)
+        else:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            root.handlers = [handler]
+            root.setLevel(logging.INFO)
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info("Retrieved details for user %s", f"user{i}")
+        results[name] = (time.perf_counter() - start) / records * 1e6
+        if name == 'queued':
+            stop_logging(listener)
+        root.handlers, root.level = saved
+    return results
+
+
+if __name__ == '__main__':
+    print("Logging 2000 records to a destination that blocks 0.5 ms per write")
+    for name, micros in benchmark().items():
+        print(f"{name:>7}: {micros:.2f} µs per call")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Bulk conversion against moto's local AWS stand-in: bad records, bad lines and resuming
+"""
+
+import io
+import json
+
+import pytest
+
+moto = pytest.importorskip('moto')
+
+import boto3
+
+from bulk_conversion import iter_json_records, run_bulk
+
+POLICY = {'Version': '2012-10-17', 'Statement': [{'Effect': 'Allow', 'Action': 's3:*', 'Resource': '*'}]}
+TRUST_POLICY = {'Version': '2012-10-17', 'Statement': [{
+    'Effect': 'Allow', 'Principal': {'Service': 'ec2.amazonaws.com'}, 'Action': 'sts:AssumeRole'}]}
+
+
+@pytest.fixture
+def iam(monkeypatch):
+    for name, value in [('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')]:
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client('iam')
+        arn = client.create_policy(PolicyName='shared', PolicyDocument=json.dumps(POLICY))['Policy']['Arn']
+        client.policy_arn = arn
+        yield client
+
+
+def conversion(iam, user):
+    return {'userName': user, 'trustPolicy': TRUST_POLICY, 'policies': [
+        {'Type': 'Managed', 'PolicyName': 'shared', 'PolicyArn': iam.policy_arn},
+        {'Type': 'Inline', 'PolicyName': 'inline', 'Document': POLICY},
+    ]}
+
+
+def ndjson(records):
+    return io.StringIO('\n'.join(json.dumps(record) for record in records))
+
+
+def test_malformed_records_are_invalid_and_the_rest_apply(iam):
+    no_arn = conversion(iam, 'bob')
+    no_arn['policies'].append({'Type': 'Managed', 'PolicyName': 'missing'})
+    records = [conversion(iam, 'alice'), no_arn, {'conversion': 5}, conversion(iam, 'carol')]
+    summary = run_bulk(iam, ndjson(records), calls_per_second=1000)
+    assert (summary['applied'], summary['invalid']) == (2, 2)
+
+
+def test_bad_line_fails_before_reading_the_rest():
+    class CountingReader(io.StringIO):
+        reads = 0
+
+        def read(self, size=-1):
+            CountingReader.reads += 1
+            return super().read(size)
+
+    body = '{"userName": "a"}\n{"userName": oops}\n' + '{"userName": "b"}\n' * 10000
+    with pytest.raises(ValueError):
+        list(iter_json_records(CountingReader(body), read_size=4096))
+    assert CountingReader.reads == 1
+
+
+def test_interrupted_conversion_resumes_on_its_tagged_role(iam, tmp_path):
+    checkpoint = tmp_path / 'job.jsonl'
+    checkpoint.write_text(json.dumps({'index': 0, 'userName': 'erin', 'roleName': 'erin-Role', 'planId': 'x',
+                                      'status': 'started', 'completed': 0, 'error': None}) + '\n')
+    iam.create_role(RoleName='erin-Role', AssumeRolePolicyDocument=json.dumps(TRUST_POLICY),
+                    Tags=[{'Key': 'ConvertedFromUser', 'Value': 'erin'}])
+
+    summary = run_bulk(iam, ndjson([conversion(iam, 'erin')]), str(checkpoint), calls_per_second=1000)
+    assert summary['applied'] == 1
+    assert iam.list_role_policies(RoleName='erin-Role')['PolicyNames'] == ['inline']
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Change feed: malformed lines and records are skipped without losing the valid ones after them
+"""
+
+import json
+
+from cache_invalidation import ChangeFeedPoller
+
+
+class RecordingInvalidator:
+    def __init__(self):
+        self.records = []
+
+    def apply_record(self, record):
+        self.records.append(record)
+
+
+def test_malformed_records_do_not_drop_the_rest_of_the_read(tmp_path):
+    feed = tmp_path / 'feed.jsonl'
+    feed.write_text('')
+    invalidator = RecordingInvalidator()
+    poller = ChangeFeedPoller(str(feed), invalidator)
+
+    delete_role = {'eventSource': 'iam.amazonaws.com', 'eventName': 'DeleteRole', 'eventID': '1',
+                   'requestParameters': {'roleName': 'alice-Role'}}
+    lines = ['{"Records": ["x"]}', '42', '{"Records": 5}', 'not json',
+             json.dumps({'eventSource': 'iam.amazonaws.com', 'eventName': 'DeleteUser',
+                         'requestParameters': ['alice']}),
+             json.dumps(delete_role)]
+    with open(feed, 'a') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    assert poller.poll() == 2
+    assert invalidator.records[-1] == delete_role
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Plans can only be applied as the server issued them
+"""
+
+import pytest
+
+from conversion_planner import IssuedPlans, execute_plan, plan_conversions
+
+TRUST_POLICY = {'Version': '2012-10-17', 'Statement': [{
+    'Effect': 'Allow', 'Principal': {'Service': 'ec2.amazonaws.com'}, 'Action': 'sts:AssumeRole'}]}
+INVENTORY = {'roles': {}, 'users': {'alice': {
+    'Groups': [],
+    'AttachedPolicies': [{'PolicyName': 'ReadOnly', 'PolicyArn': 'arn:aws:iam::aws:policy/ReadOnlyAccess'}],
+    'InlinePolicies': {},
+}}}
+
+
+class RecordingIAM:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, action):
+        def call(**params):
+            self.calls.append(action)
+            return {'Role': {'Arn': f"arn:aws:iam::123456789012:role/{params['RoleName']}"}}
+        return call
+
+
+def alice_plan():
+    return plan_conversions(INVENTORY, [{'userName': 'alice', 'trustPolicy': TRUST_POLICY}])['plans'][0]
+
+
+def test_issued_plan_is_claimed_once():
+    issued = IssuedPlans()
+    plan = alice_plan()
+    issued.issue([plan])
+    assert issued.claim('forged') is None
+    assert issued.claim(plan['planId']) is plan
+    assert issued.claim(plan['planId']) is None
+
+
+def test_disallowed_action_is_rejected():
+    plan = dict(alice_plan(), steps=[{'action': 'create_access_key', 'params': {'UserName': 'alice'}}])
+    iam = RecordingIAM()
+    with pytest.raises(ValueError):
+        execute_plan(iam, plan)
+    assert iam.calls == []
+
+
+def test_step_on_another_role_is_rejected():
+    plan = alice_plan()
+    plan['steps'].append({'action': 'attach_role_policy',
+                          'params': {'RoleName': 'Admin', 'PolicyArn': 'arn:aws:iam::aws:policy/AdministratorAccess'}})
+    iam = RecordingIAM()
+    with pytest.raises(ValueError):
+        execute_plan(iam, plan)
+    assert iam.calls == []
+
+
+def test_issued_plan_runs():
+    iam = RecordingIAM()
+    result = execute_plan(iam, alice_plan())
+    assert result['success'] and iam.calls == ['create_role', 'attach_role_policy']
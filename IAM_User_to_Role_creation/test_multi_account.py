@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Multi-account inventory against moto's local AWS stand-in
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+moto = pytest.importorskip('moto')
+
+import multi_account
+
+ACCOUNTS = ['111111111111', '222222222222']
+POLICY = {'Version': '2012-10-17', 'Statement': [{'Effect': 'Allow', 'Action': 's3:*', 'Resource': '*'}]}
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    for name, value in [('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')]:
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        accounts = []
+        for i, account_id in enumerate(ACCOUNTS):
+            account = {'roleArn': f"arn:aws:iam::{account_id}:role/IamMigrationRead", 'alias': f"account{i}"}
+            # moto routes calls made with assumed-role credentials to the role's account
+            iam = multi_account.AssumedRoleSessions().client(account, 'iam')
+            for user in range(i + 1):
+                iam.create_user(UserName=f"user{user}")
+            iam.create_policy(PolicyName='shared', PolicyDocument=json.dumps(POLICY))
+            accounts.append(account)
+        yield accounts
+
+
+def test_index_is_tagged_by_account(aws):
+    index = multi_account.collect_inventory(aws)
+
+    assert {account_id: status['users'] for account_id, status in index['accounts'].items()} == {
+        '111111111111': 1, '222222222222': 2}
+    assert sorted(index['users']) == ['111111111111:user0', '222222222222:user0', '222222222222:user1']
+    assert index['users']['222222222222:user1']['AccountAlias'] == 'account1'
+    assert 'arn:aws:iam::111111111111:policy/shared' in index['policies']
+
+
+def test_credentials_are_cached_and_refreshed(aws):
+    sessions = multi_account.AssumedRoleSessions()
+    multi_account.collect_inventory(aws, sessions)
+    multi_account.collect_inventory(aws, sessions)
+    assert sessions.assume_calls == len(aws)
+
+    credentials = sessions.session(multi_account.normalize_account(aws[0])).get_credentials()
+    credentials._expiry_time = datetime.now(timezone.utc) + timedelta(seconds=30)
+    multi_account.collect_inventory(aws, sessions)
+    assert sessions.assume_calls == len(aws) + 1
+
+
+class DeniedSessions(multi_account.AssumedRoleSessions):
+    def client(self, account, service):
+        if account['accountId'] == '333333333333':
+            raise RuntimeError('AccessDenied')
+        return super().client(account, service)
+
+
+def test_failing_account_does_not_stop_others(aws):
+    index = multi_account.collect_inventory(aws + [{'roleArn': 'arn:aws:iam::333333333333:role/Missing'}],
+                                            DeniedSessions())
+    assert index['accounts']['333333333333']['error'] == 'AccessDenied'
+    assert index['accounts']['333333333333']['status'] == 'error'
+    assert index['accounts']['111111111111']['status'] == 'ok'
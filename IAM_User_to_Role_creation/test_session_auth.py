@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Result cache: values computed across an invalidation are not cached
+"""
+
+from session_auth import ResultCache
+
+
+def test_value_computed_across_an_eviction_is_not_cached():
+    cache = ResultCache()
+
+    def compute():
+        # The IAM change lands while the stale listing is being built
+        cache.evict_tagged([('user', 'alice')])
+        return ['alice']
+
+    assert cache.get_or_compute('users', compute, [('user', '*')]) == ['alice']
+    assert cache.get('users') is None
+    assert cache.get_or_compute('users', lambda: ['bob'], [('user', '*')]) == ['bob']
+    assert cache.get('users') == ['bob']